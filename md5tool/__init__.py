@@ -0,0 +1,36 @@
+"""
+MD5 Folder Tool 核心：掃描、雜湊、清單與比對邏輯。
+
+本套件不依賴 tkinter / PIL / reportlab，可在無桌面環境的主機上匯入；
+GUI 位於 md5tool.gui，命令列入口位於 md5tool.cli。
+"""
+import importlib
+
+from .constants import APP_NAME, MANIFEST_NAME, VERSION
+
+# 核心函式在第一次取用時才載入，import md5tool（例如 CLI 啟動）不會連帶載入整個 tasks
+_LAZY = {
+    "hash_file": "hashing", "hash_files": "hashing", "md5_of_file": "hashing",
+    "ManifestWriter": "manifest", "iter_manifest": "manifest", "load_manifest": "manifest",
+    "read_manifest": "manifest", "save_manifest": "manifest",
+    "make_manifest": "tasks", "verify_manifest": "tasks",
+}
+
+__all__ = [
+    "APP_NAME", "MANIFEST_NAME", "VERSION",
+    "hash_file", "hash_files", "md5_of_file",
+    "ManifestWriter", "iter_manifest", "load_manifest", "read_manifest", "save_manifest",
+    "make_manifest", "verify_manifest",
+]
+
+
+def __getattr__(name: str):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
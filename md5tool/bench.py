@@ -0,0 +1,210 @@
+"""
+效能基準測試：在暫存資料夾產生合成目錄樹，分別量測走訪、雜湊、清單寫入／讀取、比對與報告產生。
+
+    python -m md5tool.bench [--shapes tiny,mixed] [--scale 0.5] [--baseline benchmarks/baseline.json]
+
+不需要 GUI；結果以 files/s 與 MB/s 表示，可與先前存下的基準 JSON 比較，
+任何階段比基準慢超過門檻（預設 20%）時結束碼為 1。
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+from .constants import HASH_WORKERS, MANIFEST_FORMATS, VERSION
+from .hashing import hash_files
+from .manifest import ManifestWriter, iter_manifest, make_entry
+from .report import generate_report
+from .scan import scan_tree
+from .tasks import make_manifest, verify_manifest
+
+# 各種樹狀結構：files 為檔案數、size 為 (最小, 最大) bytes、depth 為資料夾層數、fanout 為每層子資料夾數
+SHAPES = {
+    "tiny": {"files": 20000, "size": (0, 4096), "depth": 2, "fanout": 10},
+    "huge": {"files": 4, "size": (256 * 1024 * 1024, 256 * 1024 * 1024), "depth": 0, "fanout": 1},
+    "deep": {"files": 5000, "size": (1024, 16384), "depth": 12, "fanout": 2},
+    "mixed": {"files": 2000, "size": (0, 1024 * 1024), "depth": 4, "fanout": 4},
+}
+PHASES = ["walk", "hash", "manifest_write", "manifest_load", "verify", "report"]
+
+
+def generate_tree(root: str, shape: str, scale: float = 1.0, seed: int = 0) -> dict:
+    """依 SHAPES[shape] 產生可重現的合成目錄樹，回傳 {"files": 檔案數, "bytes": 總大小}。"""
+    spec = SHAPES[shape]
+    rng = random.Random(f"{shape}:{seed}")
+    n_files = max(1, int(spec["files"] * scale))
+    lo, hi = spec["size"]
+    if lo == hi:
+        lo = hi = max(1, int(hi * min(scale, 1.0)))
+
+    dirs = [""]
+    level = [""]
+    for _ in range(spec["depth"]):
+        level = [f"{d}/d{i}" if d else f"d{i}" for d in level for i in range(spec["fanout"])]
+        dirs.extend(level)
+    for d in dirs:
+        os.makedirs(os.path.join(root, d), exist_ok=True)
+
+    # 內容只需不可壓縮、可重現：從一塊隨機資料中截取，避免逐檔產生亂數的成本
+    pool = rng.randbytes(min(hi, 64 * 1024 * 1024) + 4096)
+    total = 0
+    for i in range(n_files):
+        size = rng.randint(lo, hi)
+        path = os.path.join(root, rng.choice(dirs), f"f{i:07d}.bin")
+        with open(path, "wb") as f:
+            remaining = size
+            while remaining > 0:
+                off = rng.randrange(0, 4096)
+                piece = pool[off:off + min(remaining, len(pool) - off)]
+                f.write(piece)
+                remaining -= len(piece)
+        total += size
+    return {"files": n_files, "bytes": total}
+
+def _timed(fn, repeat: int):
+    best = None
+    value = None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        value = fn()
+        elapsed = time.perf_counter() - t
+        best = elapsed if best is None else min(best, elapsed)
+    return best, value
+
+def _rate(seconds: float, files: int, nbytes: int) -> dict:
+    seconds = max(seconds, 1e-9)
+    return {
+        "seconds": round(seconds, 4),
+        "files_per_s": round(files / seconds, 1),
+        "mb_per_s": round(nbytes / seconds / 1e6, 1),
+    }
+
+def bench_shape(shape: str, scale: float = 1.0, repeat: int = 3, workers: int = HASH_WORKERS,
+                fmt: str = "json", log=print) -> dict:
+    """在暫存資料夾中量測單一樹狀結構的各階段，回傳 {階段: {seconds, files_per_s, mb_per_s}}。"""
+    tmp = tempfile.mkdtemp(prefix=f"md5bench-{shape}-")
+    try:
+        root = os.path.join(tmp, "tree")
+        t = time.perf_counter()
+        stats = generate_tree(root, shape, scale)
+        log(f"[{shape}] 產生 {stats['files']} 個檔案、{stats['bytes'] / 1e6:.1f} MB（{time.perf_counter() - t:.1f}s）")
+        files, nbytes = stats["files"], stats["bytes"]
+        results = {}
+
+        sec, records = _timed(lambda: list(scan_tree(root)), repeat)
+        results["walk"] = _rate(sec, files, 0)
+
+        def do_hash():
+            return [d for _, d, _ in hash_files((r.path for r in records), workers)]
+        sec, digests = _timed(do_hash, repeat)
+        results["hash"] = _rate(sec, files, nbytes)
+
+        entries = [make_entry(r, d) for r, d in zip(records, digests)]
+        manifest_path = os.path.join(tmp, MANIFEST_FORMATS[fmt])
+
+        def do_write():
+            with ManifestWriter(manifest_path, {"tool": "bench", "algorithm": "md5"}) as w:
+                for e in entries:
+                    w.write(e)
+        sec, _ = _timed(do_write, repeat)
+        mbytes = os.path.getsize(manifest_path)
+        results["manifest_write"] = _rate(sec, files, mbytes)
+
+        sec, _ = _timed(lambda: sum(1 for _ in iter_manifest(manifest_path)), repeat)
+        results["manifest_load"] = _rate(sec, files, mbytes)
+
+        # 比對需要清單放在樹內；以 make_manifest 產生（不計時），再量測完整比對
+        make_manifest(root, fmt=fmt, workers=workers)
+        sec, verify_result = _timed(lambda: verify_manifest(root, workers=workers), repeat)
+        results["verify"] = _rate(sec, files, nbytes)
+
+        def do_report():
+            path = generate_report(verify_result)
+            os.remove(path)
+        sec, _ = _timed(do_report, repeat)
+        results["report"] = _rate(sec, files, 0)
+        return {"files": files, "bytes": nbytes, "phases": results}
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+def compare(results: dict, baseline: dict, threshold: float = 0.2) -> list:
+    """回傳比基準慢超過 threshold 的項目：[(shape, phase, 基準秒數, 本次秒數)]。"""
+    regressions = []
+    for shape, data in results["shapes"].items():
+        base = baseline.get("shapes", {}).get(shape)
+        if not base or base.get("files") != data["files"]:
+            continue  # 規模不同無法比較
+        for phase, cur in data["phases"].items():
+            ref = base["phases"].get(phase)
+            if ref and cur["seconds"] > ref["seconds"] * (1 + threshold):
+                regressions.append((shape, phase, ref["seconds"], cur["seconds"]))
+    return regressions
+
+def _print_table(results: dict, baseline: dict = None):
+    print(f"{'shape':8s} {'phase':15s} {'seconds':>9s} {'files/s':>11s} {'MB/s':>9s} {'vs base':>8s}")
+    for shape, data in results["shapes"].items():
+        base = (baseline or {}).get("shapes", {}).get(shape, {})
+        for phase in PHASES:
+            cur = data["phases"][phase]
+            ref = base.get("phases", {}).get(phase) if base.get("files") == data["files"] else None
+            delta = f"{ref['seconds'] / cur['seconds']:7.2f}x" if ref and cur["seconds"] else ""
+            print(f"{shape:8s} {phase:15s} {cur['seconds']:9.3f} {cur['files_per_s']:11.1f} "
+                  f"{cur['mb_per_s']:9.1f} {delta:>8s}")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="md5tool.bench", description="MD5 Folder Tool 效能基準測試")
+    parser.add_argument("--shapes", default=",".join(SHAPES), help="以逗號分隔：%s" % ",".join(SHAPES))
+    parser.add_argument("--scale", type=float, default=1.0, help="檔案數（與 huge 的檔案大小）的倍率")
+    parser.add_argument("--repeat", type=int, default=3, help="每個階段重複次數，取最佳值")
+    parser.add_argument("--workers", type=int, default=HASH_WORKERS)
+    parser.add_argument("--format", default="json", help="清單格式（json / jsonl / bin ...）")
+    parser.add_argument("--output", help="將結果寫入 JSON 檔")
+    parser.add_argument("--baseline", help="與此基準 JSON 比較")
+    parser.add_argument("--threshold", type=float, default=0.2, help="視為退步的變慢比例（預設 0.2）")
+    args = parser.parse_args(argv)
+
+    shapes = [s.strip() for s in args.shapes.split(",") if s.strip()]
+    unknown = [s for s in shapes if s not in SHAPES]
+    if unknown:
+        parser.error(f"未知的樹狀結構：{', '.join(unknown)}")
+
+    log = lambda msg: print(msg, file=sys.stderr, flush=True)
+    results = {
+        "version": VERSION,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "scale": args.scale,
+        "workers": args.workers,
+        "format": args.format,
+        "shapes": {},
+    }
+    for shape in shapes:
+        results["shapes"][shape] = bench_shape(shape, args.scale, args.repeat, args.workers, args.format, log)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    _print_table(results, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+    if baseline:
+        if baseline.get("scale") != args.scale:
+            log(f"注意：基準的 scale 為 {baseline.get('scale')}，檔案數不同的結構不會比較")
+        regressions = compare(results, baseline, args.threshold)
+        for shape, phase, ref, cur in regressions:
+            print(f"退步：{shape}/{phase} {ref:.3f}s → {cur:.3f}s", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""
+大檔的分塊雜湊：不小於 BLOCK_MIN_SIZE 的檔案，清單項目另存每 BLOCK_SIZE 一段的 MD5（blocks 欄位）。
+
+建立清單時與整檔雜湊在同一次讀取中計算（另一個執行緒同時算分塊 MD5）；
+比對時各區塊以 pread 平行讀取，不必再從頭循序算整檔 MD5，並能指出損毀的位元組範圍、在第一個損毀區塊停止，
+以及從檢查點接續比對到一半的大檔。
+"""
+import hashlib
+import os
+import threading
+from collections import deque
+
+from .constants import BLOCK_WORKERS, CHUNK_SIZE
+from .scan import win_longpath
+from .stats import format_bytes
+
+_local = threading.local()
+
+
+def block_count(size: int, block_size: int) -> int:
+    return -(-size // block_size) if block_size else 0
+
+def block_range(index: int, block_size: int, size: int):
+    """第 index 個區塊的 (起點, 終點)，終點不含。"""
+    start = index * block_size
+    return start, min(start + block_size, size)
+
+
+class BlockHasher:
+    """依序餵入整個檔案的內容，每滿 block_size 結束一個區塊的 MD5。"""
+
+    def __init__(self, block_size: int):
+        self.block_size = block_size
+        self.digests = []
+        self._h = hashlib.md5()
+        self._filled = 0
+
+    def update(self, data):
+        data = memoryview(data)
+        while data:
+            take = min(len(data), self.block_size - self._filled)
+            self._h.update(data[:take])
+            self._filled += take
+            data = data[take:]
+            if self._filled == self.block_size:
+                self.digests.append(self._h.hexdigest())
+                self._h = hashlib.md5()
+                self._filled = 0
+
+    def finish(self) -> list:
+        if self._filled:
+            self.digests.append(self._h.hexdigest())
+            self._filled = 0
+        return self.digests
+
+# ---------- 比對 ----------
+def _buffer() -> memoryview:
+    view = getattr(_local, "view", None)
+    if view is None:
+        view = _local.view = memoryview(bytearray(CHUNK_SIZE))
+    return view
+
+def _hash_block(path: str, fd: int, start: int, end: int, throttle) -> str:
+    # 有 preadv 時共用同一個 fd 以指定位置讀取；否則（例如 Windows）每個區塊各自開檔 seek
+    h = hashlib.md5()
+    view = _buffer()
+    f = None
+    if fd is None:
+        f = open(win_longpath(path), "rb", buffering=0)
+        f.seek(start)
+    try:
+        pos = start
+        while pos < end:
+            want = view[:min(CHUNK_SIZE, end - pos)]
+            n = os.preadv(fd, [want], pos) if f is None else f.readinto(want)
+            if not n:
+                raise OSError(f"讀取到 {pos} 時檔案提前結束")
+            if throttle is not None:
+                throttle.consume(n)
+            h.update(want[:n])
+            pos += n
+    finally:
+        if f is not None:
+            f.close()
+    return h.hexdigest()
+
+def verify_blocks(path: str, expected: list, block_size: int, size: int, start: int = 0,
+                  workers: int = BLOCK_WORKERS, stop_early: bool = False, throttle=None, on_block=None):
+    """
+    以 workers 個執行緒平行讀取各區塊，與清單的分塊 MD5（expected）比對，從第 start 個區塊開始。
+    依區塊順序檢查結果，每完成一塊呼叫 on_block(index, ok, nbytes)（可用於進度與檢查點）；
+    stop_early=True 時遇到第一個損毀區塊即停止，不再讀取之後的區塊。
+    回傳 (損毀區塊編號清單, 是否提前停止)。讀取失敗時拋出例外。
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    workers = max(1, workers)
+    count = block_count(size, block_size)
+    if len(expected) != count:
+        raise ValueError(f"分塊數與檔案大小不符（清單 {len(expected)} 塊，應為 {count} 塊）")
+    bad = []
+    fd = os.open(win_longpath(path), os.O_RDONLY | getattr(os, "O_BINARY", 0)) if hasattr(os, "preadv") else None
+    pending = deque()
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="md5-block") as ex:
+            try:
+                for i in range(start, count):
+                    lo, hi = block_range(i, block_size, size)
+                    pending.append((i, hi - lo, ex.submit(_hash_block, path, fd, lo, hi, throttle)))
+                    # 送出的區塊數維持在 workers 的兩倍，依序取回結果
+                    while len(pending) >= 2 * workers or (pending and pending[0][2].done()):
+                        if _take(pending, expected, bad, on_block) and stop_early:
+                            return bad, True
+                while pending:
+                    if _take(pending, expected, bad, on_block) and stop_early:
+                        return bad, True
+            finally:
+                for _, _, fut in pending:
+                    fut.cancel()
+    finally:
+        if fd is not None:
+            os.close(fd)
+    return bad, False
+
+def _take(pending: deque, expected: list, bad: list, on_block) -> bool:
+    # 取回最前面的區塊結果；損毀時記錄並回傳 True
+    i, nbytes, fut = pending.popleft()
+    ok = fut.result() == expected[i].lower()
+    if not ok:
+        bad.append(i)
+    if on_block is not None:
+        on_block(i, ok, nbytes)
+    return not ok
+
+def corrupt_ranges(bad, block_size: int, size: int) -> list:
+    """損毀區塊編號 → 合併相鄰區塊後的位元組範圍 [[起點, 終點], ...]（終點不含）。"""
+    ranges = []
+    for i in sorted(bad):
+        lo, hi = block_range(i, block_size, size)
+        if ranges and ranges[-1][1] == lo:
+            ranges[-1][1] = hi
+        else:
+            ranges.append([lo, hi])
+    return ranges
+
+def ranges_text(ranges: list) -> str:
+    """例如「位元組 67,108,864–134,217,728（64.0 MB）」，多段以頓號分隔。"""
+    return "、".join(f"位元組 {lo:,}–{hi:,}（{format_bytes(hi - lo)}）" for lo, hi in ranges)
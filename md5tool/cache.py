@@ -0,0 +1,140 @@
+import json
+import os
+
+from .constants import HASH_CACHE_MAX_ENTRIES, HASH_CACHE_PATH
+
+_FLUSH_EVERY = 1000  # 累積多少筆寫入／命中才送進資料庫一次
+
+
+class HashCache:
+    """
+    跨執行的雜湊快取（SQLite）：以 (dev, inode, size, mtime_ns) 對應各演算法的雜湊。
+    同一顆磁碟從不同根目錄、不同清單比對時，未變動的檔案不必重新讀取。
+    每個 (dev, inode) 只保留最新一筆；筆數超過 max_entries 時淘汰最久未使用者（LRU）。
+    force_read=True 時不查快取（一律讀檔），但仍會把算出的雜湊寫回，適合定期的嚴格稽核。
+    只能在建立它的執行緒中使用。
+    """
+
+    def __init__(self, path: str = HASH_CACHE_PATH, max_entries: int = HASH_CACHE_MAX_ENTRIES,
+                 force_read: bool = False):
+        self.path = path
+        self.max_entries = max_entries
+        self.force_read = force_read
+        self.hits = 0
+        self.misses = 0
+        self.stored = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        import sqlite3  # 只有啟用快取時才載入
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            " dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER, digests TEXT, used INTEGER,"
+            " PRIMARY KEY (dev, ino))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS hashes_used ON hashes (used)")
+        row = self._db.execute("SELECT MAX(used) FROM hashes").fetchone()
+        self._clock = (row[0] or 0) + 1  # LRU 序號：每次執行遞增一次
+        self._touched = []
+        self._pending = {}
+
+    @staticmethod
+    def _key(rec):
+        # 沒有 inode（部分 Windows 檔案系統為 0）時無法可靠辨識檔案，不使用快取
+        return (rec.dev, rec.ino) if rec.ino else None
+
+    def get(self, rec, algorithms):
+        """回傳 {演算法: 雜湊}（只含 algorithms）；沒有快取、檔案已變動或缺少某個演算法時回傳 None。"""
+        key = self._key(rec)
+        if self.force_read or key is None:
+            return None
+        pending = self._pending.get(key)
+        if pending is not None and pending[:2] == (rec.size, rec.mtime_ns):
+            digests = pending[2]
+        else:
+            row = self._db.execute(
+                "SELECT digests FROM hashes WHERE dev=? AND ino=? AND size=? AND mtime_ns=?",
+                (*key, rec.size, rec.mtime_ns),
+            ).fetchone()
+            digests = json.loads(row[0]) if row else {}
+        if not all(a in digests for a in algorithms):
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._touched.append(key)
+        if len(self._touched) >= _FLUSH_EVERY:
+            self.flush()
+        return {a: digests[a] for a in algorithms}
+
+    def put(self, rec, digests: dict):
+        """寫入新算出的雜湊；同一檔案未變動時與既有的其他演算法合併。分塊 MD5（"blocks"）不存入快取。"""
+        digests = {a: v for a, v in digests.items() if a != "blocks"}
+        key = self._key(rec)
+        if key is None or not digests:
+            return
+        merged = dict(digests)
+        pending = self._pending.get(key)
+        if pending is not None and pending[:2] == (rec.size, rec.mtime_ns):
+            merged = {**pending[2], **digests}
+        else:
+            row = self._db.execute(
+                "SELECT digests FROM hashes WHERE dev=? AND ino=? AND size=? AND mtime_ns=?",
+                (*key, rec.size, rec.mtime_ns),
+            ).fetchone()
+            if row:
+                merged = {**json.loads(row[0]), **digests}
+        self._pending[key] = (rec.size, rec.mtime_ns, merged)
+        self.stored += 1
+        if len(self._pending) >= _FLUSH_EVERY:
+            self.flush()
+
+    def flush(self):
+        with self._db:
+            if self._pending:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?, ?, ?)",
+                    [(dev, ino, size, mtime_ns, json.dumps(d, separators=(",", ":")), self._clock)
+                     for (dev, ino), (size, mtime_ns, d) in self._pending.items()],
+                )
+            if self._touched:
+                self._db.executemany("UPDATE hashes SET used=? WHERE dev=? AND ino=?",
+                                     [(self._clock, dev, ino) for dev, ino in self._touched])
+        self._pending = {}
+        self._touched = []
+
+    def evict(self):
+        """淘汰最久未使用的項目，使總筆數不超過 max_entries。"""
+        with self._db:
+            count = self._db.execute("SELECT COUNT(*) FROM hashes").fetchone()[0]
+            if count > self.max_entries:
+                self._db.execute(
+                    "DELETE FROM hashes WHERE rowid IN (SELECT rowid FROM hashes ORDER BY used LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def close(self):
+        if self._db is None:
+            return
+        try:
+            self.flush()
+            self.evict()
+        finally:
+            self._db.close()
+            self._db = None
+
+    def summary(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "stored": self.stored, "force_read": self.force_read}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def cache_line(summary: dict) -> str:
+    """快取統計的摘要文字（日誌與報告共用）。"""
+    text = f"雜湊快取：命中 {summary['hits']} 筆、未命中 {summary['misses']} 筆、寫入 {summary['stored']} 筆"
+    if summary.get("force_read"):
+        text += "（強制讀檔，不使用快取結果）"
+    return text
@@ -0,0 +1,66 @@
+import json
+import os
+import time
+
+from .constants import CHECKPOINT_INTERVAL
+
+
+class CheckpointWriter:
+    """
+    檢查點日誌：第一行為檔頭，之後每行一筆已完成的結果（JSON），只附加不改寫。
+    每筆寫入後即 flush 到系統（程式當掉不會遺失），每隔 interval 秒 fsync 一次（斷電最多損失這段時間）。
+    append=True 時接續既有日誌，不重寫檔頭。
+    """
+
+    def __init__(self, path: str, header: dict, append: bool = False, interval: float = CHECKPOINT_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self._f = open(path, "a" if append else "w", encoding="utf-8", newline="\n")
+        if not append:
+            self._f.write(json.dumps(header, ensure_ascii=False) + "\n")
+        self._sync()
+
+    def _sync(self):
+        self._f.flush()
+        try:
+            os.fsync(self._f.fileno())
+        except OSError:
+            pass
+        self._last_sync = time.monotonic()
+
+    def append(self, record: dict):
+        self._f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._f.flush()
+        if time.monotonic() - self._last_sync >= self.interval:
+            self._sync()
+
+    def close(self, remove: bool = False):
+        """remove=True 表示工作已完成，刪除檢查點。"""
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+        if remove:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+def load_checkpoint(path: str):
+    """讀取檢查點，回傳 (header, records)；不存在或無法讀取時回傳 (None, [])。最後一行不完整（寫到一半中斷）時略過。"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None, []
+    records = []
+    header = None
+    for i, line in enumerate(lines):
+        try:
+            d = json.loads(line)
+        except ValueError:
+            continue
+        if i == 0:
+            header = d
+        else:
+            records.append(d)
+    return header, records
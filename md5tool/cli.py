@@ -0,0 +1,197 @@
+"""
+命令列入口（適合 cron 與傳輸流程）：結果以 JSON 輸出到 stdout，逐檔訊息輸出到 stderr。
+
+結束碼：0 = 成功／全部通過，1 = 比對發現異常，2 = 參數錯誤或執行失敗。
+"""
+import argparse
+import json
+import sys
+
+from .constants import (
+    DEFAULT_ALGORITHMS, DETAIL_FORMATS, HASH_CACHE_PATH, HASH_USE_PROCESSES, HASH_WORKERS, LOW_PRIORITY,
+    MANIFEST_FORMAT, MANIFEST_FORMATS, MAX_CONCURRENCY, MAX_IOPS, MAX_MBPS, SCAN_WORKERS, USE_HASH_CACHE,
+    VERIFY_LEVELS, WATCH_DEBOUNCE, WATCH_POLL_INTERVAL, WATCH_WRITE_INTERVAL,
+)
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_ERROR = 2
+PROGRESS_INTERVAL = 10  # 限速時每隔幾秒在 stderr 輸出一次進度與實際速度（需 -v）
+
+
+def _stderr_log(msg: str):
+    print(msg, file=sys.stderr, flush=True)
+
+def _throttle_progress(throttle, log):
+    # 進度以位元組計；附上實際讀取速度與限速上限，方便確認背景比對的負載
+    import time
+    last = [0.0]
+
+    def progress(value: int, maximum: int):
+        now = time.monotonic()
+        if now - last[0] < PROGRESS_INTERVAL and value < maximum:
+            return
+        last[0] = now
+        log(f"進度 {min(value / max(maximum, 1), 1):.1%}　{throttle.status_text()}")
+    return progress
+
+def build_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("-v", "--verbose", action="store_true", help="逐檔訊息輸出到 stderr")
+    common.add_argument("--workers", type=int, default=HASH_WORKERS, help="雜湊工作數（預設 %(default)s）")
+    common.add_argument("--processes", action="store_true", default=HASH_USE_PROCESSES,
+                        help="使用行程池（大量小檔案時較快）")
+    common.add_argument("--scan-workers", type=int, default=SCAN_WORKERS,
+                        help="平行走訪資料夾的執行緒數，網路磁碟可調高（預設 %(default)s）")
+    common.add_argument("--device-limit", default=None, metavar="NAME=N[,...]",
+                        help="個別裝置同時讀取的檔案數，例如 sda=1,md0=4（預設依 MD5_DEVICE_LIMITS，"
+                             "傳統硬碟為 1）")
+    common.add_argument("--cache", action="store_true", default=USE_HASH_CACHE,
+                        help=f"使用跨執行的雜湊快取，未變動的檔案不重新讀取（{HASH_CACHE_PATH}）")
+    common.add_argument("--force-read", action="store_true",
+                        help="搭配 --cache：一律實際讀檔比對，只更新快取（嚴格稽核用）")
+    common.add_argument("--max-mbps", type=float, default=MAX_MBPS,
+                        help="讀檔總頻寬上限 MB/s，0 為不限（預設 %(default)s）")
+    common.add_argument("--max-iops", type=int, default=MAX_IOPS, help="每秒讀取次數上限，0 為不限")
+    common.add_argument("--max-concurrency", type=int, default=MAX_CONCURRENCY,
+                        help="所有裝置合計同時讀取的檔案數上限，0 為不限")
+    common.add_argument("--low-priority", nargs="?", const="be", default=LOW_PRIORITY or None,
+                        choices=("be", "idle"), help="降低 CPU 與 I/O 優先權（Linux）；idle 為磁碟閒置時才讀")
+    common.add_argument("--control", default=None, metavar="FILE",
+                        help='執行中調整限速的 JSON 控制檔，例如 {"mb_per_s": 50, "concurrency": 2}，修改後約 1 秒生效')
+
+    # 比對類指令共用的報告選項
+    detail = argparse.ArgumentParser(add_help=False)
+    detail.add_argument("--report-full", action="store_true",
+                        help="搭配 --report：列出每一筆異常（預設每類只列前 50 筆）")
+    detail.add_argument("--detail", choices=DETAIL_FORMATS, default=None,
+                        help="另外逐筆輸出完整明細（csv / jsonl / 分頁 html），不截斷")
+
+    parser = argparse.ArgumentParser(prog="md5tool", description="MD5 Folder Tool（命令列模式）")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_make = sub.add_parser("make", parents=[common], help="產生 MD5 清單檔")
+    p_make.add_argument("folder")
+    p_make.add_argument("--update", action="store_true", help="增量更新既有清單，只重新計算變動的檔案")
+    p_make.add_argument("--format", choices=list(MANIFEST_FORMATS), default=None,
+                        help="清單格式（預設沿用既有清單，否則為 %s）" % MANIFEST_FORMAT)
+    p_make.add_argument("--algorithms", default=",".join(DEFAULT_ALGORITHMS),
+                        help="以逗號分隔的演算法，md5 一律包含（例如 md5,sha256,blake2b,xxh64）")
+    p_make.add_argument("--resume", action="store_true", help="接續上次中斷時留下的檢查點")
+    p_make.add_argument("--blocks", action="store_true", default=None,
+                        help="大檔另存分塊 MD5，比對時可平行讀取並指出損毀範圍（--update 時預設沿用舊清單的設定）")
+
+    p_watch = sub.add_parser("watch", parents=[common],
+                             help="持續監看資料夾，只重新計算變動的檔案並保持清單最新（Ctrl+C 結束）")
+    p_watch.add_argument("folder")
+    p_watch.add_argument("--debounce", type=float, default=WATCH_DEBOUNCE,
+                         help="檔案最後一次變動後靜置幾秒才重新計算（預設 %(default)s）")
+    p_watch.add_argument("--poll", action="store_true", help="不使用 inotify，一律定期走訪比對（例如網路磁碟）")
+    p_watch.add_argument("--poll-interval", type=float, default=WATCH_POLL_INTERVAL,
+                         help="定期走訪的間隔秒數（預設 %(default)s）")
+    p_watch.add_argument("--write-interval", type=float, default=WATCH_WRITE_INTERVAL,
+                         help="清單最多每隔幾秒重寫一次（預設 %(default)s）")
+
+    p_verify = sub.add_parser("verify", parents=[common, detail], help="比對資料夾與 MD5 清單")
+    p_verify.add_argument("folder")
+    p_verify.add_argument("--level", choices=list(VERIFY_LEVELS), default="full")
+    p_verify.add_argument("--seed", type=int, default=None, help="抽樣比對的亂數種子")
+    p_verify.add_argument("--all-digests", action="store_true",
+                          help="比對清單中所有雜湊（預設只用本機最快的一種）")
+    p_verify.add_argument("--resume", action="store_true", help="接續上次中斷時留下的檢查點（含比對到一半的大檔）")
+    p_verify.add_argument("--stop-early", action="store_true",
+                          help="分塊比對的大檔在第一個損毀區塊停止，不再讀取其餘部分")
+    p_verify.add_argument("--report", action="store_true", help="同時輸出 PDF／TXT 檢測報告")
+
+    p_compare = sub.add_parser("compare", parents=[common, detail], help="不經清單，直接比對來源與目的資料夾")
+    p_compare.add_argument("source")
+    p_compare.add_argument("dest")
+    p_compare.add_argument("--dest-workers", type=int, default=None,
+                           help="目的端的雜湊工作數（預設同 --workers）")
+    p_compare.add_argument("--algorithms", default=",".join(DEFAULT_ALGORITHMS),
+                           help="以逗號分隔的比對演算法，md5 一律包含")
+    p_compare.add_argument("--write-manifest", action="store_true", help="同時在來源資料夾寫出清單檔")
+    p_compare.add_argument("--format", choices=list(MANIFEST_FORMATS), default=None,
+                           help="--write-manifest 的清單格式")
+    p_compare.add_argument("--report", action="store_true", help="同時在目的資料夾輸出 PDF／TXT 檢測報告")
+
+    p_diff = sub.add_parser("diff", parents=[detail], help="比對兩份清單（不讀取檔案），例如昨天與今天、A 站與 B 站")
+    p_diff.add_argument("old", help="基準清單檔，或含清單的資料夾")
+    p_diff.add_argument("new", help="比較的清單檔，或含清單的資料夾")
+    p_diff.add_argument("-v", "--verbose", action="store_true", help="逐檔訊息輸出到 stderr")
+    p_diff.add_argument("--report", action="store_true", help="同時在比較清單所在資料夾輸出 PDF／TXT 檢測報告")
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    log = _stderr_log if args.verbose else (lambda msg: None)
+
+    # 延遲載入核心，讓 --help 等操作維持最快的啟動速度
+    from .devices import parse_device_limits
+    from .tasks import compare_folders, diff_manifests, has_failures, make_manifest, verify_manifest, watch_folder
+    from .throttle import Throttle, lower_priority
+
+    throttle = None
+    try:
+        device_limits = parse_device_limits(args.device_limit) if getattr(args, "device_limit", None) else None
+        if getattr(args, "low_priority", None):
+            # 在建立任何工作執行緒之前降低，之後的執行緒都會繼承
+            applied = lower_priority(args.low_priority)
+            log(f"已降低優先權：{'、'.join(applied)}" if applied else "此平台不支援降低優先權")
+        if args.command != "diff" and (args.max_mbps or args.max_iops or args.max_concurrency or args.control):
+            throttle = Throttle(args.max_mbps, args.max_iops, args.max_concurrency)
+            if args.control:
+                throttle.watch_file(args.control, log)
+        kwargs = {"throttle": throttle, "log": log}
+        if throttle is not None:
+            kwargs["progress"] = _throttle_progress(throttle, log)
+        if args.command == "make":
+            result = make_manifest(args.folder, incremental=args.update, fmt=args.format,
+                                   algorithms=args.algorithms.split(","), resume=args.resume, blocks=args.blocks,
+                                   workers=args.workers, use_processes=args.processes,
+                                   scan_workers=args.scan_workers, device_limits=device_limits,
+                                   use_cache=args.cache, force_read=args.force_read, **kwargs)
+            code = EXIT_FAILED if result["errors"] else EXIT_OK
+        elif args.command == "watch":
+            result = watch_folder(args.folder, debounce=args.debounce, poll_interval=args.poll_interval,
+                                  write_interval=args.write_interval, use_inotify=not args.poll,
+                                  workers=args.workers, use_processes=args.processes,
+                                  scan_workers=args.scan_workers, device_limits=device_limits,
+                                  use_cache=args.cache, **kwargs)
+            code = EXIT_FAILED if result["errors"] else EXIT_OK
+        else:
+            if args.command == "diff":
+                result = diff_manifests(args.old, args.new, log=log)
+            elif args.command == "compare":
+                result = compare_folders(args.source, args.dest, algorithms=args.algorithms.split(","),
+                                         write_manifest=args.write_manifest, fmt=args.format,
+                                         workers=args.workers, dest_workers=args.dest_workers,
+                                         use_processes=args.processes, scan_workers=args.scan_workers,
+                                         device_limits=device_limits, use_cache=args.cache,
+                                         force_read=args.force_read, **kwargs)
+            else:
+                result = verify_manifest(args.folder, level=args.level, seed=args.seed,
+                                         all_digests=args.all_digests, resume=args.resume, stop_early=args.stop_early,
+                                         workers=args.workers, use_processes=args.processes,
+                                         scan_workers=args.scan_workers, device_limits=device_limits,
+                                         use_cache=args.cache, force_read=args.force_read, **kwargs)
+            if args.report or args.detail:
+                import time
+                from .report import generate_report, write_detail_report
+                t = time.perf_counter()
+                if args.report:
+                    result["report_path"] = generate_report(result, log=log, full=args.report_full)
+                if args.detail:
+                    result["detail_path"] = write_detail_report(result, args.detail, log=log)
+                result["stats"]["phases"]["report"] = round(time.perf_counter() - t, 3)
+            code = EXIT_FAILED if has_failures(result) else EXIT_OK
+    except Exception as e:
+        print(json.dumps({"status": "error", "error": str(e)}, ensure_ascii=False))
+        return EXIT_ERROR
+    finally:
+        if throttle is not None:
+            throttle.close()
+
+    result["status"] = "ok" if code == EXIT_OK else "failed"
+    print(json.dumps(result, ensure_ascii=False))
+    return code
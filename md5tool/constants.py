@@ -0,0 +1,100 @@
+import os
+
+# 新增：報告檔命名規則（用來忽略）
+REPORT_PREFIX = "MD5檢測報告 "
+REPORT_EXT = ".pdf"
+# 完整明細：每一筆異常逐筆寫入 CSV / JSONL / HTML（同樣會被掃描忽略）
+DETAIL_PREFIX = "MD5檢測明細 "
+DETAIL_FORMATS = ("csv", "jsonl", "html")
+REPORT_DETAIL = os.environ.get("MD5_REPORT_DETAIL", "")  # GUI 產生報告時一併輸出的明細格式，空字串為不輸出
+REPORT_LIST_LIMIT = 50  # PDF / TXT 報告每類列出的筆數（完整模式不限）
+PDF_TABLE_ROWS = 500  # PDF 長清單切成多個小表格，避免 reportlab 反覆切分整張大表
+HTML_PAGE_ROWS = 1000  # HTML 明細每頁筆數
+
+VERSION = os.environ.get("APP_VERSION", "1.0.0")
+APP_NAME = f"MD5 Folder Tool by InstantNano  |  v{VERSION}"
+MANIFEST_NAME = "_md5_manifest.json"
+# GUI 每次執行的完整逐檔日誌存放處
+LOG_DIR = os.environ.get("MD5_LOG_DIR", os.path.join(os.path.expanduser("~"), ".md5tool", "logs"))
+# 清單格式：json 為原本的整份 JSON；jsonl 為逐行串流（可 gzip / zstd 壓縮）；
+# bin 以 16 bytes 原始值儲存 MD5，適合數百萬檔案的樹
+MANIFEST_FORMATS = {
+    "json": MANIFEST_NAME,
+    "jsonl": "_md5_manifest.jsonl",
+    "jsonl.gz": "_md5_manifest.jsonl.gz",
+    "jsonl.zst": "_md5_manifest.jsonl.zst",
+    "bin": "_md5_manifest.md5b",
+    "bin.gz": "_md5_manifest.md5b.gz",
+    "bin.zst": "_md5_manifest.md5b.zst",
+}
+MANIFEST_FORMAT = os.environ.get("MD5_MANIFEST_FORMAT", "json")
+# 執行中先寫入 _md5_manifest.partial.<副檔名>，完成後才改名為正式清單
+PARTIAL_MANIFEST_NAMES = {n.replace(".", ".partial.", 1) for n in MANIFEST_FORMATS.values()}
+# 檢查點：逐筆附加已完成的結果，中斷後可接續（完成後自動刪除）
+MAKE_CHECKPOINT_NAME = "_md5_manifest.checkpoint"
+VERIFY_CHECKPOINT_NAME = "_md5_verify.checkpoint"
+CHECKPOINT_INTERVAL = float(os.environ.get("MD5_CHECKPOINT_INTERVAL", "30"))  # 每隔幾秒 fsync 一次
+# 資料夾根目錄的排除規則檔（gitignore 風格，見 ignore.py）；規則會記錄在清單中，比對時沿用
+IGNORE_FILE = ".md5ignore"
+# 新增：統一忽略規則（含舊版 GUI 覆蓋清單前留下的 .bak 備份）
+# IGNORE_FILE 只排除根目錄那一份（見 scan.is_root_ignore_file），子資料夾同名的檔案照常納入
+IGNORE_BASENAMES = {*MANIFEST_FORMATS.values(), *PARTIAL_MANIFEST_NAMES, MAKE_CHECKPOINT_NAME,
+                    VERIFY_CHECKPOINT_NAME, MANIFEST_NAME + ".bak", "MD5SUMS.txt", "checksums.md5"}
+CHUNK_SIZE = 1024 * 1024  # 1 MB
+MAX_CHUNK_SIZE = 8 * CHUNK_SIZE  # 超大檔案的讀取區塊上限
+# 大型本機檔案可改用 mmap（網路磁碟上檔案被截斷時 mmap 會出錯，預設關閉）
+USE_MMAP = os.environ.get("MD5_USE_MMAP", "0") == "1"
+MMAP_MIN_SIZE = 64 * 1024 * 1024
+# Linux：讀完即以 posix_fadvise(DONTNEED) 釋放快取，避免大量比對擠掉其他服務的 page cache
+FADVISE_DONTNEED = os.environ.get("MD5_FADVISE_DONTNEED", "1") == "1"
+# 建立清單時計算的演算法（md5 一律包含），例如 MD5_ALGORITHMS=md5,sha256,blake2b
+DEFAULT_ALGORITHMS = tuple(a.strip() for a in os.environ.get("MD5_ALGORITHMS", "md5").split(",") if a.strip())
+# 雜湊工作池：hashlib 在大區塊 update 時會釋放 GIL，預設用執行緒即可吃滿多核與磁碟頻寬；
+# 百萬個小檔案的樹可設 MD5_USE_PROCESSES=1 改用行程池
+HASH_WORKERS = int(os.environ.get("MD5_WORKERS", min(8, os.cpu_count() or 1)))
+HASH_USE_PROCESSES = os.environ.get("MD5_USE_PROCESSES", "0") == "1"
+# 資料夾走訪執行緒數；網路磁碟（SMB / NFS）每次 stat 都是往返延遲，可調高平行走訪
+SCAN_WORKERS = int(os.environ.get("MD5_SCAN_WORKERS", "1"))
+PROCESS_BATCH = 64  # 行程池每次送出的檔案數，攤平跨行程傳遞的成本
+# 依裝置排程：同一顆傳統硬碟（/sys/block/*/queue/rotational = 1）同時讀取的檔案數，過多會來回尋軌
+ROTATIONAL_WORKERS = int(os.environ.get("MD5_ROTATIONAL_WORKERS", "1"))
+# 個別裝置的上限，例如 MD5_DEVICE_LIMITS=sda=2,md0=4,0:53=8（裝置名稱或 major:minor）
+DEVICE_LIMITS = os.environ.get("MD5_DEVICE_LIMITS", "")
+SCHED_LOOKAHEAD = 512  # 排程時預先讀入的檔案數，在此範圍內依裝置與 inode 重新排序讀取
+# 雜湊引擎最多預先取用的項目數（含不需讀檔、直接帶過的項目），限制管線兩端之間暫存的筆數
+PIPELINE_WINDOW = 4096
+# 跨執行的雜湊快取（SQLite）：以 (dev, inode, size, mtime_ns) 記住算過的雜湊，預設關閉
+USE_HASH_CACHE = os.environ.get("MD5_USE_CACHE", "0") == "1"
+HASH_CACHE_PATH = os.environ.get("MD5_CACHE_PATH",
+                                 os.path.join(os.path.expanduser("~"), ".md5tool", "hash_cache.sqlite"))
+HASH_CACHE_MAX_ENTRIES = int(os.environ.get("MD5_CACHE_MAX_ENTRIES", "2000000"))  # 超過時淘汰最久未使用者
+# 讀檔限速（在營運中的儲存設備上比對用），0 表示不限；執行中可由 GUI 或控制檔調整
+MAX_MBPS = float(os.environ.get("MD5_MAX_MBPS", "0"))          # 總讀取頻寬上限（MB/s）
+MAX_IOPS = int(os.environ.get("MD5_MAX_IOPS", "0"))            # 每秒讀取次數上限
+MAX_CONCURRENCY = int(os.environ.get("MD5_MAX_CONCURRENCY", "0"))  # 同時讀取的檔案數上限（所有裝置合計）
+# 降低本工具的 CPU 與 I/O 優先權（Linux nice + ioprio）：be = 盡力而為的最低等級，idle = 磁碟閒置時才讀
+LOW_PRIORITY = os.environ.get("MD5_LOW_PRIORITY", "")
+THROTTLE_BURST = 0.25  # 限速允許的瞬間突發量（秒），超過即暫停讀取
+# 大檔分塊雜湊：不小於 BLOCK_MIN_SIZE 的檔案另存每 BLOCK_SIZE 一段的 MD5（清單項目的 blocks 欄位），
+# 比對時各區塊平行讀取，可在第一個損毀區塊停止並指出損毀的位元組範圍
+BLOCK_HASHES = os.environ.get("MD5_BLOCK_HASHES", "0") == "1"
+BLOCK_SIZE = int(os.environ.get("MD5_BLOCK_SIZE", str(64 * 1024 * 1024)))
+BLOCK_MIN_SIZE = int(os.environ.get("MD5_BLOCK_MIN_SIZE", str(1024 * 1024 * 1024)))
+BLOCK_WORKERS = int(os.environ.get("MD5_BLOCK_WORKERS", "4"))  # 比對單一大檔時同時讀取的區塊數
+# 監看模式：檔案最後一次變動後靜置幾秒才重新計算；不支援 inotify 時每隔幾秒走訪比對一次；
+# 清單最多每隔幾秒重寫一次（暫存檔寫完再改名）
+WATCH_DEBOUNCE = float(os.environ.get("MD5_WATCH_DEBOUNCE", "5"))
+WATCH_POLL_INTERVAL = float(os.environ.get("MD5_WATCH_POLL_INTERVAL", "60"))
+WATCH_WRITE_INTERVAL = float(os.environ.get("MD5_WATCH_WRITE_INTERVAL", "10"))
+# 清單對清單比對與 verify：外部排序每批在記憶體中排序的筆數，超過即寫入暫存檔後再合併
+DIFF_RUN_SIZE = int(os.environ.get("MD5_DIFF_RUN_SIZE", "200000"))
+
+# 比對層級：meta 只看存在／大小／修改時間（不讀內容）；full 對大小相符者計算 MD5；
+# sample 先做 meta 檢查，再隨機抽樣計算 MD5
+VERIFY_LEVELS = {
+    "full": "完整比對（MD5）",
+    "meta": "快速比對（存在＋大小＋時間，不讀檔）",
+    "sample": "抽樣比對（隨機抽樣 MD5）",
+}
+SAMPLE_CONFIDENCE = float(os.environ.get("MD5_SAMPLE_CONFIDENCE", "0.95"))
+SAMPLE_MARGIN = float(os.environ.get("MD5_SAMPLE_MARGIN", "0.01"))
@@ -0,0 +1,57 @@
+import functools
+import os
+
+from .constants import DEVICE_LIMITS, ROTATIONAL_WORKERS
+
+
+def parse_device_limits(text: str) -> dict:
+    """解析 "sda=1,md0=4,0:53=8" 形式的裝置上限設定，回傳 {裝置名稱或 major:minor: 上限}。"""
+    limits = {}
+    for part in (text or "").split(","):
+        name, sep, value = part.strip().partition("=")
+        if not sep:
+            continue
+        try:
+            limits[name.strip()] = max(1, int(value))
+        except ValueError:
+            raise ValueError(f"裝置上限格式錯誤：{part.strip()}（應為 名稱=數字）")
+    return limits
+
+@functools.lru_cache(maxsize=None)
+def device_info(dev: int):
+    """
+    由 st_dev 找出區塊裝置：回傳 (名稱, 是否為傳統硬碟)。
+    Linux 以 /sys/dev/block/<major>:<minor> 判斷，分割區則看所屬磁碟的 queue/rotational；
+    網路磁碟（SMB / NFS）與其他平台沒有對應的區塊裝置，回傳 (None, None)。
+    """
+    key = f"{os.major(dev)}:{os.minor(dev)}" if hasattr(os, "major") else str(dev)
+    sys_dir = os.path.join("/sys/dev/block", key)
+    if not os.path.isdir(sys_dir):
+        return None, None
+    real = os.path.realpath(sys_dir)
+    for d in (real, os.path.dirname(real)):
+        try:
+            with open(os.path.join(d, "queue", "rotational")) as f:
+                return os.path.basename(real), f.read().strip() == "1"
+        except OSError:
+            continue
+    return os.path.basename(real), None
+
+def device_limit(dev: int, workers: int, overrides: dict = None):
+    """
+    回傳 (同時讀取的檔案數上限, 是否依 inode 排序)。
+    優先使用 overrides（或環境變數 MD5_DEVICE_LIMITS）中以裝置名稱或 major:minor 指定的值；
+    傳統硬碟預設 ROTATIONAL_WORKERS，SSD 與網路磁碟預設 workers。
+    """
+    if overrides is None:
+        overrides = parse_device_limits(DEVICE_LIMITS)
+    name, rotational = device_info(dev)
+    keys = [name] if name else []
+    if hasattr(os, "major"):
+        keys.append(f"{os.major(dev)}:{os.minor(dev)}")
+    for k in keys:
+        if k in overrides:
+            return overrides[k], bool(rotational)
+    if rotational:
+        return min(workers, ROTATIONAL_WORKERS), True
+    return workers, False
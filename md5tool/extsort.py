@@ -0,0 +1,60 @@
+import heapq
+import pickle
+import tempfile
+from operator import attrgetter
+
+from .constants import DIFF_RUN_SIZE
+from .manifest import Entry
+
+_by_path = attrgetter("path")
+
+
+def _write_run(batch: list, key):
+    batch.sort(key=key)
+    f = tempfile.TemporaryFile(prefix="md5tool-sort-")
+    pickler = pickle.Pickler(f, pickle.HIGHEST_PROTOCOL)
+    for item in batch:
+        pickler.dump(tuple(item))
+    f.seek(0)
+    return f
+
+def _read_run(f):
+    unpickler = pickle.Unpickler(f)
+    while True:
+        try:
+            yield Entry(*unpickler.load())
+        except EOFError:
+            return
+
+def sorted_by_path(entries, run_size: int = DIFF_RUN_SIZE, key=_by_path):
+    """
+    依 path 排序 Entry（外部排序）：每 run_size 筆在記憶體排序後寫入暫存檔，最後以 heapq.merge 合併。
+    key 可改為其他排序鍵（例如 scan.scan_order 的走訪順序）。
+    會先讀完 entries 才回傳，記憶體用量約為 run_size 筆；回傳的 iterator 讀完或 close() 時刪除暫存檔。
+    """
+    runs = []
+    batch = []
+    try:
+        for e in entries:
+            batch.append(e)
+            if len(batch) >= run_size:
+                runs.append(_write_run(batch, key))
+                batch = []
+    except BaseException:
+        for f in runs:
+            f.close()
+        raise
+    if not runs:
+        # 全部放得進記憶體就不寫暫存檔
+        batch.sort(key=key)
+        return (e for e in batch)
+    if batch:
+        runs.append(_write_run(batch, key))
+
+    def gen():
+        try:
+            yield from heapq.merge(*(_read_run(f) for f in runs), key=key)
+        finally:
+            for f in runs:
+                f.close()
+    return gen()
@@ -0,0 +1,463 @@
+import os
+import threading
+import time
+from datetime import datetime
+from tkinter import (
+    Tk, BooleanVar, Button, Checkbutton, Spinbox, StringVar, Text, END, DISABLED, NORMAL, filedialog, ttk, messagebox,
+    Label, Frame,
+)
+
+from .constants import (
+    APP_NAME, LOG_DIR, LOW_PRIORITY, MAKE_CHECKPOINT_NAME, REPORT_DETAIL, VERIFY_CHECKPOINT_NAME, VERIFY_LEVELS,
+)
+from .manifest import find_manifest
+from .report import generate_report, write_detail_report
+from .scan import resource_path
+from .stats import eta_seconds, format_duration
+from .tasks import compare_folders, has_failures, make_manifest, verify_manifest, watch_folder
+from .throttle import Throttle, lower_priority
+
+UI_INTERVAL_MS = 100     # 進度與日誌最多每秒更新 10 次
+LOG_VIEW_LINES = 2000    # 畫面上只保留最後 N 行，完整日誌寫入檔案
+WATCH_TEXT = "④ 監看資料夾（自動更新清單）"
+
+
+class Md5ToolGUI:
+    def __init__(self, master: Tk):
+        self.master = master
+        master.title(APP_NAME)
+        master.geometry("900x600")
+
+        # === 上方：Logo（左） + Spacer（中） + 按鈕群（右） ===
+        top_frame = Frame(master)
+        top_frame.pack(fill="x", pady=10, padx=10)
+
+        # 讓第 1 欄（中間 spacer）吃掉多餘寬度
+        top_frame.grid_columnconfigure(0, weight=0)
+        top_frame.grid_columnconfigure(1, weight=1)  # 中間自動撐開
+        top_frame.grid_columnconfigure(2, weight=0)
+
+        # 左邊 Logo
+        try:
+            from PIL import Image, ImageTk  # 只有 GUI 需要，延遲載入
+            img = Image.open(resource_path("Assets/Instant Logo.png"))
+            img = img.resize((240, 60))  # 依需求調整
+            self.logo_img = ImageTk.PhotoImage(img)
+            logo_label = Label(top_frame, image=self.logo_img)
+            logo_label.grid(row=0, column=0, padx=(0, 10), pady=0, sticky="w")
+        except Exception as e:
+            print(f"載入 Logo 失敗: {e}")
+
+        # 中間 spacer（可用空 Label 或 Frame 皆可）
+        spacer = Frame(top_frame)
+        spacer.grid(row=0, column=1, sticky="nsew")
+
+        # 右邊按鈕群
+        btn_frame = Frame(top_frame)
+        btn_frame.grid(row=0, column=2, padx=(10, 0), sticky="e")
+
+        self.btn_make = Button(btn_frame, text="① 產生 MD5 清單檔", width=24, command=self.on_make_manifest)
+        self.btn_make.pack(pady=5)
+
+        self.btn_verify = Button(btn_frame, text="② 比對資料夾與 MD5 清單", width=24, command=self.on_verify_manifest)
+        self.btn_verify.pack(pady=5)
+
+        self.btn_compare = Button(btn_frame, text="③ 直接比對來源與目的資料夾", width=24,
+                                  command=self.on_compare_folders)
+        self.btn_compare.pack(pady=5)
+
+        # 監看中按鈕改為「停止監看」，其他按鈕維持鎖定
+        self._watch_stop = None
+        self.btn_watch = Button(btn_frame, text=WATCH_TEXT, width=24, command=self.on_watch_folder)
+        self.btn_watch.pack(pady=5)
+
+        # 比對層級
+        self.verify_level = ttk.Combobox(btn_frame, state="readonly", width=30,
+                                         values=list(VERIFY_LEVELS.values()))
+        self.verify_level.current(0)
+        self.verify_level.pack(pady=(0, 5))
+
+        # 讀檔限速：執行中也可調整，按「套用」後約 0.25 秒內生效
+        self.throttle = Throttle()
+        limit_frame = Frame(master)
+        limit_frame.pack(fill="x", padx=12)
+        Label(limit_frame, text="讀取上限 MB/s（0 = 不限）").pack(side="left")
+        self.limit_mbps = StringVar(value=f"{self.throttle.mb_per_s:g}")
+        Spinbox(limit_frame, from_=0, to=100000, increment=10, width=7,
+                textvariable=self.limit_mbps).pack(side="left", padx=(4, 12))
+        Label(limit_frame, text="IOPS").pack(side="left")
+        self.limit_iops = StringVar(value=str(self.throttle.iops))
+        Spinbox(limit_frame, from_=0, to=1000000, increment=100, width=7,
+                textvariable=self.limit_iops).pack(side="left", padx=(4, 12))
+        Label(limit_frame, text="同時讀取檔案數（0 = 不限）").pack(side="left")
+        self.limit_concurrency = StringVar(value=str(self.throttle.concurrency))
+        Spinbox(limit_frame, from_=0, to=256, width=5,
+                textvariable=self.limit_concurrency).pack(side="left", padx=(4, 12))
+        Button(limit_frame, text="套用限速", command=self.on_apply_limits).pack(side="left")
+        self.low_priority = BooleanVar(value=bool(LOW_PRIORITY))
+        self.chk_low_priority = Checkbutton(limit_frame, text="低優先權（Linux nice / ioprio）",
+                                            variable=self.low_priority)
+        self.chk_low_priority.pack(side="left", padx=(12, 0))
+
+        self.progress = ttk.Progressbar(master, orient="horizontal", mode="determinate")
+        self.progress.pack(fill="x", padx=12, pady=(8, 0))
+        self.progress_text = Label(master, anchor="w", text="")
+        self.progress_text.pack(fill="x", padx=12, pady=(0, 4))
+        self._run_started = time.monotonic()
+
+        self.log = Text(master, height=24)
+        self.log.pack(fill="both", expand=True, padx=12, pady=(0, 12))
+
+        # 工作執行緒只把訊息與進度暫存起來，由主執行緒的 _poll_log 批次套用到畫面
+        self._ui_lock = threading.Lock()
+        self._pending_lines = []
+        self._pending_progress = None
+        self._log_file = None
+        self._poll_log()
+
+        self.working = False
+        self.lock_ui(False)
+
+    # ---------- UI helpers ----------
+    def lock_ui(self, busy: bool):
+        # 可由工作執行緒呼叫：狀態立即記下，按鈕的變更交給主執行緒（master.after）套用
+        self.working = busy
+        if busy:
+            self._run_started = time.monotonic()
+        self.master.after(0, self._apply_lock, busy)
+
+    def _apply_lock(self, busy: bool):
+        state = DISABLED if busy else NORMAL
+        self.btn_make.config(state=state)
+        self.btn_verify.config(state=state)
+        self.btn_compare.config(state=state)
+        self.btn_watch.config(state=NORMAL if self._watch_stop is not None else state)
+        self.verify_level.config(state=DISABLED if busy else "readonly")
+        # 優先權只能在執行開始時降低，執行中不可切換；限速欄位則隨時可調
+        self.chk_low_priority.config(state=state)
+
+    def log_write(self, msg: str):
+        ts = datetime.now().strftime("%H:%M:%S")
+        line = f"[{ts}] {msg}\n"
+        with self._ui_lock:
+            self._pending_lines.append(line)
+            if self._log_file is not None:
+                self._log_file.write(line)
+
+    def _poll_log(self):
+        with self._ui_lock:
+            lines, self._pending_lines = self._pending_lines, []
+            prog, self._pending_progress = self._pending_progress, None
+        if lines:
+            # 一次插入整批；超過畫面保留行數的部分只留在日誌檔
+            self.log.insert(END, "".join(lines[-LOG_VIEW_LINES:]))
+            # 內容以換行結尾，end-1c 落在最後的空行上，因此行數為其行號減 1
+            excess = int(self.log.index("end-1c").split(".")[0]) - 1 - LOG_VIEW_LINES
+            if excess > 0:
+                self.log.delete("1.0", f"{excess + 1}.0")
+            self.log.see(END)
+        if prog is not None:
+            value, maximum = prog
+            self.progress["maximum"] = max(1, maximum)
+            self.progress["value"] = value
+            # 進度以位元組計，依平均速度估計剩餘時間
+            text = ""
+            if self.working and maximum > 0:
+                text = f"{min(value / maximum, 1):.1%}"
+                eta = eta_seconds(value, maximum, time.monotonic() - self._run_started)
+                if eta is not None:
+                    text += f"　預估剩餘 {format_duration(eta)}"
+                if self.throttle.limited:
+                    text += f"　{self.throttle.status_text()}"
+            self.progress_text.config(text=text)
+        self.master.after(UI_INTERVAL_MS, self._poll_log)
+
+    def set_progress(self, value: int, maximum: int):
+        # 可由工作執行緒呼叫：只記下最新值，畫面更新交給 _poll_log
+        with self._ui_lock:
+            self._pending_progress = (value, maximum)
+
+    def on_apply_limits(self):
+        try:
+            mbps = float(self.limit_mbps.get() or 0)
+            iops = int(self.limit_iops.get() or 0)
+            concurrency = int(self.limit_concurrency.get() or 0)
+        except ValueError:
+            messagebox.showerror(APP_NAME, "限速設定必須是數字。")
+            return
+        self.throttle.set_limits(mb_per_s=mbps, iops=iops, concurrency=concurrency)
+        self.log_write(f"限速設定：讀取上限 {mbps:g} MB/s、每秒 {iops} 次讀取、同時讀取 {concurrency} 檔（0 = 不限）")
+
+    def _lower_priority(self):
+        # 在工作執行緒開頭呼叫：之後由它建立的雜湊執行緒都會繼承較低的優先權
+        if self.low_priority.get():
+            applied = lower_priority(LOW_PRIORITY or "be")
+            self.log_write(f"已降低優先權：{'、'.join(applied)}" if applied else "此平台不支援降低優先權")
+
+    def _open_run_log(self, kind: str):
+        """每次執行另存完整逐檔日誌（畫面只保留最後 LOG_VIEW_LINES 行）。"""
+        try:
+            os.makedirs(LOG_DIR, exist_ok=True)
+            path = os.path.join(LOG_DIR, f"{kind} {datetime.now().strftime('%Y%m%d %H%M%S')}.log")
+            f = open(path, "w", encoding="utf-8", buffering=1024 * 1024)
+        except OSError as e:
+            self.log_write(f"無法建立日誌檔：{e}")
+            return
+        with self._ui_lock:
+            self._log_file = f
+        self.log_write(f"完整日誌：{path}")
+
+    def _close_run_log(self):
+        with self._ui_lock:
+            f, self._log_file = self._log_file, None
+        if f is not None:
+            f.close()
+
+    def _ask_resume(self, folder: str, checkpoint_name: str) -> bool:
+        # 上次執行中斷時會留下檢查點，詢問是否接續
+        if not os.path.exists(os.path.join(folder, checkpoint_name)):
+            return False
+        return messagebox.askyesno(
+            APP_NAME,
+            "偵測到上次未完成的進度（檢查點）。\n\n"
+            "是：接續上次的進度（已完成且未變動的檔案不再重新讀取）\n"
+            "否：從頭開始"
+        )
+
+    # ---------- Actions ----------
+    def on_make_manifest(self):
+        folder = filedialog.askdirectory(title="選擇要建立 MD5 清單的資料夾")
+        if not folder:
+            return
+
+        resume = self._ask_resume(folder, MAKE_CHECKPOINT_NAME)
+        manifest_path = find_manifest(folder)
+
+        # 若清單已存在：詢問要增量更新或完整重建，並先嘗試自動備份
+        incremental = False
+        if manifest_path:
+            answer = messagebox.askyesnocancel(
+                APP_NAME,
+                f"偵測到此資料夾已存在 MD5 清單檔（{os.path.basename(manifest_path)}）。\n\n"
+                "是：更新清單（僅重新計算新增或變動的檔案）\n"
+                "否：全部重新產生並覆蓋\n"
+                "取消：保留既有清單"
+            )
+            if answer is None:
+                self.log_write("使用者取消：保留既有 _md5_manifest.json")
+                return
+            incremental = answer
+
+            # 覆蓋前自動備份 -> 先移除,感覺會讓使用者誤會
+            # try:
+            #     import shutil
+            #     bak_path = manifest_path + ".bak"
+            #     shutil.copy2(manifest_path, bak_path)
+            #     self.log_write("已建立清單備份：_md5_manifest.json.bak")
+            # except Exception as e:
+            #     # 備份失敗時再確認一次是否仍要覆蓋
+            #     proceed = messagebox.askyesno(
+            #         APP_NAME,
+            #         f"清單備份失敗：{e}\n\n是否仍要覆蓋舊清單？"
+            #     )
+            #     if not proceed:
+            #         self.log_write("使用者取消：因備份失敗，不覆蓋清單")
+            #         return
+
+        threading.Thread(
+            target=self._make_manifest_worker,
+            args=(folder, incremental, resume),
+            daemon=True
+        ).start()
+
+    def _make_manifest_worker(self, folder: str, incremental: bool = False, resume: bool = False):
+        if self.working:
+            return
+        self.lock_ui(True)
+        self._open_run_log("make")
+        self._lower_priority()
+        try:
+            result = make_manifest(folder, incremental=incremental, resume=resume, throttle=self.throttle,
+                                   log=self.log_write, progress=self.set_progress)
+            messagebox.showinfo(APP_NAME, f"清單建立完成：\n{result['manifest_path']}")
+        except Exception as e:
+            self.log_write(f"ERR {e}")
+            messagebox.showerror(APP_NAME, f"清單建立失敗：\n{e}")
+        finally:
+            self._close_run_log()
+            self.lock_ui(False)
+            self.set_progress(0, 1)
+
+    def on_watch_folder(self):
+        if self._watch_stop is not None:
+            self._watch_stop.set()
+            self.btn_watch.config(state=DISABLED)
+            self.log_write("停止監看中，寫入最後的清單…")
+            return
+        if self.working:
+            return
+        folder = filedialog.askdirectory(title="選擇要持續監看並自動更新清單的資料夾")
+        if not folder:
+            return
+        self._watch_stop = threading.Event()
+        threading.Thread(target=self._watch_folder_worker, args=(folder, self._watch_stop), daemon=True).start()
+
+    def _watch_folder_worker(self, folder: str, stop: threading.Event):
+        self.lock_ui(True)
+        self.master.after(0, lambda: self.btn_watch.config(text="■ 停止監看"))
+        self._open_run_log("watch")
+        self._lower_priority()
+        try:
+            result = watch_folder(folder, throttle=self.throttle, stop=stop, log=self.log_write,
+                                  progress=self.set_progress)
+            self.log_write(f"監看結束：共更新 {result['updated']} 筆、移除 {result['removed']} 筆，"
+                           f"清單：{result['manifest_path']}")
+        except Exception as e:
+            self.log_write(f"ERR {e}")
+            messagebox.showerror(APP_NAME, f"監看失敗：\n{e}")
+        finally:
+            self._watch_stop = None
+            self.master.after(0, lambda: self.btn_watch.config(text=WATCH_TEXT))
+            self._close_run_log()
+            self.lock_ui(False)
+            self.set_progress(0, 1)
+
+    def on_verify_manifest(self):
+        folder = filedialog.askdirectory(title="選擇要比對的根資料夾（含清單）")
+        if not folder:
+            return
+        level = list(VERIFY_LEVELS)[self.verify_level.current()]
+        resume = level != "meta" and self._ask_resume(folder, VERIFY_CHECKPOINT_NAME)
+        threading.Thread(target=self._verify_manifest_worker, args=(folder, level, resume), daemon=True).start()
+
+    def on_compare_folders(self):
+        source = filedialog.askdirectory(title="選擇來源資料夾（原始檔案）")
+        if not source:
+            return
+        dest = filedialog.askdirectory(title="選擇目的資料夾（複製或搬移後的檔案）")
+        if not dest:
+            return
+        if os.path.abspath(source) == os.path.abspath(dest):
+            messagebox.showerror(APP_NAME, "來源與目的不能是同一個資料夾。")
+            return
+        write_manifest = messagebox.askyesno(
+            APP_NAME,
+            "兩邊會同時讀取並比對，不需要先產生清單。\n\n"
+            "是否順便在來源資料夾寫出 MD5 清單檔？（來源端會讀取全部檔案）"
+        )
+        threading.Thread(target=self._compare_folders_worker, args=(source, dest, write_manifest),
+                         daemon=True).start()
+
+    # ---------- Workers ----------
+    def _verify_manifest_worker(self, folder: str, level: str = "full", resume: bool = False):
+        if self.working:
+            return
+        self.lock_ui(True)
+        self._open_run_log("verify")
+        self._lower_priority()
+        try:
+            if not find_manifest(folder):
+                # 兼容提示：若看到傳統 MD5SUMS.txt，仍請使用本工具產生 JSON 清單
+                alt = os.path.join(folder, "MD5SUMS.txt")
+                if os.path.exists(alt):
+                    messagebox.showwarning(
+                        APP_NAME,
+                        "偵測到 MD5SUMS.txt，但本工具預設使用 JSON 清單（_md5_manifest.json）。\n"
+                        "請先用「① 產生 MD5 清單檔」建立 JSON 清單後再比對。"
+                    )
+                    return
+
+                # 明確引導：回到來源機器用按鈕① 產生清單，並將清單檔放回此資料夾
+                messagebox.showerror(
+                    APP_NAME,
+                    "找不到清單檔：_md5_manifest.json\n\n"
+                    "請先在『原本的機器』上於來源資料夾執行按鈕①「產生 MD5 清單檔」，\n"
+                    "完成後將 _md5_manifest.json 與檔案一起搬移到目前的資料夾，再執行比對。"
+                )
+                return
+
+            result = verify_manifest(folder, level=level, resume=resume, throttle=self.throttle,
+                                     log=self.log_write, progress=self.set_progress)
+            self._show_verify_result(result)
+        except Exception as e:
+            self.log_write(f"ERR {e}")
+            messagebox.showerror(APP_NAME, f"比對失敗：\n{e}")
+        finally:
+            self._close_run_log()
+            self.lock_ui(False)
+            self.set_progress(0, 1)
+
+    def _compare_folders_worker(self, source: str, dest: str, write_manifest: bool = False):
+        if self.working:
+            return
+        self.lock_ui(True)
+        self._open_run_log("compare")
+        self._lower_priority()
+        try:
+            result = compare_folders(source, dest, write_manifest=write_manifest, throttle=self.throttle,
+                                     log=self.log_write, progress=self.set_progress)
+            self._show_verify_result(result)
+        except Exception as e:
+            self.log_write(f"ERR {e}")
+            messagebox.showerror(APP_NAME, f"比對失敗：\n{e}")
+        finally:
+            self._close_run_log()
+            self.lock_ui(False)
+            self.set_progress(0, 1)
+
+    def _show_verify_result(self, result: dict):
+        """顯示比對結果摘要並輸出檢測報告（verify 與直接比對共用）。"""
+        missing = result["missing"]
+        size_mismatch = result["size_mismatch"]
+        hash_mismatch = result["hash_mismatch"]
+        mtime_mismatch = result["mtime_mismatch"] or []
+        extras = result["extras"]
+        moved = [f"{m['from']} → {m['to']}" for m in result["moved"]]
+
+        details = []
+        if missing:
+            details.append(f"遺失 {len(missing)} 筆（僅列前 10）:\n  - " + "\n  - ".join(missing[:10]))
+        if size_mismatch:
+            details.append(f"大小不符 {len(size_mismatch)} 筆（前 10）:\n  - " + "\n  - ".join(size_mismatch[:10]))
+        if hash_mismatch:
+            details.append(f"MD5 不符 {len(hash_mismatch)} 筆（前 10）:\n  - " + "\n  - ".join(hash_mismatch[:10]))
+        if mtime_mismatch:
+            details.append(f"時間不符 {len(mtime_mismatch)} 筆（前 10）:\n  - " + "\n  - ".join(mtime_mismatch[:10]))
+        if extras:
+            details.append(f"多出 {len(extras)} 筆（前 10）:\n  - " + "\n  - ".join(extras[:10]))
+        if moved:
+            details.append(f"搬移／改名 {len(moved)} 筆（前 10）:\n  - " + "\n  - ".join(moved[:10]))
+
+        if has_failures(result):
+            messagebox.showerror(APP_NAME, "比對發現異常：\n\n" + ("\n\n".join(details) if details else ""))
+        elif extras or moved:
+            messagebox.showwarning(APP_NAME, "檔案內容皆通過，但資料夾有額外或搬移的檔案：\n\n" + ("\n\n".join(details) if details else ""))
+        else:
+            messagebox.showinfo(APP_NAME, "比對完成，全部通過。")
+
+        # 產出報告（PDF 或 TXT fallback）
+        report_path = generate_report(result, log=self.log_write)
+        self.log_write(f"已輸出檢測報告：{report_path}")
+        if REPORT_DETAIL:
+            # 完整明細（MD5_REPORT_DETAIL=csv / jsonl / html）
+            write_detail_report(result, REPORT_DETAIL, log=self.log_write)
+
+
+def main():
+    root = Tk()
+    try:
+        # Windows 上建議 .ico；這是「視窗左上角」的小圖示
+        root.iconbitmap(resource_path("Assets/Instant Icon.ico"))
+    except Exception as e:
+        print("iconbitmap 設定失敗：", e)
+    # 改用 ttk 風格
+    try:
+        style = ttk.Style()
+        if "vista" in style.theme_names():
+            style.theme_use("vista")
+        elif "clam" in style.theme_names():
+            style.theme_use("clam")
+    except Exception:
+        pass
+    app = Md5ToolGUI(root)
+    root.mainloop()
@@ -0,0 +1,352 @@
+import hashlib
+import importlib.util
+import mmap
+import os
+import threading
+import time
+from collections import deque
+
+from .blocks import BlockHasher
+from .constants import (
+    BLOCK_MIN_SIZE, CHUNK_SIZE, DEFAULT_ALGORITHMS, FADVISE_DONTNEED, HASH_USE_PROCESSES, HASH_WORKERS, MAX_CHUNK_SIZE,
+    MMAP_MIN_SIZE, PIPELINE_WINDOW, PROCESS_BATCH, SCHED_LOOKAHEAD, USE_MMAP,
+)
+from .scan import win_longpath
+
+_local = threading.local()
+
+
+def read_chunk_size(size: int) -> int:
+    """依檔案大小選擇讀取區塊：大檔用較大的區塊，減少系統呼叫與網路磁碟的往返次數。"""
+    if size < 64 * 1024 * 1024:
+        return CHUNK_SIZE
+    if size < 1024 * 1024 * 1024:
+        return 4 * CHUNK_SIZE
+    return MAX_CHUNK_SIZE
+
+def _read_buffer(size: int) -> memoryview:
+    # 每個工作執行緒重複使用同一塊緩衝區，避免每次 read 都配置新的 bytes
+    view = getattr(_local, "view", None)
+    if view is None or len(view) < size:
+        view = memoryview(bytearray(size))
+        _local.view = view
+    return view
+
+def _fadvise(fd: int, advice_name: str):
+    # Linux：SEQUENTIAL 讓核心加大預讀；DONTNEED 讀完後釋放快取，避免比對時擠掉其他服務的 page cache
+    advice = getattr(os, advice_name, None)
+    if advice is not None and hasattr(os, "posix_fadvise"):
+        try:
+            os.posix_fadvise(fd, 0, 0, advice)
+        except OSError:
+            pass
+
+def _hash_mmap(hashers: list, fd: int, size: int):
+    with mmap.mmap(fd, 0, access=mmap.ACCESS_READ) as mm:
+        if hasattr(mm, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        view = memoryview(mm)
+        try:
+            step = MAX_CHUNK_SIZE
+            for off in range(0, size, step):
+                piece = view[off:off + step]
+                for h in hashers:
+                    h.update(piece)
+        finally:
+            view.release()
+
+# ---------- 演算法 ----------
+def available_algorithms() -> list:
+    """可用的演算法：hashlib 內建者，加上已安裝 xxhash 時的 xxh 系列。"""
+    algs = ["md5", "sha1", "sha256", "blake2b"]
+    if importlib.util.find_spec("xxhash") is not None:
+        algs += ["xxh64", "xxh3_64", "xxh128"]
+    return algs
+
+def new_hasher(alg: str):
+    if alg in ("md5", "sha1", "sha256"):
+        return hashlib.new(alg)
+    if alg == "blake2b":
+        return hashlib.blake2b()
+    if alg.startswith("xxh"):
+        try:
+            import xxhash
+        except ImportError:
+            raise RuntimeError(f"{alg} 需要安裝 xxhash 套件（pip install xxhash）")
+        return getattr(xxhash, alg)()
+    raise ValueError(f"不支援的演算法：{alg}")
+
+def normalize_algorithms(algorithms) -> tuple:
+    """md5 一律計算（清單的主要欄位），其餘依輸入順序去重。"""
+    out = ["md5"]
+    for a in algorithms or ():
+        a = a.strip().lower()
+        if a and a not in out:
+            new_hasher(a)  # 先確認可用
+            out.append(a)
+    return tuple(out)
+
+# 比對時的偏好順序（一般 x86-64 / ARM64 上由快到慢）：固定排名而不在執行時實測，
+# 同一份清單每次都以同一種雜湊比對（實測時速度相近的 sha1 / sha256 會隨執行而互換）
+_SPEED_ORDER = ("xxh3_64", "xxh128", "xxh64", "sha1", "sha256", "blake2b", "md5")
+
+def fastest_algorithm(candidates) -> str:
+    """從候選演算法中依 _SPEED_ORDER 挑出最快、且本機可用的一個；結果只取決於候選清單。"""
+    usable = []
+    for alg in candidates:
+        try:
+            new_hasher(alg)
+        except (RuntimeError, ValueError):
+            continue
+        rank = _SPEED_ORDER.index(alg) if alg in _SPEED_ORDER else len(_SPEED_ORDER)
+        usable.append((rank, alg))
+    if not usable:
+        raise RuntimeError("清單中沒有本機可用的雜湊演算法")
+    return min(usable)[1]
+
+# ---------- 單檔 ----------
+def hash_file(path: str, algorithms=DEFAULT_ALGORITHMS, use_mmap: bool = USE_MMAP, throttle=None,
+              block_size: int = 0) -> dict:
+    """
+    讀取檔案一次，同時計算多種雜湊，回傳 {演算法: 十六進位字串}。
+    throttle（throttle.Throttle）不為 None 時每次讀取都計入限速，限速中的大檔改用 1 MB 區塊、不使用 mmap，讓讀取較平均。
+    block_size 不為 0 且檔案不小於 BLOCK_MIN_SIZE 時，回傳值另含 "blocks"：每 block_size 一段的 MD5 清單（見 blocks.py）。
+    """
+    hashers = [new_hasher(a) for a in algorithms]
+    with open(win_longpath(path), "rb", buffering=0) as f:
+        readinto = f.readinto
+        if throttle is not None:
+            raw_readinto = readinto
+
+            def readinto(buf):
+                n = raw_readinto(buf)
+                if n:
+                    throttle.consume(n)
+                return n
+
+        view = _read_buffer(CHUNK_SIZE)[:CHUNK_SIZE]
+        n = readinto(view)
+        if n < CHUNK_SIZE:
+            # 小檔快速路徑：一次讀完，不多做 fstat / fadvise
+            while n:
+                piece = view[:n]
+                for h in hashers:
+                    h.update(piece)
+                n = readinto(view)
+            return {a: h.hexdigest() for a, h in zip(algorithms, hashers)}
+
+        # 大檔：依大小調整區塊（或改用 mmap），並提示核心循序讀取
+        for h in hashers:
+            h.update(view)
+        fd = f.fileno()
+        size = os.fstat(fd).st_size
+        _fadvise(fd, "POSIX_FADV_SEQUENTIAL")
+        blocks = None
+        if block_size and size >= BLOCK_MIN_SIZE:
+            blocks = BlockHasher(block_size)
+            blocks.update(view)
+        limited = throttle is not None and throttle.limited
+        if use_mmap and size >= MMAP_MIN_SIZE and not limited and blocks is None:
+            hashers = [new_hasher(a) for a in algorithms]
+            _hash_mmap(hashers, fd, size)
+        else:
+            chunk = CHUNK_SIZE if limited else read_chunk_size(size)
+            view = _read_buffer(chunk)[:chunk]
+            helper = None
+            if blocks is not None:
+                # 分塊 MD5 在另一個執行緒與整檔雜湊同時計算（hashlib 計算時會釋放 GIL），不拖慢循序讀取
+                from concurrent.futures import ThreadPoolExecutor
+                helper = ThreadPoolExecutor(max_workers=1, thread_name_prefix="md5-block")
+            try:
+                while True:
+                    n = readinto(view)
+                    if not n:
+                        break
+                    piece = view[:n]
+                    fut = helper.submit(blocks.update, piece) if helper is not None else None
+                    for h in hashers:
+                        h.update(piece)
+                    if fut is not None:
+                        fut.result()
+            finally:
+                if helper is not None:
+                    helper.shutdown()
+        if FADVISE_DONTNEED:
+            _fadvise(fd, "POSIX_FADV_DONTNEED")
+    digests = {a: h.hexdigest() for a, h in zip(algorithms, hashers)}
+    if blocks is not None:
+        digests["blocks"] = blocks.finish()
+    return digests
+
+def md5_of_file(path: str, use_mmap: bool = USE_MMAP) -> str:
+    return hash_file(path, ("md5",), use_mmap)["md5"]
+
+# ---------- 平行引擎 ----------
+def _hash_or_error(path: str, algorithms, throttle=None, block_size: int = 0):
+    # 回傳 (digests, error, 讀檔＋計算秒數)；限速時先取得同時讀取名額，秒數包含限速的暫停時間
+    # path 為 None 的是直接帶過的項目（見 hash_files）
+    if path is None:
+        return None, None, 0.0
+    if throttle is None:
+        return _timed_hash(path, algorithms, None, block_size)
+    with throttle.slot():
+        return _timed_hash(path, algorithms, throttle, block_size)
+
+def _timed_hash(path: str, algorithms, throttle, block_size: int):
+    t = time.perf_counter()
+    try:
+        return hash_file(path, algorithms, throttle=throttle, block_size=block_size), None, time.perf_counter() - t
+    except Exception as e:
+        return None, e, time.perf_counter() - t
+
+def _hash_batch(paths: list, algorithms, block_size: int = 0) -> list:
+    # 行程池用：一次處理一批，攤平跨行程傳遞的成本
+    return [_hash_or_error(p, algorithms, None, block_size) for p in paths]
+
+def hash_files(paths, workers: int = HASH_WORKERS, use_processes: bool = HASH_USE_PROCESSES,
+               algorithms=DEFAULT_ALGORITHMS, timed: bool = False, throttle=None, block_size: int = 0):
+    """
+    平行計算多個檔案的雜湊（每檔只讀一次），依輸入順序逐一 yield (path, digests, error)。
+    成功時 digests 為 {演算法: 十六進位字串}、error 為 None；失敗時 digests 為 None，error 為該檔案的例外。
+    timed=True 時改為 yield (path, digests, error, 秒數)，秒數為該檔案讀取＋計算所花的時間。
+    送出的工作數有上限，paths 可為惰性的 iterator。
+    paths 中的 None 不讀檔，依序產生 (None, None, None)；呼叫端可讓每個項目都對應一筆結果，
+    與另一份依同順序走的 iterator 同步前進（不需計算的項目也不必另外暫存），
+    此時最多預先取用 PIPELINE_WINDOW 筆，其中需讀檔者仍以 workers * 4 為上限。
+    throttle 不為 None 時一律使用執行緒池（限速器需在同一行程內共用，執行中才能調整）。
+    block_size 見 hash_file，分塊 MD5 放在 digests["blocks"]。
+    """
+    algorithms = tuple(algorithms)
+    n = 3 if timed else 2
+    if workers <= 1:
+        for p in paths:
+            yield (p,) + _hash_or_error(p, algorithms, throttle, block_size)[:n]
+        return
+
+    window = workers * 4
+    pending = deque()
+
+    # 執行緒池／行程池延遲載入（concurrent.futures 會連帶載入 logging、multiprocessing）
+    if use_processes and throttle is None:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as ex:
+            def flush(batch):
+                pending.append((batch, ex.submit(_hash_batch, batch, algorithms, block_size)))
+
+            batch = []
+            for p in paths:
+                batch.append(p)
+                if len(batch) >= PROCESS_BATCH:
+                    flush(batch)
+                    batch = []
+                while len(pending) >= window:
+                    done_batch, fut = pending.popleft()
+                    for bp, res in zip(done_batch, fut.result()):
+                        yield (bp,) + res[:n]
+            if batch:
+                flush(batch)
+            while pending:
+                done_batch, fut = pending.popleft()
+                for bp, res in zip(done_batch, fut.result()):
+                    yield (bp,) + res[:n]
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+    skipped = _done_future((None, None, 0.0))
+    busy = 0
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="md5") as ex:
+        for p in paths:
+            if p is None:
+                pending.append((p, skipped))
+            else:
+                pending.append((p, ex.submit(_hash_or_error, p, algorithms, throttle, block_size)))
+                busy += 1
+            while busy >= window or len(pending) >= PIPELINE_WINDOW:
+                done_p, fut = pending.popleft()
+                busy -= done_p is not None
+                yield (done_p,) + fut.result()[:n]
+        while pending:
+            done_p, fut = pending.popleft()
+            yield (done_p,) + fut.result()[:n]
+
+def _done_future(result):
+    from concurrent.futures import Future
+    fut = Future()
+    fut.set_result(result)
+    return fut
+
+def hash_records(records, workers: int = HASH_WORKERS, use_processes: bool = HASH_USE_PROCESSES,
+                 algorithms=DEFAULT_ALGORITHMS, timed: bool = False, device_limits: dict = None, throttle=None,
+                 block_size: int = 0):
+    """
+    與 hash_files 相同，但輸入為掃描結果（FileRecord），依所在裝置（st_dev）排程讀取：
+    每個裝置一個執行緒池，大小為該裝置同時讀取的上限（見 devices.device_limit）；
+    傳統硬碟的檔案各自累積到 SCHED_LOOKAHEAD 筆，即依 inode 遞增的順序整批送出，減少來回尋軌；
+    每顆硬碟各自送出，不必等到排在前面的其他裝置的檔案取走結果，上一批讀取時下一批已在累積。
+    跨多個裝置的樹各裝置同時進行，輸出仍依輸入順序。使用行程池時不做裝置排程，直接交給 hash_files。
+    throttle 的頻寬與同時讀取上限是所有裝置合計，與各裝置的上限同時生效；設定 throttle 時不使用行程池。
+    records 中的 None 直接帶過，同 hash_files 的 paths。
+    """
+    if use_processes and throttle is None:
+        yield from hash_files((r.path if r is not None else None for r in records), workers, True, algorithms, timed,
+                              block_size=block_size)
+        return
+    from concurrent.futures import ThreadPoolExecutor
+    from .devices import device_limit
+
+    algorithms = tuple(algorithms)
+    n = 3 if timed else 2
+    pools = {}       # dev -> 執行緒池
+    by_inode = set()  # 依 inode 排序讀取的裝置（傳統硬碟）
+    held = {}        # dev -> 尚未送出的 [path, future, dev, inode]
+    window = deque()
+    cap = workers * 4  # 每多一顆傳統硬碟，再多預先取用 SCHED_LOOKAHEAD 筆
+    busy = [0]       # window 中需讀檔的項目數
+    skipped = _done_future((None, None, 0.0))
+
+    def flush(dev):
+        # 每個池依送出順序執行，排序後送出即為讀取順序
+        slots = held.pop(dev)
+        slots.sort(key=lambda slot: slot[3])
+        for slot in slots:
+            slot[1] = pools[dev].submit(_hash_or_error, slot[0], algorithms, throttle, block_size)
+
+    def pop_result():
+        slot = window.popleft()
+        if slot[0] is not None:
+            busy[0] -= 1
+        if slot[1] is None:
+            flush(slot[2])
+        return (slot[0],) + slot[1].result()[:n]
+
+    try:
+        for rec in records:
+            if rec is None:
+                window.append([None, skipped, None, 0])
+                if len(window) >= PIPELINE_WINDOW:
+                    yield pop_result()
+                continue
+            pool = pools.get(rec.dev)
+            if pool is None:
+                limit, ordered = device_limit(rec.dev, workers, device_limits)
+                pool = pools[rec.dev] = ThreadPoolExecutor(max_workers=limit, thread_name_prefix="md5")
+                if ordered:
+                    by_inode.add(rec.dev)
+                    cap += SCHED_LOOKAHEAD
+            slot = [rec.path, None, rec.dev, rec.ino or 0]
+            if rec.dev in by_inode:
+                slots = held.setdefault(rec.dev, [])
+                slots.append(slot)
+                if len(slots) >= SCHED_LOOKAHEAD:
+                    flush(rec.dev)
+            else:
+                slot[1] = pool.submit(_hash_or_error, rec.path, algorithms, throttle, block_size)
+            window.append(slot)
+            busy[0] += 1
+            while busy[0] >= cap or len(window) >= PIPELINE_WINDOW:
+                yield pop_result()
+        while window:
+            yield pop_result()
+    finally:
+        for pool in pools.values():
+            pool.shutdown(wait=True, cancel_futures=True)
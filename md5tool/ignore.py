@@ -0,0 +1,119 @@
+"""
+.md5ignore：gitignore 風格的排除規則。
+
+每行一個樣式，# 開頭為註解，! 開頭為重新納入；結尾 / 只比對資料夾；
+開頭或中間含 / 的樣式從根目錄比對，否則比對任何層級的名稱；* ? [...] 不跨越 /，** 可跨越多層。
+被排除的資料夾在走訪時直接略過，不會列出其內容。
+"""
+import os
+import re
+
+from .constants import IGNORE_FILE
+
+
+def _translate(pat: str) -> str:
+    """把單一 glob 樣式（已去掉 ! 與結尾 /）轉成 regex 片段。"""
+    out = []
+    i, n = 0, len(pat)
+    while i < n:
+        c = pat[i]
+        if c == "*":
+            if pat.startswith("**", i):
+                # a/**/b 可比對 a/b；結尾 /** 比對其下所有內容
+                if pat.startswith("**/", i):
+                    out.append("(?:.*/)?")
+                    i += 3
+                else:
+                    out.append(".*")
+                    i += 2
+                continue
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            j = pat.find("]", i + 2 if pat.startswith("[!", i) or pat.startswith("[^", i) else i + 1)
+            if j < 0:
+                out.append(re.escape(c))
+            else:
+                body = pat[i + 1:j]
+                if body[:1] in ("!", "^"):
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = j + 1
+                continue
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pat[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+def parse_patterns(text: str) -> list:
+    """從 .md5ignore 內容取出有效樣式（去掉註解、空行與結尾空白），保留原本順序。"""
+    patterns = []
+    for line in text.splitlines():
+        line = line.rstrip()
+        if line.endswith("\\") and not line.endswith("\\\\"):
+            line += " "  # 以 \ 跳脫的結尾空白
+        if not line or line.startswith("#"):
+            continue
+        patterns.append(line)
+    return patterns
+
+
+class IgnoreRules:
+    """
+    編譯好的排除規則：建立時把所有樣式轉成 regex，之後每個路徑只需一次比對。
+    沒有 ! 樣式時合併成單一 regex；有 ! 時依 gitignore 規則由後往前，最後符合的樣式決定結果。
+    """
+
+    def __init__(self, patterns=()):
+        self.patterns = list(patterns)
+        self._rules = []  # (regex, 只比對資料夾, 是否為 ! 重新納入)
+        for p in self.patterns:
+            negate = p.startswith("!")
+            if negate or p.startswith("\\!") or p.startswith("\\#"):
+                p = p[1:]
+            dir_only = p.endswith("/")
+            p = p.rstrip("/")
+            if not p:
+                continue
+            anchored = "/" in p
+            body = _translate(p.lstrip("/"))
+            regex = ("" if anchored else "(?:.*/)?") + body
+            self._rules.append((regex, dir_only, negate))
+        self._negations = any(neg for _, _, neg in self._rules)
+        if self._negations:
+            self._compiled = [(re.compile(r + r"\Z", re.S), d, neg) for r, d, neg in self._rules]
+        else:
+            self._file_re = self._combine([r for r, d, _ in self._rules if not d])
+            self._dir_re = self._combine([r for r, _, _ in self._rules])
+
+    @staticmethod
+    def _combine(regexes):
+        return re.compile("(?:" + "|".join(regexes) + r")\Z", re.S) if regexes else None
+
+    def __bool__(self):
+        return bool(self._rules)
+
+    def ignored(self, rel: str, is_dir: bool = False) -> bool:
+        """rel 為以 / 分隔的相對路徑。"""
+        if not self._negations:
+            regex = self._dir_re if is_dir else self._file_re
+            return regex is not None and regex.match(rel) is not None
+        for regex, dir_only, negate in reversed(self._compiled):
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel):
+                return not negate
+        return False
+
+def load_ignore_rules(folder: str) -> IgnoreRules:
+    """讀取 folder 根目錄的 .md5ignore；不存在時回傳空規則。"""
+    path = os.path.join(folder, IGNORE_FILE)
+    try:
+        with open(path, "r", encoding="utf-8-sig") as f:
+            return IgnoreRules(parse_patterns(f.read()))
+    except FileNotFoundError:
+        return IgnoreRules()
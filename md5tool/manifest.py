@@ -0,0 +1,514 @@
+import gzip
+import io
+import json
+import os
+import re
+import struct
+from collections import namedtuple
+
+from .constants import MANIFEST_FORMATS
+from .merkle import DIR_DIGEST, DirectoryHasher
+
+# 清單項目；md5 為 32 字元十六進位字串，舊版清單缺少的欄位為 None
+# hashes 為 md5 以外的雜湊 {演算法: 十六進位字串}，JSON 中與 md5 並列為同層欄位
+# blocks 為大檔每 block_size（見檔頭）一段的 MD5 清單，只有啟用分塊雜湊且檔案夠大時才有（見 blocks.py）
+Entry = namedtuple("Entry", "path md5 size mtime mtime_ns inode hashes blocks",
+                   defaults=(None, None, None, None, None))
+
+# md5 以外可存入清單的演算法與其摘要長度（bytes）
+DIGEST_SIZES = {"md5": 16, "sha1": 20, "sha256": 32, "blake2b": 64, "xxh64": 8, "xxh3_64": 8, "xxh128": 16}
+
+# 二進位格式：檔頭 magic + uint32 檔頭 JSON 長度 + 檔頭 JSON，之後每筆為
+# uint16 路徑長度、uint64 size、int64 mtime_ns、uint64 inode、16 bytes MD5、其他摘要、UTF-8 路徑；
+# 路徑長度為 _BIN_TRAILER 的紀錄是結尾資訊，size 欄位為其後 JSON 的長度；
+# 路徑長度為 _BIN_BLOCKS 的紀錄是下一筆項目的分塊 MD5，size 欄位為其後原始摘要（每塊 16 bytes）的長度
+_BIN_MAGIC = b"MD5TOOL\x01"
+_BIN_RECORD = struct.Struct("<HQqQ16s")
+_BIN_TRAILER = 0xFFFF
+_BIN_BLOCKS = 0xFFFE
+_JSONL_FORMAT = "md5tool-jsonl"
+
+
+def entry_from_dict(d: dict) -> Entry:
+    hashes = {a: d[a] for a in DIGEST_SIZES if a != "md5" and d.get(a)}
+    return Entry(
+        path=d["path"],
+        md5=d.get("md5", ""),
+        size=int(d.get("size", -1)),
+        mtime=d.get("mtime"),
+        mtime_ns=d.get("mtime_ns"),
+        inode=d.get("inode"),
+        hashes=hashes or None,
+        blocks=d.get("blocks"),
+    )
+
+def entry_to_dict(e: Entry) -> dict:
+    d = {k: v for k, v in e._asdict().items() if v is not None and k != "hashes"}
+    if e.hashes:
+        d.update(e.hashes)
+    return d
+
+def entry_digests(e: Entry) -> dict:
+    """項目中所有雜湊值 {演算法: 十六進位字串}。"""
+    d = {"md5": e.md5} if e.md5 else {}
+    if e.hashes:
+        d.update(e.hashes)
+    return d
+
+def make_entry(rec, digests: dict) -> Entry:
+    """由掃描結果（FileRecord）與雜湊值 {演算法: 十六進位字串} 建立清單項目；digests 的 "blocks" 為分塊 MD5。"""
+    hashes = {a: v for a, v in digests.items() if a not in ("md5", "blocks")}
+    return Entry(rec.rel, digests["md5"], rec.size, rec.mtime_ns // 1_000_000_000, rec.mtime_ns, rec.ino,
+                 hashes or None, digests.get("blocks"))
+
+def manifest_algorithms(header: dict) -> list:
+    # 舊版清單只有 "algorithm": "md5"
+    return list(header.get("algorithms") or [header.get("algorithm", "md5")])
+
+def entry_unchanged(entry: Entry, rec) -> bool:
+    """
+    判斷舊清單項目與目前檔案（FileRecord）是否一致，一致即可沿用舊雜湊。
+    有 mtime_ns / inode 時以其為準；舊版清單只有秒級 mtime 則退回比對秒數。
+    """
+    if not entry or not entry.md5:
+        return False
+    if entry.size != rec.size:
+        return False
+    if entry.mtime_ns is not None:
+        if int(entry.mtime_ns) != rec.mtime_ns:
+            return False
+    elif entry.mtime is None or int(entry.mtime) != rec.mtime_ns // 1_000_000_000:
+        return False
+    if entry.inode and rec.ino and int(entry.inode) != rec.ino:
+        return False
+    return True
+
+def mtime_matches(entry: Entry, rec) -> bool:
+    # 跨機器複製時 inode 必然不同，比對只看修改時間；舊版清單只有秒級 mtime
+    if entry.mtime_ns is not None:
+        return int(entry.mtime_ns) == rec.mtime_ns
+    if entry.mtime is not None:
+        return int(entry.mtime) == rec.mtime_ns // 1_000_000_000
+    return True
+
+# ---------- 格式判斷與壓縮 ----------
+def manifest_format(path: str) -> str:
+    """由檔名判斷清單格式，回傳 MANIFEST_FORMATS 的鍵。"""
+    bn = os.path.basename(path)
+    for fmt, name in MANIFEST_FORMATS.items():
+        if bn == name:
+            return fmt
+    lower = bn.lower()
+    for suffix, fmt in ((".jsonl.gz", "jsonl.gz"), (".jsonl.zst", "jsonl.zst"), (".jsonl", "jsonl"),
+                        (".md5b.gz", "bin.gz"), (".md5b.zst", "bin.zst"), (".md5b", "bin")):
+        if lower.endswith(suffix):
+            return fmt
+    return "json"
+
+def manifest_path_for(folder: str, fmt: str = "json") -> str:
+    if fmt not in MANIFEST_FORMATS:
+        raise ValueError(f"未知的清單格式：{fmt}")
+    return os.path.join(folder, MANIFEST_FORMATS[fmt])
+
+def partial_path_for(manifest_path: str) -> str:
+    """寫入中的暫存清單路徑：_md5_manifest.json -> _md5_manifest.partial.json（格式判斷不受影響）。"""
+    folder, name = os.path.split(manifest_path)
+    return os.path.join(folder, name.replace(".", ".partial.", 1))
+
+def find_manifest(folder: str):
+    """找出資料夾內的清單檔（任一格式）；有多個時取最新的，找不到回傳 None。"""
+    found = []
+    for name in MANIFEST_FORMATS.values():
+        p = os.path.join(folder, name)
+        try:
+            found.append((os.path.getmtime(p), p))
+        except OSError:
+            pass
+    if not found:
+        return None
+    return max(found)[1]
+
+def _open_binary(path: str, mode: str):
+    # mode 為 "rb" 或 "wb"；依副檔名套用 gzip / zstd
+    fmt = manifest_format(path)
+    if fmt.endswith(".gz"):
+        return gzip.open(path, mode, compresslevel=6)
+    if fmt.endswith(".zst"):
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError("讀寫 .zst 清單需要安裝 zstandard 套件（pip install zstandard）")
+        raw = open(path, mode)
+        if mode == "rb":
+            return zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return zstandard.ZstdCompressor(level=3).stream_writer(raw, closefd=True)
+    return open(path, mode)
+
+# ---------- 寫入 ----------
+class ManifestWriter:
+    """
+    逐筆寫入清單，不需先把全部項目留在記憶體。
+    json 格式輸出與舊版 save_manifest 相同的 _md5_manifest.json 結構。
+    trailer 為寫完所有項目後才知道的檔頭欄位（例如執行統計），於 close() 時寫在清單結尾，
+    讀取時併入 header。結尾另會寫入各資料夾的摘要（dirs，見 merkle.py），close() 後也可由 dir_digests 取得；
+    摘要需依走訪順序或路徑排序寫入項目，順序不符時不寫 dirs（dir_digests 為 None）。
+    """
+
+    def __init__(self, path: str, header: dict):
+        self.path = path
+        self.format = manifest_format(path)
+        self.count = 0
+        self.trailer = None
+        self.dir_digests = None
+        self._dirs = DirectoryHasher()
+        self._f = _open_binary(path, "wb")
+        if self.format == "json":
+            self._text = io.TextIOWrapper(self._f, encoding="utf-8", newline="\n")
+            head = json.dumps(dict(header, entries=[]), ensure_ascii=False, indent=2)
+            # 去掉結尾的 "[]\n}"，留下 "entries": [ 之後逐筆附加
+            self._text.write(head[:head.rindex("[]")] + "[")
+        elif self.format.startswith("jsonl"):
+            self._text = io.TextIOWrapper(self._f, encoding="utf-8", newline="\n")
+            self._text.write(json.dumps(dict(header, format=_JSONL_FORMAT, version=1), ensure_ascii=False) + "\n")
+        else:
+            self._text = None
+            # md5 以外的摘要依檔頭 algorithms 的順序接在每筆 16 bytes MD5 之後；全為 0 表示缺值
+            self._extra_algs = [a for a in manifest_algorithms(header) if a != "md5"]
+            hb = json.dumps(header, ensure_ascii=False).encode("utf-8")
+            self._f.write(_BIN_MAGIC + struct.pack("<I", len(hb)) + hb)
+
+    def write(self, entry: Entry):
+        if self.format == "json":
+            body = json.dumps(entry_to_dict(entry), ensure_ascii=False, indent=2)
+            sep = "," if self.count else ""
+            self._text.write(sep + "\n    " + body.replace("\n", "\n    "))
+        elif self._text is not None:
+            self._text.write(json.dumps(entry_to_dict(entry), ensure_ascii=False, separators=(",", ":")) + "\n")
+        else:
+            pb = entry.path.encode("utf-8")
+            if len(pb) >= _BIN_BLOCKS:
+                raise ValueError(f"路徑過長，無法寫入二進位清單：{entry.path[:80]}…")
+            mtime_ns = entry.mtime_ns if entry.mtime_ns is not None else int(entry.mtime or 0) * 1_000_000_000
+            extra = b"".join(
+                bytes.fromhex((entry.hashes or {}).get(a) or "00" * DIGEST_SIZES[a]) for a in self._extra_algs
+            )
+            if entry.blocks:
+                raw = b"".join(bytes.fromhex(h) for h in entry.blocks)
+                self._f.write(_BIN_RECORD.pack(_BIN_BLOCKS, len(raw), 0, 0, b"\0" * 16) + b"\0" * len(extra) + raw)
+            self._f.write(_BIN_RECORD.pack(len(pb), entry.size, mtime_ns, entry.inode or 0,
+                                           bytes.fromhex(entry.md5)) + extra + pb)
+        self._dirs.add(entry.path, entry.size, entry.md5)
+        self.count += 1
+
+    def close(self):
+        if self._f is None:
+            return
+        self.dir_digests = self._dirs.digests()
+        trailer = dict(self.trailer or {})
+        if self.dir_digests is not None:
+            trailer.update(dirs_algorithm=DIR_DIGEST, dirs=self.dir_digests)
+        if self.format == "json":
+            self._text.write("\n  ]" if self.count else "]")
+            for k, v in trailer.items():
+                body = json.dumps(v, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+                self._text.write(f",\n  {json.dumps(k)}: {body}")
+            self._text.write("\n}")
+        else:
+            if self._text is not None:
+                self._text.write(json.dumps(trailer, ensure_ascii=False) + "\n")
+            else:
+                tb = json.dumps(trailer, ensure_ascii=False).encode("utf-8")
+                extra = b"\0" * sum(DIGEST_SIZES[a] for a in self._extra_algs)
+                self._f.write(_BIN_RECORD.pack(_BIN_TRAILER, len(tb), 0, 0, b"\0" * 16) + extra + tb)
+        if self._text is not None:
+            self._text.close()
+        else:
+            self._f.close()
+        self._f = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# ---------- 讀取 ----------
+_JSON_WS = re.compile(r"[ \t\n\r]*")
+_JSON_DECODER = json.JSONDecoder()
+_JSON_NUMBER_CHARS = frozenset("0123456789+-.eE")
+_JSON_ENDS_WITH_ENTRIES = re.compile(rb"\]\s*\}\s*$")
+_JSON_TAIL_MAX = 16 * 1024 * 1024  # 結尾資訊（主要是資料夾摘要）超過此大小時改為逐筆略過項目
+
+
+class _JsonStream:
+    """以 raw_decode 逐個解析 JSON 值的文字緩衝區，不足時再從檔案補讀（每次至少加倍，避免大值反覆重試）。"""
+
+    def __init__(self, f):
+        self.f = f
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        chunk = self.f.read(max(1 << 20, len(self.buf) - self.pos))
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            self.pos = _JSON_WS.match(self.buf, self.pos).end()
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, ch: str):
+        if self.peek() != ch:
+            raise ValueError(f"JSON 清單格式錯誤：預期 {ch!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                v, end = _JSON_DECODER.raw_decode(self.buf, self.pos)
+                # 數字被緩衝區結尾截斷時只會解析到一半（例如 "12" 之後才讀到 ".5"），
+                # 需確認其後已是數字以外的字元，否則再補讀
+                if (end < len(self.buf) and self.buf[end] not in _JSON_NUMBER_CHARS) or self.eof:
+                    self.pos = end
+                    return v
+            except ValueError:
+                if self.eof:
+                    raise
+            self._fill()
+
+def _json_members(js: _JsonStream, header: dict) -> bool:
+    # 讀取物件成員放入 header，直到遇到 entries（回傳 True）或物件結束（回傳 False）
+    while True:
+        ch = js.peek()
+        if ch == "}":
+            js.pos += 1
+            return False
+        if ch == ",":
+            js.pos += 1
+            continue
+        key = js.value()
+        js.expect(":")
+        if key == "entries":
+            return True
+        header[key] = js.value()
+
+def _read_json_stream(manifest_path: str):
+    """
+    逐筆解析 json 清單的 entries 陣列，不整份載入記憶體。
+    entries 之前的欄位立即放入 header，之後的欄位（結尾資訊）在 entries 讀完時併入。
+    """
+    f = open(manifest_path, "r", encoding="utf-8")
+    js = _JsonStream(f)
+    header = {}
+    try:
+        js.expect("{")
+        has_entries = _json_members(js, header)
+    except Exception:
+        f.close()
+        raise
+
+    def gen():
+        with f:
+            if not has_entries:
+                return
+            js.expect("[")
+            while True:
+                ch = js.peek()
+                if ch == "]":
+                    js.pos += 1
+                    break
+                if ch == ",":
+                    js.pos += 1
+                    continue
+                yield entry_from_dict(js.value())
+            _json_members(js, header)
+    return header, gen()
+
+def _json_tail(manifest_path: str):
+    # ManifestWriter 寫出的 json 清單在 entries 之後才接結尾資訊；由檔尾往前找 entries 的結尾，不解析各筆項目。
+    # 檔尾即為 entries 的 "]}"（舊版清單、沒有結尾資訊）時回傳 {}；最後 _JSON_TAIL_MAX 內找不到時回傳 None
+    with open(manifest_path, "rb") as f:
+        end = f.seek(0, 2)
+        f.seek(max(0, end - 64))
+        if _JSON_ENDS_WITH_ENTRIES.search(f.read()):
+            return {}
+        limit = min(end, _JSON_TAIL_MAX)
+        size = min(limit, 1 << 20)
+        while True:
+            f.seek(end - size)
+            tail = f.read(size)
+            i = tail.rfind(b"\n  ],\n  \"")
+            if i >= 0:
+                try:
+                    tail = json.loads(b"{" + tail[i + 5:])
+                except ValueError:
+                    return None
+                # 沒有項目時找到的是檔頭裡的清單欄位
+                return None if "entries" in tail else tail
+            if size == limit:
+                return None
+            size = min(limit, size * 4)
+
+def read_manifest_header(manifest_path: str) -> dict:
+    """
+    只讀取清單的檔頭與結尾資訊（algorithms、ignore、dirs 等），不建立各筆項目。
+    jsonl / 二進位格式依序略過項目（未壓縮的 jsonl 直接讀檔尾）；json 格式由檔尾取出結尾資訊
+    （舊版清單在 entries 之後沒有其他欄位，不必讀項目），找不到時才退回逐筆略過。
+    """
+    fmt = manifest_format(manifest_path)
+    if fmt == "json":
+        tail = _json_tail(manifest_path)
+        if tail is None:
+            # 結尾資訊過大：逐筆略過項目（串流解析，記憶體不隨項目數增加）
+            header, entries = _read_json_stream(manifest_path)
+            for _ in entries:
+                pass
+            return header
+        header = {}
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            js = _JsonStream(f)
+            js.expect("{")
+            _json_members(js, header)
+        header.update(tail)
+        return header
+
+    if fmt == "jsonl":
+        with open(manifest_path, "rb") as f:
+            header = json.loads(f.readline() or b"{}")
+            end = f.seek(0, 2)
+            size = min(end, 1 << 20)
+            while True:
+                f.seek(end - size)
+                lines = f.read(size).rstrip(b"\n").rsplit(b"\n", 1)
+                if len(lines) == 2 or size == end:
+                    break
+                size = min(end, size * 4)
+        last = json.loads(lines[-1] or b"{}")
+        if "path" not in last:
+            header.update(last)
+        return header
+    if fmt.startswith("jsonl"):
+        with io.TextIOWrapper(_open_binary(manifest_path, "rb"), encoding="utf-8") as text:
+            header = json.loads(text.readline() or "{}")
+            for line in text:
+                # 項目一律以 "path" 開頭（entry_to_dict 的欄位順序），不必解析
+                if line.strip() and not line.startswith('{"path"'):
+                    d = json.loads(line)
+                    if "path" not in d:
+                        header.update(d)
+        return header
+
+    f = _open_binary(manifest_path, "rb")
+    reader = f if isinstance(f, io.BufferedReader) else io.BufferedReader(f)
+    with reader:
+        if reader.read(len(_BIN_MAGIC)) != _BIN_MAGIC:
+            raise ValueError(f"不是有效的二進位清單：{manifest_path}")
+        (hlen,) = struct.unpack("<I", reader.read(4))
+        header = json.loads(reader.read(hlen).decode("utf-8"))
+        rsize = _BIN_RECORD.size + sum(DIGEST_SIZES[a] for a in manifest_algorithms(header) if a != "md5")
+        while True:
+            rec = reader.read(rsize)
+            if len(rec) < rsize:
+                break
+            plen, size = struct.unpack_from("<HQ", rec)
+            if plen == _BIN_TRAILER:
+                header.update(json.loads(reader.read(size).decode("utf-8")))
+            else:
+                reader.read(size if plen == _BIN_BLOCKS else plen)
+    return header
+
+def read_manifest(manifest_path: str, stream: bool = False):
+    """
+    開啟清單並回傳 (header, entries)，entries 為逐筆產生 Entry 的 iterator。
+    jsonl / 二進位格式為串流讀取；json 格式預設整份解析（較快），stream=True 則逐筆解析以節省記憶體。
+    串流讀取時，結尾資訊（ManifestWriter.trailer）在 entries 讀完時才會併入 header。
+    """
+    fmt = manifest_format(manifest_path)
+    if fmt == "json":
+        if stream:
+            return _read_json_stream(manifest_path)
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        raw_entries = data.pop("entries", [])
+        return data, (entry_from_dict(d) for d in raw_entries)
+
+    f = _open_binary(manifest_path, "rb")
+    if fmt.startswith("jsonl"):
+        text = io.TextIOWrapper(f, encoding="utf-8")
+        header = json.loads(text.readline() or "{}")
+
+        def gen():
+            with text:
+                for line in text:
+                    if line.strip():
+                        d = json.loads(line)
+                        if "path" in d:
+                            yield entry_from_dict(d)
+                        else:
+                            header.update(d)
+        return header, gen()
+
+    # 解壓串流的 read(n) 可能回傳不足 n bytes，統一包成 BufferedReader
+    reader = f if isinstance(f, io.BufferedReader) else io.BufferedReader(f)
+    if reader.read(len(_BIN_MAGIC)) != _BIN_MAGIC:
+        reader.close()
+        raise ValueError(f"不是有效的二進位清單：{manifest_path}")
+    (hlen,) = struct.unpack("<I", reader.read(4))
+    header = json.loads(reader.read(hlen).decode("utf-8"))
+
+    extra_algs = [(a, DIGEST_SIZES[a]) for a in manifest_algorithms(header) if a != "md5"]
+    extra_size = sum(n for _, n in extra_algs)
+
+    def gen():
+        rsize = _BIN_RECORD.size + extra_size
+        blocks = None
+        with reader:
+            while True:
+                rec = reader.read(rsize)
+                if len(rec) < rsize:
+                    break
+                plen, size, mtime_ns, inode, digest = _BIN_RECORD.unpack_from(rec)
+                if plen == _BIN_TRAILER:
+                    header.update(json.loads(reader.read(size).decode("utf-8")))
+                    continue
+                if plen == _BIN_BLOCKS:
+                    raw = reader.read(size)
+                    blocks = [raw[i:i + 16].hex() for i in range(0, len(raw), 16)]
+                    continue
+                hashes = {}
+                off = _BIN_RECORD.size
+                for a, n in extra_algs:
+                    raw = rec[off:off + n]
+                    if raw.count(0) != n:
+                        hashes[a] = raw.hex()
+                    off += n
+                path = reader.read(plen).decode("utf-8")
+                yield Entry(path, digest.hex(), size, mtime_ns // 1_000_000_000, mtime_ns, inode or None,
+                            hashes or None, blocks)
+                blocks = None
+    return header, gen()
+
+def iter_manifest(manifest_path: str):
+    """逐筆產生清單項目（Entry）。"""
+    return read_manifest(manifest_path)[1]
+
+def load_manifest(manifest_path: str):
+    # 相容舊介面：回傳含 entries（dict 清單）的完整結構
+    header, entries = read_manifest(manifest_path)
+    return dict(header, entries=[entry_to_dict(e) for e in entries])
+
+def save_manifest(manifest_path: str, data: dict):
+    header = {k: v for k, v in data.items() if k != "entries"}
+    with ManifestWriter(manifest_path, header) as w:
+        for d in data.get("entries", []):
+            w.write(entry_from_dict(d) if isinstance(d, dict) else d)
@@ -0,0 +1,141 @@
+"""
+資料夾摘要（Merkle tree）：每個資料夾的雜湊由其直接子項的名稱、大小與 MD5（子資料夾則為其摘要）算出，
+任一檔案變動都會一路改變到根目錄。兩份清單比對時，摘要相同的子樹可整棵略過。
+"""
+import hashlib
+
+DIR_DIGEST = "sha256"  # 資料夾摘要使用的演算法（清單的 dirs_algorithm 欄位）
+
+
+def parent_dir(rel: str) -> str:
+    """相對路徑所在的資料夾；根目錄為空字串。"""
+    return rel.rpartition("/")[0]
+
+def ancestors(rel: str):
+    """由近而遠產生 rel 的所有上層資料夾（最後為根目錄 ""）。"""
+    while rel:
+        rel = parent_dir(rel)
+        yield rel
+
+
+class DirectoryHasher:
+    """
+    逐筆加入檔案 (相對路徑, 大小, MD5)，最後以 digests() 取得所有資料夾的摘要。
+    輸入須為每個資料夾的子樹連續出現的順序（scan_tree 的走訪順序、或依路徑排序皆可）：
+    離開一個資料夾的子樹時即算出其摘要並釋放子項，記憶體只與目前路徑上各層的子項數成正比。
+    順序不符（已結束的資料夾又出現檔案）時無法得出正確摘要，digests() 回傳 None。
+    """
+
+    def __init__(self):
+        self._open = []    # 目前路徑上尚未結束的資料夾 [相對路徑, [子項的摘要行]]，由根目錄往下
+        self._done = {}    # 已結束的資料夾 -> 摘要
+        self._broken = False
+
+    def add(self, rel: str, size: int, md5: str):
+        if self._broken:
+            return
+        parent, _, name = rel.rpartition("/")
+        # 結束不在 parent 路徑上的資料夾
+        while self._open and not _contains(self._open[-1][0], parent):
+            self._close()
+        top = self._open[-1][0] if self._open else None
+        if top != parent:
+            # 由目前最深的資料夾往下開到 parent（根目錄也在此開啟）
+            parts = parent.split("/") if parent else []
+            depth = 0 if top is None else (top.count("/") + 1 if top else 0)
+            for d in ([""] if top is None else []) + ["/".join(parts[:i]) for i in range(depth + 1, len(parts) + 1)]:
+                if d in self._done:
+                    self._broken = True
+                    self._open = []
+                    return
+                self._open.append([d, []])
+        line = b"f\0" + name.encode("utf-8", "surrogateescape") + b"\0%d\0" % size + md5.lower().encode("ascii")
+        self._open[-1][1].append(line)
+
+    def _close(self):
+        d, lines = self._open.pop()
+        h = hashlib.new(DIR_DIGEST)
+        # 子項依名稱排序（略過開頭的類型）
+        for line in sorted(lines, key=lambda b: b[2:]):
+            h.update(line + b"\n")
+        self._done[d] = h.hexdigest()
+        if self._open:
+            name = d.rpartition("/")[2]
+            self._open[-1][1].append(b"d\0" + name.encode("utf-8", "surrogateescape") + b"\0"
+                                     + self._done[d].encode("ascii"))
+
+    def digests(self):
+        """回傳 {資料夾相對路徑: 十六進位摘要}，根目錄為 ""；沒有任何檔案時回傳 {}，輸入順序不符時回傳 None。"""
+        if self._broken:
+            return None
+        while self._open:
+            self._close()
+        return self._done
+
+def _contains(d: str, rel: str) -> bool:
+    # 資料夾 d 是否為 rel 本身或其上層
+    return not d or rel == d or rel.startswith(d + "/")
+
+def changed_subtrees(old: dict, new: dict) -> list:
+    """
+    由根目錄往下比對兩份資料夾摘要，回傳摘要不同（或只存在其中一邊）的資料夾，依路徑排序。
+    摘要相同的子樹不再往下看，花費只與變動的資料夾數成正比。
+    """
+    children = {}
+    for d in set(old) | set(new):
+        if d:
+            children.setdefault(parent_dir(d), []).append(d)
+    changed = []
+    stack = [""]
+    while stack:
+        d = stack.pop()
+        if old.get(d) == new.get(d):
+            continue
+        changed.append(d)
+        stack.extend(children.get(d, ()))
+    return sorted(changed)
+
+def rollup_paths(paths, totals: dict, limit: int = None) -> list:
+    """
+    把大量異常路徑收斂到最上層的資料夾：整個子樹的檔案都異常時只列該資料夾，否則往下展開；
+    直接位於某資料夾、但未整批收斂的檔案合併為一列。
+    totals 為 {資料夾: 其下（含子資料夾）檔案總數}。
+    回傳 [{"dir": 資料夾, "count": 異常數, "total": 檔案數, "whole": 是否整個子樹}]，依路徑排序。
+    """
+    counts = {}
+    direct = {}
+    for p in paths:
+        parent = parent_dir(p)
+        direct[parent] = direct.get(parent, 0) + 1
+        counts[parent] = counts.get(parent, 0) + 1
+        for d in ancestors(parent):
+            counts[d] = counts.get(d, 0) + 1
+    children = {}
+    for d in counts:
+        if d:
+            children.setdefault(parent_dir(d), []).append(d)
+
+    rows = []
+    stack = [""]
+    while stack:
+        d = stack.pop()
+        n = counts.get(d, 0)
+        if not n:
+            continue
+        total = totals.get(d, n)
+        if n >= total:
+            rows.append({"dir": d, "count": n, "total": total, "whole": True})
+            continue
+        if direct.get(d):
+            rows.append({"dir": d, "count": direct[d], "total": total, "whole": False})
+        stack.extend(children.get(d, ()))
+    rows.sort(key=lambda r: r["dir"])
+    return rows[:limit] if limit is not None else rows
+
+def directory_totals(paths, totals: dict = None) -> dict:
+    """計算 {資料夾: 其下（含子資料夾）檔案總數}，供 rollup_paths 使用；傳入 totals 時累加到其中。"""
+    totals = {} if totals is None else totals
+    for p in paths:
+        for d in ancestors(p):
+            totals[d] = totals.get(d, 0) + 1
+    return totals
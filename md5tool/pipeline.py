@@ -0,0 +1,66 @@
+import queue
+import threading
+
+_END = object()
+BATCH = 256  # 每次放入佇列的項目數，降低百萬筆時的佇列開銷
+
+
+class _Failure:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+class BackgroundIterator:
+    """
+    在背景執行緒中消耗 iterable（例如資料夾走訪），透過有界佇列交給使用端。
+    走訪與雜湊因此可同時進行；count 為目前已產生的項目數，可作為進度的即時估計。
+    """
+
+    def __init__(self, iterable, maxsize: int = 64, name: str = "producer"):
+        self.count = 0
+        self.finished = False
+        self._q = queue.Queue(maxsize)
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(iterable,), name=name, daemon=True)
+        self._thread.start()
+
+    def _put(self, item) -> bool:
+        # 使用端放棄時（close）不要永久卡在 put
+        while not self._stop.is_set():
+            try:
+                self._q.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _run(self, iterable):
+        batch = []
+        try:
+            for item in iterable:
+                batch.append(item)
+                self.count += 1
+                # 批次滿了、或使用端正在等待（佇列已空）就先送出，讓雜湊盡早開始
+                if len(batch) >= BATCH or self._q.empty():
+                    if not self._put(batch):
+                        return
+                    batch = []
+            if batch:
+                self._put(batch)
+        except BaseException as e:
+            self._put(_Failure(e))
+        finally:
+            self.finished = True
+            self._put(_END)
+
+    def __iter__(self):
+        while True:
+            item = self._q.get()
+            if item is _END:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield from item
+
+    def close(self):
+        self._stop.set()
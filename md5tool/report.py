@@ -0,0 +1,430 @@
+import csv
+import html
+import json
+import os
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from .blocks import ranges_text
+from .constants import (
+    DETAIL_FORMATS, DETAIL_PREFIX, HTML_PAGE_ROWS, PDF_TABLE_ROWS, REPORT_EXT, REPORT_LIST_LIMIT, REPORT_PREFIX,
+)
+from .scan import resource_path
+from .stats import slowest_lines, stats_lines
+
+# 各類異常：(result 的鍵, 標題)；moved 與 errors 另外處理
+CATEGORIES = (
+    ("missing", "遺失檔案"),
+    ("size_mismatch", "大小不符"),
+    ("hash_mismatch", "雜湊不符"),
+    ("mtime_mismatch", "時間不符"),
+    ("extras", "多出檔案"),
+)
+
+_pdf_fonts = None  # (base_font, title_font, bold_font)：字型只需向 reportlab 註冊一次
+
+
+def _noop_log(msg: str):
+    pass
+
+def _register_fonts(log):
+    """註冊 Assets 內的中文字型並回傳字型名稱；結果快取在模組中，之後的報告不再重新載入 TTF。"""
+    global _pdf_fonts
+    if _pdf_fonts is not None:
+        return _pdf_fonts
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    base_font = "Helvetica"     # 預設英文字型
+    title_font = base_font
+    bold_font = None
+
+    # 尋找 Assets 內中文字型
+    font_reg_path = resource_path(os.path.join("Assets", "NotoSansTC-Regular.ttf"))
+    font_bold_path = resource_path(os.path.join("Assets", "NotoSansTC-Bold.ttf"))
+
+    try:
+        if os.path.exists(font_reg_path):
+            pdfmetrics.registerFont(TTFont("CJK", font_reg_path))
+            base_font = "CJK"
+            title_font = "CJK"
+        if os.path.exists(font_bold_path):
+            pdfmetrics.registerFont(TTFont("CJK-Bold", font_bold_path))
+            bold_font = "CJK-Bold"
+    except Exception as e:
+        # 若註冊失敗，繼續用 Helvetica；中文可能會變成方塊
+        log(f"PDF 字型註冊失敗：{e}")
+    _pdf_fonts = (base_font, title_font, bold_font)
+    return _pdf_fonts
+
+def iter_detail_rows(result: dict):
+    """逐筆產生 (類別鍵, 類別標題, 路徑, 說明)，涵蓋所有異常、搬移與讀取錯誤。"""
+    corrupt = result.get("corrupt_ranges") or {}
+    for key, title in CATEGORIES:
+        for p in result.get(key) or []:
+            yield key, title, p, ranges_text(corrupt[p]) if key == "hash_mismatch" and p in corrupt else ""
+    for m in result.get("moved") or []:
+        yield "moved", "搬移／改名", m["from"], "→ " + m["to"] + ("（內容相同的檔案有多筆）" if m.get("ambiguous") else "")
+    for e in result.get("errors") or []:
+        yield "errors", "讀取錯誤", e["path"], e["error"]
+
+def write_detail_report(result: dict, fmt: str = "csv", log=_noop_log) -> str:
+    """
+    把每一筆異常逐筆寫入 result["folder"] 下的完整明細檔（不截斷），回傳檔案路徑。
+    fmt 為 csv（UTF-8 BOM，可直接用 Excel 開啟）、jsonl 或 html（分頁顯示的單一檔案）；
+    逐列寫出，不另外在記憶體組成整份內容。
+    """
+    if fmt not in DETAIL_FORMATS:
+        raise ValueError(f"未知的明細格式：{fmt}")
+    ts = datetime.now()
+    out_path = os.path.join(result["folder"], f"{DETAIL_PREFIX}{ts.strftime('%Y%m%d %H%M')}.{fmt}")
+    rows = iter_detail_rows(result)
+    count = 0
+    if fmt == "csv":
+        with open(out_path, "w", encoding="utf-8-sig", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(["category", "類別", "path", "detail"])
+            for row in rows:
+                w.writerow(row)
+                count += 1
+    elif fmt == "jsonl":
+        with open(out_path, "w", encoding="utf-8", newline="\n") as f:
+            for key, _, path, detail in rows:
+                d = {"category": key, "path": path}
+                if detail:
+                    d["detail"] = detail
+                f.write(json.dumps(d, ensure_ascii=False) + "\n")
+                count += 1
+    else:
+        with open(out_path, "w", encoding="utf-8", newline="\n") as f:
+            count = _write_detail_html(f, result, rows, ts)
+    log(f"已輸出完整明細（{count} 筆）：{out_path}")
+    return out_path
+
+_HTML_HEAD = """<!DOCTYPE html>
+<html lang="zh-Hant"><head><meta charset="utf-8"><title>{title}</title>
+<style>
+body {{ font-family: sans-serif; font-size: 14px; margin: 1.5em; }}
+table {{ border-collapse: collapse; width: 100%; }}
+th, td {{ border: 1px solid #ccc; padding: 2px 6px; text-align: left; vertical-align: top; }}
+th {{ background: #f4f4f4; }}
+td.n {{ text-align: right; color: #888; }}
+nav {{ margin: .8em 0; }}
+</style></head><body>
+"""
+_HTML_TAIL = """</table>
+<nav><button onclick="go(-1)">上一頁</button> <span id="pos"></span> <button onclick="go(1)">下一頁</button></nav>
+<script>
+var pages = document.querySelectorAll("tbody.page"), cur = 0;
+function go(d) {
+  cur = Math.max(0, Math.min(pages.length - 1, cur + d));
+  for (var i = 0; i < pages.length; i++) pages[i].hidden = (i !== cur);
+  document.getElementById("pos").textContent = (cur + 1) + " / " + pages.length;
+}
+go(0);
+</script>
+</body></html>
+"""
+
+def _write_detail_html(f, result: dict, rows, ts) -> int:
+    # 每 HTML_PAGE_ROWS 筆一個 <tbody>，以少量 JavaScript 切換顯示，檔案仍是逐列寫出
+    esc = html.escape
+    f.write(_HTML_HEAD.format(title="MD5 檢測明細"))
+    f.write(f"<h1>MD5 檢測明細</h1>\n<p>檢測時間：{ts.strftime('%Y-%m-%d %H:%M:%S')}<br>")
+    f.write(f"檢測根資料夾：{esc(result['folder'])}<br>清單檔路徑：{esc(str(result.get('manifest_path') or '（無）'))}</p>\n")
+    f.write("<ul>")
+    for line in result.get("info") or []:
+        f.write(f"<li>{esc(line)}</li>")
+    f.write("</ul>\n<table>\n<thead><tr><th>#</th><th>類別</th><th>路徑</th><th>說明</th></tr></thead>\n")
+    count = 0
+    for _, title, path, detail in rows:
+        if count % HTML_PAGE_ROWS == 0:
+            f.write(("</tbody>\n" if count else "") + '<tbody class="page">\n')
+        count += 1
+        f.write(f'<tr><td class="n">{count}</td><td>{esc(title)}</td><td>{esc(path)}</td><td>{esc(detail)}</td></tr>\n')
+    f.write("</tbody>\n" if count else '<tbody class="page"><tr><td colspan="4">（無異常）</td></tr></tbody>\n')
+    f.write(_HTML_TAIL)
+    return count
+
+def generate_report(result: dict, log=_noop_log, full: bool = False) -> str:
+    """
+    產生 A4 PDF 報告（含中文、左上角 Logo）
+    若 reportlab 不存在或字型缺失導致失敗，會自動輸出純文字報告當作後備。
+    result 為 verify_manifest() 的回傳值。
+    各類異常預設列出前 REPORT_LIST_LIMIT 筆；full=True 時全部列出（PDF 以多個小表格分段排版）。
+    """
+    folder = result["folder"]
+    # 直接比對兩個資料夾時不一定有清單檔
+    manifest_text = result["manifest_path"] or "（無，直接比對來源資料夾）"
+    total = result["total"]
+    ok_count = result["ok"]
+    missing = result["missing"]
+    size_mismatch = result["size_mismatch"]
+    hash_mismatch = result["hash_mismatch"]
+    mtime_mismatch = result.get("mtime_mismatch")
+    extras = result["extras"]
+    moved = [f"{m['from']} → {m['to']}" for m in result.get("moved") or []]
+    verify_info = result.get("info")
+    algorithm_text = ", ".join(a.upper() for a in result.get("algorithms") or ["md5"])
+    run_stats = result.get("stats")
+    stat_lines = stats_lines(run_stats) if run_stats else []
+    slowest = slowest_lines(run_stats) if run_stats else []
+    rollup = result.get("rollup") or {}
+    corrupt = result.get("corrupt_ranges") or {}
+    limit = None if full else REPORT_LIST_LIMIT
+
+    def ranges_of(key, p):
+        # 分塊比對的大檔：雜湊不符時附上損毀的位元組範圍
+        return ranges_text(corrupt[p]) if key == "hash_mismatch" and p in corrupt else ""
+
+    def rollup_lines(key):
+        # 超過上限時先依資料夾彙總（見 merkle.rollup_paths），避免只列出前幾個路徑
+        items = result.get(key) or []
+        if len(items) <= REPORT_LIST_LIMIT:
+            return []
+        lines = []
+        for r in rollup.get(key, []):
+            name = (r["dir"] + "/") if r["dir"] else "（根目錄）"
+            if r["whole"]:
+                lines.append(f"{name}  整個資料夾 {r['count']} 筆")
+            else:
+                lines.append(f"{name}  其中 {r['count']} 筆（此資料夾共 {r['total']} 筆）")
+        return lines
+
+    ts = datetime.now()
+    ts_str = ts.strftime("%Y%m%d %H%M")  # Windows 檔名不能含冒號
+    out_name = f"{REPORT_PREFIX}{ts_str}{REPORT_EXT}"
+    out_path = os.path.join(folder, out_name)
+
+    try:
+        # 延遲載入，以免主程式啟動時就因缺套件中斷
+        from reportlab.lib.pagesizes import A4
+        from reportlab.lib import colors
+        from reportlab.lib.units import mm
+        from reportlab.lib.utils import ImageReader
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image as RLImage
+        from reportlab.lib.enums import TA_CENTER
+
+        # ---- 1) 註冊字型（中文，只在第一次產生報告時載入） ----
+        base_font, title_font, bold_font = _register_fonts(log)
+
+        # ---- 2) 樣式（啟用 CJK 換行）----
+        styles = getSampleStyleSheet()
+        # 全域替換字型
+        styles["Title"].fontName = title_font
+        styles["Normal"].fontName = base_font
+        # CJK 斷行，避免中文不換行
+        styles["Normal"].wordWrap = "CJK"
+
+        title_style = ParagraphStyle(
+            "ReportTitle",
+            parent=styles["Title"],
+            fontName=(bold_font or title_font),
+            fontSize=18,
+            leading=22,
+            spaceAfter=4*mm
+        )
+        h2 = ParagraphStyle(
+            "h2",
+            parent=styles["Heading2"],
+            fontName=(bold_font or base_font),
+            fontSize=12,
+            leading=16,
+            spaceBefore=4*mm,
+            spaceAfter=2*mm
+        )
+        normal = ParagraphStyle(
+            "NormalCJK",
+            parent=styles["Normal"],
+            fontName=base_font,
+            fontSize=10,
+            leading=14,
+            wordWrap="CJK"
+        )
+
+        # ---- 3) 文件骨架 ----
+        doc = SimpleDocTemplate(
+            out_path, pagesize=A4,
+            leftMargin=18*mm, rightMargin=18*mm,
+            topMargin=16*mm, bottomMargin=16*mm
+        )
+        story = []
+
+        # ---- 4) Header：第1行 Logo（獨佔一行），第2行置中標題 ----
+        title_style.alignment = TA_CENTER  # 標題置中
+
+        logo_path = resource_path(os.path.join("Assets", "Instant Logo.png"))
+        if os.path.exists(logo_path):
+            # 等比縮放：寬不超過 40mm，高不超過 20mm
+            img_reader = ImageReader(logo_path)
+            iw, ih = img_reader.getSize()
+            max_w, max_h = 40 * mm, 20 * mm
+            scale = min(max_w / float(iw), max_h / float(ih))
+            target_w, target_h = iw * scale, ih * scale
+
+            logo = RLImage(logo_path, width=target_w, height=target_h, mask='auto')
+            logo.hAlign = 'LEFT'   # 若要置中可改為 'CENTER'
+            story.append(logo)     # 第1行：只放 Logo
+            story.append(Spacer(1, 4 * mm))
+
+        # 第2行：置中標題
+        story.append(Paragraph("MD5 檢測報告", title_style))
+        story.append(Spacer(1, 4 * mm))
+
+        # ---- 5) 基本資訊 ----
+        info_lines = [
+            f"檢測時間：{ts.strftime('%Y-%m-%d %H:%M:%S')}",
+            f"檢測根資料夾：{folder}",
+            f"清單檔路徑：{manifest_text}",
+            f"演算法：{algorithm_text}",
+        ] + list(verify_info or [])
+        for t in info_lines:
+            story.append(Paragraph(t, normal))
+        story.append(Spacer(1, 4*mm))
+
+        # ---- 6) 彙總表 ----
+        summary_data = [
+            ["項目", "數量"],
+            ["清單總數", str(total)],
+            ["OK 數量", str(ok_count)],
+            ["遺失檔案", str(len(missing))],
+            ["大小不符", str(len(size_mismatch))],
+            ["雜湊不符", str(len(hash_mismatch))],
+        ]
+        if mtime_mismatch is not None:
+            summary_data.append(["時間不符", str(len(mtime_mismatch))])
+        summary_data.append(["多出檔案", str(len(extras))])
+        summary_data.append(["搬移／改名", str(len(moved))])
+        tbl = Table(summary_data, colWidths=[40*mm, 30*mm])
+        tbl.setStyle(TableStyle([
+            ("FONTNAME", (0,0), (-1,-1), base_font),
+            ("FONTSIZE", (0,0), (-1,-1), 10),
+            ("GRID", (0,0), (-1,-1), 0.5, colors.grey),
+            ("BACKGROUND", (0,0), (-1,0), colors.whitesmoke),
+            ("ALIGN", (1,1), (-1,-1), "RIGHT"),
+        ]))
+        story.append(tbl)
+        story.append(Spacer(1, 6*mm))
+
+        # ---- 6b) 執行統計（耗時、速度、最慢的檔案）----
+        if stat_lines:
+            story.append(Paragraph("執行統計", h2))
+            for t in stat_lines:
+                story.append(Paragraph(t, normal))
+            if slowest:
+                story.append(Paragraph("最慢的檔案：", normal))
+                for t in slowest:
+                    story.append(Paragraph(escape(t), normal))  # 路徑可能含 < &
+            story.append(Spacer(1, 4*mm))
+
+        # ---- 7) 詳細清單（各列前 50 筆或全部；數量龐大時先列依資料夾彙總）----
+        list_style = TableStyle([
+            ("FONTNAME", (0,0), (-1,-1), base_font),
+            ("FONTSIZE", (0,0), (-1,-1), 9),
+            ("GRID", (0,0), (-1,-1), 0.25, colors.lightgrey),
+            ("BACKGROUND", (0,0), (-1,0), colors.whitesmoke),
+            ("VALIGN", (0,0), (-1,-1), "TOP"),
+        ])
+
+        def add_section(title, items, key=None):
+            story.append(Paragraph(title, h2))
+            if not items:
+                story.append(Paragraph("（無）", normal))
+                story.append(Spacer(1, 3*mm))
+                return
+            folders = rollup_lines(key) if key else []
+            if folders:
+                story.append(Paragraph(f"依資料夾彙總（{len(folders)} 個資料夾）：", normal))
+                for t in folders[:50]:
+                    story.append(Paragraph(escape(t), normal))
+                if len(folders) > 50:
+                    story.append(Paragraph(f"（其餘 {len(folders)-50} 個資料夾略）", normal))
+                story.append(Spacer(1, 2*mm))
+            lim = items[:limit]
+            # 長清單切成多個小表格：reportlab 分頁時會反覆切分整張表，單一大表格的耗時隨列數平方成長
+            for start in range(0, len(lim), PDF_TABLE_ROWS):
+                chunk = lim[start:start + PDF_TABLE_ROWS]
+                data = [["#", "檔案相對路徑"]] + [
+                    [str(start + i + 1), f"{p}\n損毀範圍：{ranges_of(key, p)}" if ranges_of(key, p) else p]
+                    for i, p in enumerate(chunk)
+                ]
+                t = Table(data, colWidths=[14*mm, 156*mm], repeatRows=1)
+                t.setStyle(list_style)
+                story.append(t)
+            if len(items) > len(lim):
+                story.append(Paragraph(f"（其餘 {len(items)-len(lim)} 筆略）", normal))
+            story.append(Spacer(1, 4*mm))
+
+        add_section("遺失檔案", missing, "missing")
+        add_section("大小不符", size_mismatch, "size_mismatch")
+        add_section("雜湊不符", hash_mismatch, "hash_mismatch")
+        if mtime_mismatch is not None:
+            add_section("時間不符", mtime_mismatch, "mtime_mismatch")
+        add_section("多出檔案", extras, "extras")
+        add_section("搬移／改名（舊路徑 → 新路徑）", moved)
+
+        # ---- 8) 產出 ----
+        doc.build(story)
+        return out_path
+
+    except Exception as e:
+        # 後備：純文字報告（確保至少有輸出）
+        fallback = os.path.join(folder, f"{REPORT_PREFIX}{ts_str}.txt")
+        try:
+            with open(fallback, "w", encoding="utf-8") as f:
+                f.write("MD5檢測報告\n")
+                f.write(f"檢測時間：{ts.strftime('%Y-%m-%d %H:%M:%S')}\n")
+                f.write(f"檢測根資料夾：{folder}\n")
+                f.write(f"清單檔路徑：{manifest_text}\n")
+                f.write(f"演算法：{algorithm_text}\n")
+                for line in verify_info or []:
+                    f.write(f"{line}\n")
+                f.write("\n")
+                f.write(f"清單總數：{total}\n")
+                f.write(f"OK 數量：{ok_count}\n")
+                f.write(f"遺失檔案：{len(missing)}\n")
+                f.write(f"大小不符：{len(size_mismatch)}\n")
+                f.write(f"雜湊不符：{len(hash_mismatch)}\n")
+                if mtime_mismatch is not None:
+                    f.write(f"時間不符：{len(mtime_mismatch)}\n")
+                f.write(f"多出檔案：{len(extras)}\n")
+                f.write(f"搬移／改名：{len(moved)}\n\n")
+
+                if stat_lines:
+                    f.write("執行統計\n")
+                    for line in stat_lines:
+                        f.write(f"{line}\n")
+                    if slowest:
+                        f.write("最慢的檔案：\n")
+                        for line in slowest:
+                            f.write(f"  {line}\n")
+                    f.write("\n")
+
+                def dump(title, items, key=None):
+                    folders = rollup_lines(key) if key else []
+                    if folders:
+                        f.write(f"{title}：依資料夾彙總（{len(folders)} 個資料夾）\n")
+                        for line in folders:
+                            f.write(f"  {line}\n")
+                    lim = items[:limit]
+                    f.write(f"{title}（前 {REPORT_LIST_LIMIT} 筆）\n" if len(items) > len(lim) else f"{title}\n")
+                    for i, p in enumerate(lim, 1):
+                        f.write(f"{i:02d}. {p}\n")
+                        if ranges_of(key, p):
+                            f.write(f"    損毀範圍：{ranges_of(key, p)}\n")
+                    if len(items) > len(lim):
+                        f.write(f"（其餘 {len(items)-len(lim)} 筆略）\n")
+                    f.write("\n")
+
+                dump("遺失檔案", missing, "missing")
+                dump("大小不符", size_mismatch, "size_mismatch")
+                dump("雜湊不符", hash_mismatch, "hash_mismatch")
+                if mtime_mismatch is not None:
+                    dump("時間不符", mtime_mismatch, "mtime_mismatch")
+                dump("多出檔案", extras, "extras")
+                dump("搬移／改名（舊路徑 → 新路徑）", moved)
+        except Exception:
+            pass
+        log(f"PDF 產生失敗（{e}），已輸出純文字報告：{fallback}")
+        return fallback
@@ -0,0 +1,120 @@
+import os
+import sys
+from collections import namedtuple
+
+from .constants import (DETAIL_FORMATS, DETAIL_PREFIX, IGNORE_BASENAMES, IGNORE_FILE, REPORT_EXT, REPORT_PREFIX,
+                        SCAN_WORKERS)
+
+# 掃描結果：rel 為以 / 分隔的相對路徑，path 為可直接開啟的完整路徑
+FileRecord = namedtuple("FileRecord", "rel path size mtime_ns ino dev")
+
+
+def should_ignore(path: str) -> bool:
+    """建立清單與比對掃描時，忽略不需納入的檔案（含本工具輸出的 PDF 報告）。"""
+    bn = os.path.basename(path)
+    if bn in IGNORE_BASENAMES:
+        return True
+    # 忽略本工具輸出的 PDF 報告（及 reportlab 失敗時的 TXT 後備報告）
+    if bn.startswith(REPORT_PREFIX) and bn.lower().endswith((REPORT_EXT, ".txt")):
+        return True
+    # 忽略本工具輸出的完整明細
+    if bn.startswith(DETAIL_PREFIX) and bn.lower().rpartition(".")[2] in DETAIL_FORMATS:
+        return True
+    return False
+
+def is_root_ignore_file(rel: str) -> bool:
+    """rel 是否為資料夾根目錄的 .md5ignore（排除規則本身不列入清單；子資料夾中的同名檔案不受影響）。"""
+    return rel == IGNORE_FILE
+
+def win_longpath(p: str) -> str:
+    # 在 Windows 加上長路徑前綴（避免 260 字元限制）
+    if os.name == "nt":
+        p = os.path.abspath(p)
+        if not p.startswith("\\\\?\\"):
+            if p.startswith("\\\\"):
+                # 網路路徑 \\server\share -> \\?\UNC\server\share
+                p = "\\\\?\\UNC" + p[1:]
+            else:
+                p = "\\\\?\\" + p
+    return p
+
+def resource_path(rel_path: str) -> str:
+    # PyInstaller 打包後，臨時資源目錄在 sys._MEIPASS
+    base = getattr(sys, "_MEIPASS", os.path.abspath("."))
+    return os.path.join(base, rel_path)
+
+def iter_files(root_dir: str):
+    for base, dirs, files in os.walk(root_dir):
+        for name in files:
+            yield os.path.join(base, name)
+
+def rel_path(path: str, root_dir: str) -> str:
+    return os.path.relpath(path, start=root_dir).replace("\\", "/")
+
+def _scan_dir(path: str, rel: str, onerror=None, rules=None):
+    """
+    讀取單一資料夾：回傳 (檔案 FileRecord 清單, 子資料夾 (path, rel) 清單)，皆依名稱排序。
+    DirEntry 在 Windows 上免費附帶 stat，在 Linux 上每檔也只需一次 stat。
+    rules（IgnoreRules）排除的子資料夾不會回傳，因此整棵子樹都不會被走訪。
+    """
+    files, dirs = [], []
+    prefix = rel + "/" if rel else ""
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        # 與 os.walk 相同：不進入指向資料夾的符號連結
+                        if not entry.is_symlink() and not (rules and rules.ignored(prefix + entry.name, True)):
+                            dirs.append((entry.path, prefix + entry.name))
+                    elif entry.is_file():
+                        if (should_ignore(entry.name) or is_root_ignore_file(prefix + entry.name)
+                                or (rules and rules.ignored(prefix + entry.name))):
+                            continue
+                        st = entry.stat()
+                        files.append(FileRecord(prefix + entry.name, entry.path, st.st_size,
+                                                st.st_mtime_ns, entry.inode(), st.st_dev))
+                except OSError as e:
+                    if onerror:
+                        onerror(e)
+    except OSError as e:
+        if onerror:
+            onerror(e)
+    files.sort()
+    dirs.sort(key=lambda d: d[1])
+    return files, dirs
+
+def scan_order(rel: str) -> tuple:
+    """scan_tree 產生各檔案的順序鍵：同一資料夾內先列檔案（依名稱），再依名稱進入子資料夾。"""
+    *dirs, name = rel.split("/")
+    return tuple((1, d) for d in dirs) + ((0, name),)
+
+def scan_tree(root_dir: str, workers: int = SCAN_WORKERS, onerror=None, rules=None):
+    """
+    以 os.scandir 單次走訪 root_dir，逐筆產生 FileRecord（已排除 should_ignore 與 rules 排除的檔案）。
+    順序固定：每個資料夾先列其檔案，再依名稱深度優先進入子資料夾（即依 scan_order 遞增）。
+    workers > 1 時以執行緒預先讀取即將走訪的資料夾，適合每次 stat 都是網路往返的 SMB / NFS。
+    """
+    root = win_longpath(root_dir)
+    if workers <= 1:
+        stack = [(root, "")]
+        while stack:
+            path, rel = stack.pop()
+            files, dirs = _scan_dir(path, rel, onerror, rules)
+            yield from files
+            stack.extend(reversed(dirs))
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+    prefetch = workers * 4
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan") as ex:
+        # 堆疊頂端（即將走訪）的若干資料夾會先送出讀取，數量有上限以免佔用過多記憶體
+        stack = [[root, "", None]]
+        while stack:
+            for item in stack[-prefetch:]:
+                if item[2] is None:
+                    item[2] = ex.submit(_scan_dir, item[0], item[1], onerror, rules)
+            _, _, fut = stack.pop()
+            files, dirs = fut.result()
+            yield from files
+            stack.extend([p, r, None] for p, r in reversed(dirs))
@@ -0,0 +1,107 @@
+import heapq
+import time
+
+SLOWEST_FILES = 10  # 執行統計中保留的最慢檔案數
+
+
+class RunStats:
+    """
+    單次執行的統計：各階段耗時、處理的檔案數與位元組數、最慢的檔案。
+    階段耗時為累計值；在背景執行緒或多個工作執行緒中進行的階段（walk、hash）會與其他階段重疊，
+    hash 為各工作執行緒讀檔＋計算的時間總和，可能大於實際經過時間。
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = {}
+        self.files = 0
+        self.bytes = 0
+        self._slowest = []  # (seconds, path, size) 的最小堆積，只留最慢的 SLOWEST_FILES 筆
+
+    def add(self, phase: str, seconds: float):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def timed(self, phase: str, iterable):
+        """包裝 iterable：只累計產生每一項所花的時間（不含使用端處理的時間）。"""
+        it = iter(iterable)
+        clock = time.perf_counter
+        while True:
+            t = clock()
+            try:
+                item = next(it)
+            except StopIteration:
+                self.add(phase, clock() - t)
+                return
+            self.add(phase, clock() - t)
+            yield item
+
+    def record_file(self, path: str, size: int, seconds: float):
+        self.files += 1
+        self.bytes += size
+        self.add("hash", seconds)
+        item = (seconds, path, size)
+        if len(self._slowest) < SLOWEST_FILES:
+            heapq.heappush(self._slowest, item)
+        elif item > self._slowest[0]:
+            heapq.heapreplace(self._slowest, item)
+
+    def as_dict(self) -> dict:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        return {
+            "elapsed": round(elapsed, 3),
+            "phases": {k: round(v, 3) for k, v in self.phases.items()},
+            "files": self.files,
+            "bytes": self.bytes,
+            "files_per_s": round(self.files / elapsed, 1),
+            "bytes_per_s": round(self.bytes / elapsed),
+            "slowest": [{"path": p, "size": size, "seconds": round(s, 3)}
+                        for s, p, size in sorted(self._slowest, reverse=True)],
+        }
+
+# ---------- 顯示 ----------
+PHASE_LABELS = {
+    "manifest_load": "載入清單",
+    "sort": "讀取並排序清單",
+    "merge": "合併比對",
+    "walk": "走訪＋stat",
+    "walk_dest": "走訪目的端",
+    "hash": "讀檔＋雜湊",
+    "manifest_write": "寫入清單",
+    "moves": "搬移偵測",
+    "report": "產生報告",
+}
+
+def format_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if abs(n) < 1024 or unit == "TB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+
+def format_duration(seconds: float) -> str:
+    seconds = int(round(seconds))
+    h, rest = divmod(seconds, 3600)
+    m, s = divmod(rest, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m:02d}:{s:02d}"
+
+def eta_seconds(done: float, total: float, elapsed: float):
+    """依目前平均速度估計剩餘秒數；資料不足時回傳 None。"""
+    if done <= 0 or elapsed < 1 or total <= done:
+        return None
+    return (total - done) * elapsed / done
+
+def stats_lines(stats: dict) -> list:
+    """把 RunStats.as_dict() 整理成報告／日誌用的文字行（不含最慢檔案清單）。"""
+    lines = [
+        f"耗時：{format_duration(stats['elapsed'])}，"
+        f"雜湊 {stats['files']} 個檔案（{stats['files_per_s']:.1f} 個/秒）、"
+        f"{format_bytes(stats['bytes'])}（{format_bytes(stats['bytes_per_s'])}/s）"
+    ]
+    phases = stats.get("phases") or {}
+    if phases:
+        lines.append("各階段：" + "、".join(
+            f"{PHASE_LABELS.get(k, k)} {v:.2f}s" for k, v in phases.items()
+        ))
+    return lines
+
+def slowest_lines(stats: dict) -> list:
+    return [f"{s['seconds']:.3f}s  {format_bytes(s['size'])}  {s['path']}" for s in stats.get("slowest") or []]
@@ -0,0 +1,1351 @@
+import math
+import os
+import random
+import stat
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from itertools import tee
+
+from .blocks import corrupt_ranges, ranges_text, verify_blocks
+from .cache import HashCache, cache_line
+from .checkpoint import CheckpointWriter, load_checkpoint
+from .constants import (
+    APP_NAME, BLOCK_HASHES, BLOCK_MIN_SIZE, BLOCK_SIZE, DEFAULT_ALGORITHMS, HASH_USE_PROCESSES,
+    HASH_WORKERS, IGNORE_FILE, MAKE_CHECKPOINT_NAME, MANIFEST_FORMAT, MANIFEST_NAME, SAMPLE_CONFIDENCE, SAMPLE_MARGIN,
+    SCAN_WORKERS, USE_HASH_CACHE, VERIFY_CHECKPOINT_NAME, VERIFY_LEVELS, WATCH_DEBOUNCE, WATCH_POLL_INTERVAL,
+    WATCH_WRITE_INTERVAL,
+)
+from .hashing import available_algorithms, fastest_algorithm, hash_records, normalize_algorithms
+from .manifest import (
+    Entry, ManifestWriter, entry_digests, entry_from_dict, entry_to_dict, entry_unchanged, find_manifest, make_entry,
+    manifest_algorithms, manifest_format, manifest_path_for, mtime_matches, partial_path_for, read_manifest,
+    read_manifest_header,
+)
+from .extsort import sorted_by_path
+from .ignore import IgnoreRules, load_ignore_rules
+from .merkle import ancestors, changed_subtrees, directory_totals, parent_dir, rollup_paths
+from .pipeline import BackgroundIterator
+from .scan import FileRecord, is_root_ignore_file, scan_order, scan_tree, should_ignore, win_longpath
+from .stats import RunStats, format_bytes, slowest_lines, stats_lines
+from .throttle import throttle_line
+from .watch import CREATE, OVERFLOW, REMOVE, Inotify, walk_files
+
+
+def _noop_log(msg: str):
+    pass
+
+def _noop_progress(value: int, maximum: int):
+    pass
+
+def _z_score(confidence: float) -> float:
+    # 常態分布雙尾臨界值（二分搜尋 erf，避免引入 scipy）
+    lo, hi = 0.0, 10.0
+    for _ in range(60):
+        mid = (lo + hi) / 2
+        if math.erf(mid / math.sqrt(2)) < confidence:
+            lo = mid
+        else:
+            hi = mid
+    return hi
+
+def sample_size(population: int, confidence: float = SAMPLE_CONFIDENCE, margin: float = SAMPLE_MARGIN) -> int:
+    """Cochran 公式（p=0.5 最保守）加上有限母體修正，回傳需抽樣的檔案數。"""
+    if population <= 0:
+        return 0
+    z = _z_score(confidence)
+    n0 = (z * z * 0.25) / (margin * margin)
+    n = n0 / (1 + (n0 - 1) / population)
+    return min(population, math.ceil(n))
+
+def sample_defect_bound(sampled: int, failures: int, confidence: float = SAMPLE_CONFIDENCE) -> float:
+    """抽樣無異常時，整體異常比例的單尾上限（1 - (1-c)^(1/n)）；有異常則回傳觀察比例。"""
+    if sampled <= 0:
+        return 1.0
+    if failures:
+        return failures / sampled
+    return 1 - (1 - confidence) ** (1 / sampled)
+
+def _manifest_header(folder: str, algorithms, rules: IgnoreRules) -> dict:
+    return {
+        "tool": APP_NAME,
+        "algorithm": "md5",
+        "algorithms": list(algorithms),
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "root_hint": os.path.basename(os.path.abspath(folder)),
+        # 建立時生效的 .md5ignore 規則，比對時沿用同一組
+        "ignore": rules.patterns,
+    }
+
+def _load_rules(folder: str, log) -> IgnoreRules:
+    rules = load_ignore_rules(folder)
+    if rules:
+        log(f"排除規則（{IGNORE_FILE}）：{len(rules.patterns)} 條")
+    return rules
+
+def _scan_key(entry: Entry) -> tuple:
+    return scan_order(entry.path)
+
+def _open_cache(use_cache: bool, force_read: bool, log):
+    if not use_cache:
+        return None
+    try:
+        return HashCache(force_read=force_read)
+    except Exception as e:
+        # 快取只是加速用，開不了（唯讀家目錄、資料庫損毀等）就照常讀檔
+        log(f"雜湊快取無法開啟，本次不使用：{e}")
+        return None
+
+def _hash_cached(recs, cache, algorithms, workers, use_processes, device_limits, throttle=None):
+    """依序產生 (FileRecord, 雜湊, 錯誤)；快取命中者不讀檔，新算出的雜湊寫回快取。"""
+    recs = list(recs)
+    cached = [cache.get(r, algorithms) if cache is not None else None for r in recs]
+    hashed = hash_records((r for r, c in zip(recs, cached) if c is None), workers, use_processes, algorithms,
+                          device_limits=device_limits, throttle=throttle)
+    try:
+        for rec, digests in zip(recs, cached):
+            if digests is not None:
+                yield rec, digests, None
+                continue
+            _, digests, err = next(hashed)
+            if err is None and cache is not None:
+                cache.put(rec, digests)
+            yield rec, digests, err
+    finally:
+        hashed.close()
+
+def _rollup(result: dict, totals: dict) -> dict:
+    """各類異常依資料夾收斂（見 merkle.rollup_paths），供報告在數量龐大時改列資料夾。"""
+    keys = ("missing", "size_mismatch", "hash_mismatch", "mtime_mismatch", "extras")
+    return {k: rollup_paths(result[k], totals) for k in keys if result.get(k)}
+
+def _log_summary(result: dict, log):
+    log("—— 比對摘要 ——")
+    log(f"清單總數：{result['total']}")
+    log(f"OK 數量：{result['ok']}")
+    log(f"遺失檔案：{len(result['missing'])}")
+    log(f"大小不符：{len(result['size_mismatch'])}")
+    log(f"雜湊不符：{len(result['hash_mismatch'])}")
+    if result["mtime_mismatch"] is not None:
+        log(f"時間不符：{len(result['mtime_mismatch'])}")
+    log(f"多出檔案：{len(result['extras'])}")
+    log(f"搬移／改名：{len(result['moved'])}")
+    if result.get("cache"):
+        log(cache_line(result["cache"]))
+    if result.get("throttle"):
+        log(throttle_line(result["throttle"]))
+    for line in stats_lines(result["stats"]) + slowest_lines(result["stats"])[:3]:
+        log(line)
+
+def make_manifest(folder: str, incremental: bool = False, fmt: str = None,
+                  algorithms=DEFAULT_ALGORITHMS, resume: bool = False,
+                  workers: int = HASH_WORKERS, use_processes: bool = HASH_USE_PROCESSES,
+                  scan_workers: int = SCAN_WORKERS, device_limits: dict = None,
+                  use_cache: bool = USE_HASH_CACHE, force_read: bool = False, throttle=None,
+                  blocks: bool = None, log=_noop_log, progress=_noop_progress) -> dict:
+    """
+    為 folder 建立（或增量更新）MD5 清單檔，回傳執行摘要。
+    fmt 為 MANIFEST_FORMATS 的鍵；未指定時沿用既有清單的格式，否則用 MANIFEST_FORMAT。
+    algorithms 為要一併計算的演算法（md5 一律包含），每個檔案只讀一次。
+    log(msg) 接收逐檔訊息，progress(value, maximum) 接收進度。
+    項目在計算完成後即依序寫入暫存清單，全部完成才改名為正式清單；新算出的雜湊同時附加到檢查點，
+    resume=True 時沿用上次中斷前的檢查點（size / mtime / inode 未變的檔案不再重新計算）。
+    use_cache=True 時舊清單沒有的檔案先查跨執行的雜湊快取；force_read=True 則一律讀檔，只更新快取。
+    throttle 為 throttle.Throttle 時依其上限限速讀檔（執行中可調整）。
+    blocks=True 時不小於 BLOCK_MIN_SIZE 的檔案另存每 BLOCK_SIZE 一段的 MD5（見 blocks.py）；
+    None 表示增量更新時沿用舊清單的設定，否則依 BLOCK_HASHES。
+    """
+    log(f"{'開始更新清單' if incremental else '開始建立清單'}：{folder}")
+    stats = RunStats()
+    algorithms = normalize_algorithms(algorithms)
+    existing = find_manifest(folder)
+    checkpoint_path = os.path.join(folder, MAKE_CHECKPOINT_NAME)
+    cp_header, cp_records = load_checkpoint(checkpoint_path) if resume else (None, [])
+    resuming = bool(cp_header and cp_header.get("checkpoint") == "make")
+    if fmt is None:
+        if resuming and cp_header.get("format"):
+            fmt = cp_header["format"]
+        else:
+            fmt = manifest_format(existing) if existing else MANIFEST_FORMAT
+    manifest_path = manifest_path_for(folder, fmt)
+
+    # 增量模式：載入舊清單，size / mtime / inode 未變的檔案沿用舊雜湊
+    previous = {}
+    old_dirs = None
+    old_block_size = 0
+    if incremental and existing:
+        t = time.perf_counter()
+        try:
+            old_header, old_entries = read_manifest(existing)
+            previous = {e.path: e for e in old_entries}
+            old_dirs = old_header.get("dirs")
+            old_block_size = old_header.get("block_size") or 0
+            stats.add("manifest_load", time.perf_counter() - t)
+        except Exception as e:
+            log(f"舊清單載入失敗，改為完整重建：{e}")
+    if blocks is None:
+        if resuming:
+            blocks = bool(cp_header.get("block_size"))
+        else:
+            blocks = bool(old_block_size) if previous else BLOCK_HASHES
+    block_size = BLOCK_SIZE if blocks else 0
+    if old_block_size != block_size:
+        # 分塊大小不同（或本次不分塊）時舊的分塊 MD5 不能沿用
+        previous = {p: e._replace(blocks=None) for p, e in previous.items()}
+    if block_size:
+        log(f"分塊雜湊：{format_bytes(BLOCK_MIN_SIZE)} 以上的檔案另存每 {format_bytes(block_size)} 一段的 MD5")
+    if resuming:
+        # 檢查點比舊清單新，同一路徑以檢查點為準
+        cp_block_size = cp_header.get("block_size") or 0
+        previous.update((e.path, e if cp_block_size == block_size else e._replace(blocks=None))
+                        for e in map(entry_from_dict, cp_records))
+        log(f"接續上次中斷的進度：檢查點已有 {len(cp_records)} 筆")
+    elif resume:
+        log("沒有可接續的檢查點，重新開始")
+    elif os.path.exists(checkpoint_path):
+        log("注意：發現上次未完成的檢查點，本次將重新開始（可改用接續模式）")
+
+    # 走訪在背景執行緒進行，邊列舉邊雜湊邊寫入；進度以位元組計，總量以目前已發現的檔案大小即時估計
+    rules = _load_rules(folder, log)
+    discovered = [0]
+
+    def scan():
+        for rec in stats.timed("walk", scan_tree(folder, scan_workers, onerror=lambda e: log(f"ERR {e}"),
+                                                 rules=rules)):
+            discovered[0] += rec.size
+            yield rec
+
+    cache = _open_cache(use_cache, force_read, log)
+    walker = BackgroundIterator(scan(), name="scan")
+    progress(0, 1)
+    errors = []
+    counts = {"reused": 0, "cached": 0, "hashed": 0}
+
+    def plan():
+        # 依掃描時取得的 stat 決定沿用舊雜湊、快取或需要重新計算：產生 (FileRecord, 既有雜湊或 None, 是否來自快取)
+        for rec in walker:
+            # 需要分塊 MD5 的大檔不能只靠快取（快取不存分塊）
+            need_blocks = block_size and rec.size >= BLOCK_MIN_SIZE
+            old_entry = previous.get(rec.rel)
+            if entry_unchanged(old_entry, rec):
+                old = entry_digests(old_entry)
+                # 舊清單缺少本次要求的演算法（或分塊 MD5）時仍需重新讀取
+                if all(a in old for a in algorithms) and (old_entry.blocks or not need_blocks):
+                    digests = {a: old[a] for a in algorithms}
+                    if old_entry.blocks:
+                        digests["blocks"] = old_entry.blocks
+                    yield rec, digests, False
+                    continue
+            cached = cache.get(rec, algorithms) if cache is not None and not need_blocks else None
+            yield rec, cached, cached is not None
+
+    # 一份給雜湊引擎預先取用，一份依原順序寫入；不需計算的項目以 None 帶過，每個項目都有一筆結果，
+    # 兩者同步前進，tee 暫存的只有雜湊引擎預先取用的部分（最多 PIPELINE_WINDOW 筆）
+    items, feed = tee(plan())
+    hashed = hash_records((rec if old is None else None for rec, old, _ in feed), workers, use_processes,
+                          algorithms, timed=True, device_limits=device_limits, throttle=throttle,
+                          block_size=block_size)
+
+    header = _manifest_header(folder, algorithms, rules)
+    if block_size:
+        header.update(block_size=block_size, block_min_size=BLOCK_MIN_SIZE)
+    kept_previous = 0
+    done_bytes = 0
+    clock = time.perf_counter
+
+    def report_progress():
+        total = discovered[0]
+        progress(done_bytes, total if walker.finished else max(total, done_bytes + 1))
+
+    checkpoint = CheckpointWriter(
+        checkpoint_path,
+        {"checkpoint": "make", "format": fmt, "algorithms": list(algorithms), "block_size": block_size,
+         "started_at": header["generated_at"]},
+        append=resuming,
+    )
+    partial_path = partial_path_for(manifest_path)
+    try:
+        with ManifestWriter(partial_path, header) as writer:
+            for (rec, old, from_cache), (_, digests, err, seconds) in zip(items, hashed):
+                done_bytes += rec.size
+                if from_cache:
+                    entry = make_entry(rec, old)
+                    counts["cached"] += 1
+                    checkpoint.append(entry_to_dict(entry))
+                    log(f"OK  {rec.rel}  {old['md5']}（快取）")
+                elif old is not None:
+                    entry = make_entry(rec, old)
+                    counts["reused"] += 1
+                else:
+                    if err is not None:
+                        # 讀取失敗的檔案不寫入清單，另計於 errors，不算在 hashed
+                        stats.add("hash", seconds)
+                        log(f"ERR {rec.rel}: {err}")
+                        errors.append({"path": rec.rel, "error": str(err)})
+                        if rec.rel in previous:
+                            kept_previous += 1  # 檔案仍在，不算已刪除
+                        report_progress()
+                        continue
+                    counts["hashed"] += 1
+                    stats.record_file(rec.rel, rec.size, seconds)
+                    if cache is not None:
+                        cache.put(rec, digests)
+                    entry = make_entry(rec, digests)
+                    checkpoint.append(entry_to_dict(entry))
+                    log(f"OK  {rec.rel}  {digests['md5']}")
+                t = clock()
+                writer.write(entry)
+                stats.add("manifest_write", clock() - t)
+                if rec.rel in previous:
+                    kept_previous += 1
+                report_progress()
+            written = writer.count
+            run_stats = stats.as_dict()
+            writer.trailer = {"run_stats": run_stats}
+        # 完整寫完才取代正式清單；中途中斷時舊清單保持原樣
+        os.replace(partial_path, manifest_path)
+    finally:
+        hashed.close()
+        walker.close()
+        checkpoint.close()
+        if cache is not None:
+            cache.close()
+    checkpoint.close(remove=True)
+
+    removed = len(previous) - kept_previous if incremental else 0
+    changed_dirs = None
+    if incremental:
+        failed = f"、讀取失敗 {len(errors)} 筆" if errors else ""
+        log(f"沿用 {counts['reused']} 筆、重新計算 {counts['hashed']} 筆{failed}、移除 {removed} 筆已刪除項目")
+        if old_dirs is not None and writer.dir_digests is not None:
+            # 以資料夾摘要比對新舊清單，未變動的子樹整棵略過
+            changed_dirs = changed_subtrees(old_dirs, writer.dir_digests)
+            log(f"內容有變動的資料夾：{len(changed_dirs)} 個")
+    if existing and os.path.abspath(existing) != os.path.abspath(manifest_path):
+        log(f"注意：資料夾內仍有其他格式的舊清單 {os.path.basename(existing)}")
+
+    if cache is not None:
+        log(cache_line(cache.summary()))
+    if throttle is not None:
+        log(throttle_line(throttle.summary()))
+    for line in stats_lines(run_stats):
+        log(line)
+    log(f"完成。清單已寫入：{manifest_path}")
+    return {
+        "manifest_path": manifest_path,
+        "format": fmt,
+        "algorithms": list(algorithms),
+        "total": written,
+        "hashed": counts["hashed"],
+        "reused": counts["reused"],
+        "cached": counts["cached"],
+        "removed": removed,
+        "block_size": block_size,
+        "errors": errors,
+        "cache": cache.summary() if cache is not None else None,
+        "throttle": throttle.summary() if throttle is not None else None,
+        "changed_dirs": changed_dirs,
+        "stats": run_stats,
+    }
+
+def _stat_record(folder: str, rel: str):
+    # 重新取得單一檔案的 FileRecord（監看模式用）；不存在或不是一般檔案時回傳 None
+    path = os.path.join(win_longpath(folder), *rel.split("/"))
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    if not stat.S_ISREG(st.st_mode):
+        return None
+    return FileRecord(rel, path, st.st_size, st.st_mtime_ns, st.st_ino, st.st_dev)
+
+_GONE = (-1, -1)  # 走訪時已不存在的檔案
+
+def watch_folder(folder: str, debounce: float = WATCH_DEBOUNCE, poll_interval: float = WATCH_POLL_INTERVAL,
+                 write_interval: float = WATCH_WRITE_INTERVAL, use_inotify: bool = True,
+                 workers: int = HASH_WORKERS, use_processes: bool = HASH_USE_PROCESSES,
+                 scan_workers: int = SCAN_WORKERS, device_limits: dict = None,
+                 use_cache: bool = USE_HASH_CACHE, throttle=None, stop: threading.Event = None,
+                 log=_noop_log, progress=_noop_progress) -> dict:
+    """
+    持續監看 folder，讓清單隨時保持最新；直到 stop 被設定（或收到 KeyboardInterrupt）才結束，回傳執行摘要。
+    開始時先以增量模式把清單補到最新（沒有清單時完整建立），之後只重新計算有變動的檔案：
+    Linux 以 inotify 接收變動事件；其他平台、inotify 無法使用或 use_inotify=False 時，
+    每 poll_interval 秒走訪一次，以 size / mtime / inode 與清單比對。
+    檔案最後一次變動後靜置 debounce 秒才計算，計算前後大小或修改時間不同時視為仍在寫入、稍後再算。
+    有變動時清單最多每 write_interval 秒整份重寫一次（暫存檔寫完再改名），任何時候讀到的都是完整的清單。
+    use_cache 只用於開始時的補齊；之後計算的都是剛變動過的檔案，不查快取。
+    """
+    stop = stop or threading.Event()
+    clock = time.monotonic
+    rules = load_ignore_rules(folder)
+    source = None
+    if use_inotify:
+        try:
+            source = Inotify(folder)
+            source.add_tree("", rules)
+        except OSError as e:
+            if source is not None:
+                source.close()
+                source = None
+            log(f"無法使用 inotify，改為每 {poll_interval:g} 秒走訪比對：{e}")
+    try:
+        # 先設好監看再補齊清單，補齊期間發生的變動留在事件佇列中，之後一併處理
+        made = make_manifest(folder, incremental=True, workers=workers, use_processes=use_processes,
+                             scan_workers=scan_workers, device_limits=device_limits, use_cache=use_cache,
+                             throttle=throttle, log=log, progress=progress)
+        manifest_path = made["manifest_path"]
+        header, loaded = read_manifest(manifest_path)
+        entries = {e.path: e for e in loaded}
+        # 結尾資訊（資料夾摘要、執行統計）由重寫時重新產生
+        header = {k: v for k, v in header.items() if k not in ("dirs", "dirs_algorithm", "run_stats")}
+        algorithms = manifest_algorithms(header)
+        block_size = header.get("block_size") or 0
+        how = f"inotify，{source.watches} 個資料夾" if source is not None else f"每 {poll_interval:g} 秒走訪"
+        log(f"開始監看：{folder}（{how}；檔案靜置 {debounce:g} 秒後更新清單）")
+
+        pending = {}  # 相對路徑 -> (最後一次變動的時間, 走訪時的 (size, mtime_ns)；事件通知則為 None)
+        counts = {"updated": 0, "removed": 0, "writes": 0}
+        errors = {}
+        dirty = False
+        last_write = clock()
+        next_poll = clock() + poll_interval
+
+        def to_polling(e: OSError):
+            # 新資料夾超過 fs.inotify.max_user_watches 等：改為定期走訪，並立即走訪一次補上可能漏掉的變動
+            nonlocal source, next_poll
+            log(f"inotify 無法繼續監看，改為每 {poll_interval:g} 秒走訪比對：{e}")
+            source.close()
+            source = None
+            next_poll = clock()
+
+        def mark(rel: str, sig=None):
+            # 走訪比對時同一個檔案未再變動，保留原本的時間，避免靜置時間一再重算
+            if sig is None or pending.get(rel, (0, None))[1] != sig:
+                pending[rel] = (clock(), sig)
+
+        def excluded(rel: str, is_dir: bool = False) -> bool:
+            return (should_ignore(rel) or is_root_ignore_file(rel) or rules.ignored(rel, is_dir)
+                    or any(rules.ignored(a, True) for a in ancestors(rel) if a))
+
+        def resync(reason: str = None):
+            # 重新讀取排除規則並整棵走訪一次（只取 stat，不讀檔），與清單比對找出新增、變動與刪除的檔案
+            nonlocal rules, dirty
+            if reason:
+                log(f"{reason}，重新走訪比對")
+            rules = load_ignore_rules(folder)
+            if rules.patterns != header.get("ignore"):
+                header["ignore"] = rules.patterns
+                dirty = True
+            if source is not None:
+                try:
+                    source.add_tree("", rules)
+                except OSError as e:
+                    to_polling(e)
+            seen = set()
+            for rec in scan_tree(folder, scan_workers, onerror=lambda e: log(f"ERR {e}"), rules=rules):
+                seen.add(rec.rel)
+                if not entry_unchanged(entries.get(rec.rel), rec):
+                    mark(rec.rel, (rec.size, rec.mtime_ns))
+            for rel in entries:
+                if rel not in seen:
+                    mark(rel, _GONE)
+
+        def on_event(kind: str, rel: str, is_dir: bool) -> str:
+            # 回傳需要整棵重新比對的原因（同一批事件只處理一次），否則回傳 None
+            if kind == OVERFLOW:
+                return "事件佇列溢位，部分變動可能遺失"
+            if rel == IGNORE_FILE:
+                return f"{IGNORE_FILE} 已變更"
+            if excluded(rel, is_dir):
+                return
+            if not is_dir:
+                mark(rel)
+            elif kind == CREATE:
+                # 新建或移入的資料夾：加入監看，裡面已有的檔案全部列入待處理
+                if source is not None:
+                    try:
+                        source.add_tree(rel, rules)
+                    except OSError as e:
+                        to_polling(e)
+                for name in walk_files(folder, rel, rules):
+                    mark(name)
+            elif kind == REMOVE:
+                if source is not None:
+                    source.remove_tree(rel)
+                prefix = rel + "/"
+                for name in entries:
+                    if name.startswith(prefix):
+                        mark(name)
+
+        def settle():
+            # 靜置超過 debounce 的檔案：已刪除者移出清單，內容有變動者重新計算
+            nonlocal dirty
+            now = clock()
+            recs = []
+            for rel in [r for r, (t, _) in pending.items() if now - t >= debounce]:
+                _, sig = pending.pop(rel)
+                rec = None if excluded(rel) else _stat_record(folder, rel)
+                if rec is None:
+                    errors.pop(rel, None)
+                    if entries.pop(rel, None) is not None:
+                        counts["removed"] += 1
+                        dirty = True
+                        log(f"移除 {rel}")
+                    continue
+                if sig is not None and (rec.size, rec.mtime_ns) != sig:
+                    mark(rel, (rec.size, rec.mtime_ns))  # 走訪之後又有變動，仍在寫入中
+                    continue
+                old = entries.get(rel)
+                need_blocks = block_size and rec.size >= BLOCK_MIN_SIZE
+                if entry_unchanged(old, rec) and (old.blocks or not need_blocks):
+                    continue  # 只是開啟、改權限等未改變內容的事件
+                recs.append(rec)
+            if not recs:
+                return
+            hashed = hash_records(recs, workers, use_processes, algorithms, device_limits=device_limits,
+                                  throttle=throttle, block_size=block_size)
+            for rec, (_, digests, err) in zip(recs, hashed):
+                if err is not None:
+                    log(f"ERR {rec.rel}: {err}")
+                    errors[rec.rel] = str(err)
+                    continue
+                after = _stat_record(folder, rec.rel)
+                if after is None or (after.size, after.mtime_ns) != (rec.size, rec.mtime_ns):
+                    mark(rec.rel)  # 計算期間又被修改，稍後重算
+                    continue
+                errors.pop(rec.rel, None)
+                entries[rec.rel] = make_entry(rec, digests)
+                counts["updated"] += 1
+                dirty = True
+                log(f"OK  {rec.rel}  {digests['md5']}")
+
+        def write():
+            # 與 make 相同：先寫暫存清單再改名，讀取端不會看到寫到一半的清單
+            nonlocal dirty, last_write
+            last_write = clock()
+            header["generated_at"] = datetime.now().isoformat(timespec="seconds")
+            partial_path = partial_path_for(manifest_path)
+            try:
+                with ManifestWriter(partial_path, header) as writer:
+                    # 依路徑排序寫入，資料夾摘要才能逐個子樹算完即釋放（見 merkle.DirectoryHasher）
+                    for rel in sorted(entries):
+                        writer.write(entries[rel])
+                os.replace(partial_path, manifest_path)
+            except OSError as e:
+                log(f"清單寫入失敗，稍後重試：{e}")
+                return
+            dirty = False
+            counts["writes"] += 1
+            log(f"清單已更新：共 {len(entries)} 筆（累計更新 {counts['updated']}、移除 {counts['removed']}）")
+
+        try:
+            while not stop.is_set():
+                if source is not None:
+                    reasons = {on_event(*event) for event in source.read(max(0.1, min(1.0, debounce)))}
+                    reasons.discard(None)
+                    if reasons:
+                        resync("、".join(sorted(reasons)))
+                elif clock() >= next_poll:
+                    resync()
+                    next_poll = clock() + poll_interval
+                else:
+                    stop.wait(max(0.1, min(1.0, debounce, next_poll - clock())))
+                settle()
+                if dirty and clock() - last_write >= write_interval:
+                    write()
+        except KeyboardInterrupt:
+            log("收到中斷，結束監看")
+        finally:
+            # 其他例外也先寫出已完成的更新再往外拋
+            if dirty:
+                write()
+    finally:
+        if source is not None:
+            source.close()
+    if pending:
+        log(f"尚有 {len(pending)} 個檔案仍在變動，未納入本次清單")
+    log(f"結束監看。清單：{manifest_path}")
+    return {
+        "manifest_path": manifest_path,
+        "format": made["format"],
+        "source": "inotify" if source is not None else "poll",
+        "total": len(entries),
+        "updated": counts["updated"],
+        "removed": counts["removed"],
+        "writes": counts["writes"],
+        "pending": sorted(pending),
+        "errors": [{"path": p, "error": e} for p, e in errors.items()],
+        "throttle": throttle.summary() if throttle is not None else None,
+    }
+
+def verify_manifest(folder: str, level: str = "full", seed: int = None, all_digests: bool = False,
+                    resume: bool = False, workers: int = HASH_WORKERS, use_processes: bool = HASH_USE_PROCESSES,
+                    scan_workers: int = SCAN_WORKERS, device_limits: dict = None,
+                    use_cache: bool = USE_HASH_CACHE, force_read: bool = False, throttle=None,
+                    stop_early: bool = False, log=_noop_log, progress=_noop_progress) -> dict:
+    """
+    以 folder 內的 MD5 清單（任一格式）比對資料夾現況，回傳比對結果（dict）。
+    level 見 VERIFY_LEVELS；找不到清單檔時拋出 FileNotFoundError。
+    預設只用清單中本機最快的一種雜湊比對，all_digests=True 則比對清單內所有雜湊（仍只讀一次檔）。
+    每個比對過內容的檔案都會附加到檢查點；resume=True 時，檢查點之後 size / mtime 未變的檔案直接沿用上次的結果。
+    use_cache=True 時 dev / inode / size / mtime 未變的檔案改用雜湊快取比對，force_read=True 則一律讀檔。
+    throttle 同 make_manifest。
+    清單項目有分塊 MD5（見 blocks.py）時，該檔各區塊平行讀取比對，不符時於 corrupt_ranges 列出損毀的位元組範圍；
+    stop_early=True 則在該檔第一個損毀區塊停止。比對到一半的大檔會記錄已完成的區塊，resume=True 時從中斷處接續。
+    all_digests=True 時不使用分塊比對。
+    """
+    if level not in VERIFY_LEVELS:
+        raise ValueError(f"未知的比對層級：{level}")
+    manifest_path = find_manifest(folder)
+    if not manifest_path:
+        raise FileNotFoundError(f"找不到清單檔：{os.path.join(folder, MANIFEST_NAME)}")
+
+    # 串流讀取清單，之後依走訪順序外部排序（見下方），不把所有項目留在記憶體
+    log(f"載入清單：{manifest_path}")
+    stats = RunStats()
+    header, entries = read_manifest(manifest_path, stream=True)
+
+    checkpoint_path = os.path.join(folder, VERIFY_CHECKPOINT_NAME)
+    old_header, records = load_checkpoint(checkpoint_path) if resume else (None, [])
+    listed = manifest_algorithms(header)
+    usable = [a for a in listed if a in available_algorithms()]
+    if all_digests:
+        algorithms = usable
+    elif (old_header and old_header.get("checkpoint") == "verify" and old_header.get("algorithms")
+          and all(a in usable for a in old_header["algorithms"])):
+        # 接續時沿用檢查點當時選用的演算法（清單仍有且本機可用），檢查點才不會因選擇不同而作廢
+        algorithms = list(old_header["algorithms"])
+    else:
+        algorithms = [fastest_algorithm(listed)]
+    log(f"比對演算法：{', '.join(a.upper() for a in algorithms)}")
+    block_size = 0 if all_digests else header.get("block_size") or 0
+
+    # 排除規則以清單記錄的為準（舊版清單沒有記錄，視為無規則），確保與建立時走訪的範圍相同
+    rules = IgnoreRules(header.get("ignore") or ())
+    if load_ignore_rules(folder).patterns != rules.patterns:
+        log(f"注意：{IGNORE_FILE} 與清單記錄的排除規則不同，本次沿用清單中的規則")
+
+    missing = []     # 清單有、資料夾沒有
+    extras = []      # 清單沒有、資料夾多出
+    size_mismatch = []
+    hash_mismatch = []
+    mtime_mismatch = []
+    errors = []
+    corrupt = {}     # 分塊比對找到的損毀範圍：rel -> [[起點, 終點], ...]
+    log(f"比對層級：{VERIFY_LEVELS[level]}")
+
+    # 檢查點需對應同一份清單（路徑與修改時間）與同一組演算法才能沿用
+    cp_header = {
+        "checkpoint": "verify",
+        "manifest": os.path.basename(manifest_path),
+        "manifest_mtime_ns": os.stat(manifest_path).st_mtime_ns,
+        "algorithms": algorithms,
+    }
+    resumed = {}
+    if resume:
+        if old_header and all(old_header.get(k) == v for k, v in cp_header.items()):
+            for d in records:
+                # 大檔的分塊比對進度每塊一筆，損毀區塊分散在各筆，需累加
+                prev = resumed.get(d["path"])
+                if "block_prefix" in d and prev is not None and "block_prefix" in prev:
+                    d["bad_blocks"] = prev.get("bad_blocks", []) + d.get("bad_blocks", [])
+                resumed[d["path"]] = d
+            if seed is None:
+                seed = old_header.get("seed")
+            log(f"接續上次中斷的比對：檢查點已有 {len(resumed)} 筆")
+        else:
+            log("沒有可接續的檢查點（或清單已變更），重新比對")
+
+    # 決定要計算 MD5 的範圍：full 全部、sample 事先以種子抽出固定清單、meta 略過
+    info = [f"比對層級：{VERIFY_LEVELS[level]}"]
+    if rules:
+        info.append(f"排除規則：{len(rules.patterns)} 條（{IGNORE_FILE}，依清單記錄）")
+    sample = None
+    picks = None
+    if level == "sample":
+        if seed is None:
+            seed = int(os.environ.get("MD5_SAMPLE_SEED", time.time_ns() % (2 ** 32)))
+        # 先數一次清單筆數，再以種子抽出清單中的第幾筆；同一份清單與種子抽到的檔案固定
+        total = sum(1 for _ in entries)
+        n = sample_size(total)
+        picks = set(random.Random(seed).sample(range(total), n))
+        header, entries = read_manifest(manifest_path, stream=True)
+        log(f"抽樣 {n} / {total} 筆（種子 {seed}）")
+        info.append(
+            f"抽樣：{n} / {total} 筆，種子 {seed}，"
+            f"信心水準 {SAMPLE_CONFIDENCE:.0%}，誤差範圍 ±{SAMPLE_MARGIN:.1%}"
+        )
+        sample = {"seed": seed, "sampled": n, "population": total,
+                  "confidence": SAMPLE_CONFIDENCE, "margin": SAMPLE_MARGIN}
+
+    # 進度以需讀取的位元組計（meta 層級不讀檔，改以檔案數計）
+    sampled = set() if picks is not None else None
+    if level == "meta":
+        def weight(meta):
+            return 1
+    else:
+        def weight(meta):
+            return meta.size if sampled is None or meta.path in sampled else 0
+    dir_totals = {}
+    counts = {"total": 0, "work": 0}
+
+    def load(entries):
+        for i, e in enumerate(entries):
+            counts["total"] += 1
+            for d in ancestors(e.path):
+                dir_totals[d] = dir_totals.get(d, 0) + 1
+            if picks is not None and i in picks:
+                sampled.add(e.path)
+            counts["work"] += weight(e)
+            yield e
+
+    # 清單依 scan_tree 的走訪順序外部排序（記憶體約 DIFF_RUN_SIZE 筆），與走訪結果邊走邊合併
+    t = time.perf_counter()
+    expected = sorted_by_path(load(entries), key=_scan_key)
+    stats.add("manifest_load", time.perf_counter() - t)
+    total = counts["total"]
+    total_work = counts["work"]
+
+    # 走訪與比對同時進行：每筆掃描結果直接對照排序後的清單，多出的檔案當場記錄；
+    # 清單中排在目前走訪位置之前、卻沒有走訪到的項目即為遺失檔案
+    walker = BackgroundIterator(
+        stats.timed("walk", scan_tree(folder, scan_workers, onerror=lambda e: log(f"ERR {e}"), rules=rules)),
+        name="scan",
+    )
+    cache = _open_cache(use_cache, force_read, log) if level != "meta" else None
+    progress(0, total_work)
+    done_work = 0
+    extra_recs = {}  # 多出的檔案：rel -> FileRecord（搬移偵測需要大小與路徑）
+    lost = {}        # 遺失的項目：rel -> Entry
+    resumed_count = 0
+    by_blocks = {}   # 改用分塊比對的大檔：rel -> 檢查點中的部分進度（或 None）
+
+    def plan():
+        # 第一層：存在＋大小（meta 層級另比對修改時間），完全不讀檔；
+        # 產生 (FileRecord, Entry, 是否需雜湊, 快取中的雜湊或 None)
+        nonlocal resumed_count
+        nxt = next(expected, None)
+        nxt_key = _scan_key(nxt) if nxt is not None else None
+        for rec in walker:
+            key = scan_order(rec.rel)
+            while nxt is not None and nxt_key < key:
+                lost[nxt.path] = nxt
+                nxt = next(expected, None)
+                nxt_key = _scan_key(nxt) if nxt is not None else None
+            if nxt is None or nxt.path != rec.rel:
+                extra_recs[rec.rel] = rec
+                continue
+            meta = nxt
+            nxt = next(expected, None)
+            nxt_key = _scan_key(nxt) if nxt is not None else None
+            if rec.size != meta.size:
+                # 大小已不符就不必再讀內容
+                size_mismatch.append(rec.rel)
+                log(f"大小不符：{rec.rel}  清單:{meta.size}  現況:{rec.size}")
+            elif level == "meta":
+                if not mtime_matches(meta, rec):
+                    mtime_mismatch.append(rec.rel)
+                    log(f"時間不符：{rec.rel}")
+            elif sampled is None or rec.rel in sampled:
+                prev = resumed.get(rec.rel)
+                if not (prev and prev.get("size") == rec.size and prev.get("mtime_ns") == rec.mtime_ns):
+                    prev = None
+                if prev is None or "ok" not in prev:
+                    cached = cache.get(rec, algorithms) if cache is not None else None
+                    if cached is None and block_size and meta.blocks:
+                        # 分塊比對不經雜湊引擎，輪到時在主迴圈平行讀取各區塊（接續檢查點中已完成的區塊）
+                        by_blocks[rec.rel] = prev
+                        yield rec, meta, False, None
+                    else:
+                        yield rec, meta, cached is None, cached
+                    continue
+                # 檢查點之後未變動：沿用上次比對結果
+                resumed_count += 1
+                if prev.get("ok"):
+                    log(f"OK  {rec.rel}（檢查點）")
+                else:
+                    hash_mismatch.append(rec.rel)
+                    if prev.get("bad_blocks"):
+                        corrupt[rec.rel] = corrupt_ranges(prev["bad_blocks"], block_size, rec.size)
+                    log(f"雜湊不符：{rec.rel}（檢查點）")
+            yield rec, meta, False, None
+        # 走訪結束：清單剩下的項目都沒有對應的檔案
+        while nxt is not None:
+            lost[nxt.path] = nxt
+            nxt = next(expected, None)
+
+    # 第二層：計算 MD5，與走訪管線串接（同 make_manifest，不需計算的項目以 None 帶過）
+    items, feed = tee(plan())
+    hashed = hash_records((rec if need else None for rec, _, need, _ in feed), workers, use_processes, algorithms,
+                          timed=True, device_limits=device_limits, throttle=throttle)
+    checkpoint = None
+    if level != "meta":
+        checkpoint = CheckpointWriter(checkpoint_path, dict(cp_header, seed=seed), append=bool(resumed))
+    hashed_count = 0
+
+    def check_blocks(rec, meta, prev):
+        # 分塊比對一個大檔：每完成一塊更新進度並記入檢查點，中斷後可從該塊之後接續
+        nonlocal hashed_count
+        start = prev["block_prefix"] if prev else 0
+        bad = list(prev.get("bad_blocks", ())) if prev else []
+        base = done_work
+        done = [min(start * block_size, rec.size)]
+        where = {"path": rec.rel, "size": rec.size, "mtime_ns": rec.mtime_ns}
+
+        def on_block(i, ok, nbytes):
+            record = dict(where, block_prefix=i + 1)
+            if not ok:
+                bad.append(i)
+                record["bad_blocks"] = [i]
+            checkpoint.append(record)
+            done[0] += nbytes
+            progress(base + done[0], total_work)
+
+        if start:
+            log(f"接續分塊比對：{rec.rel}（已完成 {start} / {len(meta.blocks)} 塊）")
+        t = time.perf_counter()
+        read_from = done[0]
+        try:
+            with throttle.slot() if throttle is not None else nullcontext():
+                _, stopped = verify_blocks(rec.path, meta.blocks, block_size, rec.size, start=start,
+                                           stop_early=stop_early, throttle=throttle, on_block=on_block)
+        except Exception as e:
+            stats.add("hash", time.perf_counter() - t)
+            log(f"ERR {rec.rel}: {e}")
+            errors.append({"path": rec.rel, "error": str(e)})
+            return
+        stats.record_file(rec.rel, done[0] - read_from, time.perf_counter() - t)
+        hashed_count += 1
+        if bad:
+            hash_mismatch.append(rec.rel)
+            corrupt[rec.rel] = corrupt_ranges(bad, block_size, rec.size)
+            note = "（在第一個損毀區塊停止，之後未檢查）" if stopped else ""
+            log(f"MD5 不符：{rec.rel}  損毀區段：{ranges_text(corrupt[rec.rel])}{note}")
+        else:
+            log(f"OK  {rec.rel}（分塊 {len(meta.blocks)} 塊）")
+        checkpoint.append(dict(where, ok=not bad, bad_blocks=sorted(bad)))
+
+    try:
+        for (rec, meta, need, cached), (_, digests, err, seconds) in zip(items, hashed):
+            if rec.rel in by_blocks:
+                check_blocks(rec, meta, by_blocks.pop(rec.rel))
+                done_work += weight(meta)
+                progress(done_work, total_work)
+                continue
+            done_work += weight(meta)
+            if need or cached is not None:
+                note = "（快取）" if cached is not None else ""
+                if need:
+                    if err is not None:
+                        stats.add("hash", seconds)
+                        log(f"ERR {rec.rel}: {err}")
+                        errors.append({"path": rec.rel, "error": str(err)})
+                        progress(done_work, total_work)
+                        continue
+                    stats.record_file(rec.rel, rec.size, seconds)
+                    if cache is not None:
+                        cache.put(rec, digests)
+                else:
+                    digests = cached
+                hashed_count += 1
+                listed_digests = entry_digests(meta)
+                compared = [a for a in algorithms if listed_digests.get(a)]
+                bad = [a for a in compared if digests[a].lower() != listed_digests[a].lower()]
+                if not compared:
+                    log(f"ERR {rec.rel}: 清單項目缺少 {'/'.join(algorithms)} 雜湊")
+                    errors.append({"path": rec.rel, "error": "清單項目缺少雜湊值"})
+                elif bad:
+                    hash_mismatch.append(rec.rel)
+                    for a in bad:
+                        log(f"{a.upper()} 不符：{rec.rel}  清單:{listed_digests[a]}  現況:{digests[a]}{note}")
+                else:
+                    log(f"OK  {rec.rel}{note}")
+                if checkpoint is not None and compared:
+                    checkpoint.append({"path": rec.rel, "size": rec.size, "mtime_ns": rec.mtime_ns,
+                                       "ok": not bad})
+            progress(done_work, total_work)
+    finally:
+        hashed.close()
+        walker.close()
+        expected.close()
+        if checkpoint is not None:
+            checkpoint.close()
+        if cache is not None:
+            cache.flush()
+
+    # 清單中未被走訪到的項目即為遺失
+    moved = []
+    try:
+        if level != "meta" and lost and extra_recs:
+            t = time.perf_counter()
+            moved = detect_moves(lost, extra_recs, algorithms[0], workers, use_processes, device_limits, log,
+                                 cache=cache, throttle=throttle)
+            stats.add("moves", time.perf_counter() - t)
+    finally:
+        if cache is not None:
+            cache.close()
+    missing.extend(lost)
+    extras.extend(extra_recs)
+    directory_totals(extras, dir_totals)
+    progress(total_work, total_work)
+    if resumed_count:
+        info.append(f"接續檢查點：{resumed_count} 筆沿用上次的比對結果")
+    if cache is not None:
+        info.append(cache_line(cache.summary()))
+
+    if sample is not None:
+        bound = sample_defect_bound(hashed_count + resumed_count, len(hash_mismatch))
+        sample["defect_bound"] = bound
+        info.append(
+            f"推估：在 {SAMPLE_CONFIDENCE:.0%} 信心下，整體 MD5 異常比例約不超過 {bound:.2%}"
+            if not hash_mismatch else f"抽樣異常比例：{bound:.2%}"
+        )
+        log(info[-1])
+
+    for lst in (missing, extras, size_mismatch, hash_mismatch, mtime_mismatch):
+        lst.sort()
+
+    ok_count = total - (len(missing) + len(size_mismatch) + len(hash_mismatch) + len(mtime_mismatch))
+
+    result = {
+        "folder": folder,
+        "manifest_path": manifest_path,
+        "level": level,
+        "algorithms": algorithms,
+        "total": total,
+        "ok": ok_count,
+        "missing": missing,
+        "size_mismatch": size_mismatch,
+        "hash_mismatch": hash_mismatch,
+        "mtime_mismatch": mtime_mismatch if level == "meta" else None,
+        "extras": extras,
+        "moved": moved,
+        "errors": errors,
+        "sample": sample,
+        "info": info,
+        "corrupt_ranges": corrupt,
+        "cache": cache.summary() if cache is not None else None,
+        "throttle": throttle.summary() if throttle is not None else None,
+        "stats": stats.as_dict(),
+    }
+    result["rollup"] = _rollup(result, dir_totals)
+    _log_summary(result, log)
+    if checkpoint is not None:
+        checkpoint.close(remove=True)
+    return result
+
+def compare_folders(source: str, dest: str, algorithms=DEFAULT_ALGORITHMS, write_manifest: bool = False,
+                    fmt: str = None, workers: int = HASH_WORKERS, dest_workers: int = None,
+                    use_processes: bool = HASH_USE_PROCESSES, scan_workers: int = SCAN_WORKERS,
+                    device_limits: dict = None, use_cache: bool = USE_HASH_CACHE, force_read: bool = False,
+                    throttle=None, log=_noop_log, progress=_noop_progress) -> dict:
+    """
+    不經清單檔，直接比對來源資料夾 source 與目的資料夾 dest（例如搬移後的掛載副本），
+    回傳與 verify_manifest 相同結構的結果（folder 為 dest，另有 source）。
+    兩邊各用一個雜湊工作池同時讀取（dest_workers 未指定時與 workers 相同），比對 algorithms 中所有雜湊。
+    write_manifest=True 時來源端每個檔案都會計算，並順便在 source 寫出清單檔（fmt 規則同 make_manifest）。
+    use_cache / force_read 同 verify_manifest，兩邊都會查快取；throttle 的上限為兩邊合計。
+    """
+    log(f"直接比對：{source} → {dest}")
+    stats = RunStats()
+    algorithms = normalize_algorithms(algorithms)
+    dest_workers = dest_workers or workers
+    onerror = lambda e: log(f"ERR {e}")  # noqa: E731
+
+    # 兩邊同時在背景走訪，依相同的走訪順序（見 scan.scan_order）邊走邊合併，目的端走完之前就開始雜湊；
+    # 來源的 .md5ignore 同時套用在兩邊
+    rules = _load_rules(source, log)
+    discovered = [0]
+
+    def scan_source():
+        for rec in stats.timed("walk", scan_tree(source, scan_workers, onerror=onerror, rules=rules)):
+            discovered[0] += rec.size
+            yield rec
+
+    src_walker = BackgroundIterator(scan_source(), name="scan-src")
+    dst_walker = BackgroundIterator(
+        stats.timed("walk_dest", scan_tree(dest, scan_workers, onerror=onerror, rules=rules)), name="scan-dst"
+    )
+    dest_recs = {}  # 目的端多出的檔案：rel -> FileRecord
+    progress(0, 1)
+    cache = _open_cache(use_cache, force_read, log)
+
+    missing_recs = {}     # 來源有、目的沒有：rel -> FileRecord
+    missing_digests = {}  # 其中已算過雜湊者（write_manifest 時）
+    size_mismatch = []
+    hash_mismatch = []
+    errors = []
+    counts = {"total": 0, "ok": 0}
+    dir_totals = {}
+
+    def plan():
+        # 產生 (來源 FileRecord, 需比對內容的目的 FileRecord 或 None, 來源快取, 目的快取)
+        dst_iter = iter(dst_walker)
+        nxt = next(dst_iter, None)
+        for rec in src_walker:
+            counts["total"] += 1
+            for d in ancestors(rec.rel):
+                dir_totals[d] = dir_totals.get(d, 0) + 1
+            key = scan_order(rec.rel)
+            # 目的端排在目前來源檔之前的檔案，來源都沒有
+            while nxt is not None and scan_order(nxt.rel) < key:
+                dest_recs[nxt.rel] = nxt
+                nxt = next(dst_iter, None)
+            dst = None
+            if nxt is not None and nxt.rel == rec.rel:
+                dst = nxt
+                nxt = next(dst_iter, None)
+            if dst is None:
+                missing_recs[rec.rel] = rec
+            elif dst.size != rec.size:
+                size_mismatch.append(rec.rel)
+                log(f"大小不符：{rec.rel}  來源:{rec.size}  目的:{dst.size}")
+                dst = None
+            src_cached = dst_cached = None
+            if cache is not None:
+                if dst is not None or write_manifest:
+                    src_cached = cache.get(rec, algorithms)
+                if dst is not None:
+                    dst_cached = cache.get(dst, algorithms)
+            yield rec, dst, src_cached, dst_cached
+        while nxt is not None:
+            dest_recs[nxt.rel] = nxt
+            nxt = next(dst_iter, None)
+
+    # 來源與目的各自一個雜湊引擎，依同一順序預先取用（同 make_manifest，不需計算的項目以 None 帶過）
+    items, feed_src, feed_dst = tee(plan(), 3)
+    src_hashed = hash_records((rec if (dst is not None or write_manifest) and sc is None else None
+                               for rec, dst, sc, _ in feed_src),
+                              workers, use_processes, algorithms, timed=True, device_limits=device_limits,
+                              throttle=throttle)
+    dst_hashed = hash_records((dst if dst is not None and dc is None else None for rec, dst, _, dc in feed_dst),
+                              dest_workers, use_processes, algorithms, timed=True, device_limits=device_limits,
+                              throttle=throttle)
+
+    writer = None
+    manifest_path = None
+    if write_manifest:
+        if fmt is None:
+            existing = find_manifest(source)
+            fmt = manifest_format(existing) if existing else MANIFEST_FORMAT
+        manifest_path = manifest_path_for(source, fmt)
+        writer = ManifestWriter(partial_path_for(manifest_path), _manifest_header(source, algorithms, rules))
+
+    def hash_result(result, rec, side):
+        _, digests, err, seconds = result
+        if err is not None:
+            stats.add("hash", seconds)
+            log(f"ERR {side} {rec.rel}: {err}")
+            errors.append({"path": rec.rel, "error": f"{side}：{err}"})
+            return None
+        # 兩邊相對路徑相同，最慢檔案以完整路徑區分
+        stats.record_file(rec.path, rec.size, seconds)
+        if cache is not None:
+            cache.put(rec, digests)
+        return digests
+
+    done_bytes = 0
+    try:
+        for (rec, dst, src_cached, dst_cached), src_result, dst_result in zip(items, src_hashed, dst_hashed):
+            done_bytes += rec.size
+            src_digests = dst_digests = None
+            if dst is not None or write_manifest:
+                src_digests = src_cached if src_cached is not None else hash_result(src_result, rec, "來源")
+                if src_digests is not None and writer is not None:
+                    writer.write(make_entry(rec, src_digests))
+                    if dst is None and rec.rel in missing_recs:
+                        missing_digests[rec.rel] = src_digests
+            if dst is not None:
+                dst_digests = dst_cached if dst_cached is not None else hash_result(dst_result, dst, "目的")
+            if src_digests is not None and dst_digests is not None:
+                bad = [a for a in algorithms if src_digests[a] != dst_digests[a]]
+                if bad:
+                    hash_mismatch.append(rec.rel)
+                    for a in bad:
+                        log(f"{a.upper()} 不符：{rec.rel}  來源:{src_digests[a]}  目的:{dst_digests[a]}")
+                else:
+                    counts["ok"] += 1
+                    log(f"OK  {rec.rel}")
+            total_bytes = discovered[0]
+            progress(done_bytes, total_bytes if src_walker.finished else max(total_bytes, done_bytes + 1))
+        if writer is not None:
+            writer.trailer = {"run_stats": stats.as_dict()}
+            writer.close()
+            os.replace(writer.path, manifest_path)
+            writer = None
+            log(f"清單已寫入：{manifest_path}")
+    finally:
+        src_hashed.close()
+        dst_hashed.close()
+        src_walker.close()
+        dst_walker.close()
+        if writer is not None:
+            # 中途失敗：不在來源資料夾留下寫到一半的暫存清單
+            writer.close()
+            try:
+                os.remove(writer.path)
+            except OSError:
+                pass
+        if cache is not None:
+            cache.flush()
+
+    # 搬移偵測：遺失的來源檔只計算大小與某個多出檔案相同者
+    moved = []
+    missing = {rp: Entry(rp, "", rec.size) for rp, rec in missing_recs.items()}
+    try:
+        if missing and dest_recs:
+            t = time.perf_counter()
+            sizes = {r.size for r in dest_recs.values()}
+            for rp, digests in missing_digests.items():
+                missing[rp] = make_entry(missing_recs[rp], digests)
+            todo = [r for rp, r in missing_recs.items() if r.size in sizes and rp not in missing_digests]
+            for rec, digests, err in _hash_cached(todo, cache, ("md5",), workers, use_processes, device_limits,
+                                                  throttle):
+                if err is None:
+                    missing[rec.rel] = make_entry(rec, digests)
+            moved = detect_moves(missing, dest_recs, "md5", dest_workers, use_processes, device_limits, log,
+                                 cache=cache, throttle=throttle)
+            stats.add("moves", time.perf_counter() - t)
+    finally:
+        if cache is not None:
+            cache.close()
+    progress(1, 1)
+
+    result = {
+        "folder": dest,
+        "source": source,
+        "manifest_path": manifest_path,
+        "level": "full",
+        "algorithms": list(algorithms),
+        "total": counts["total"],
+        "ok": counts["ok"],
+        "missing": sorted(missing),
+        "size_mismatch": sorted(size_mismatch),
+        "hash_mismatch": sorted(hash_mismatch),
+        "mtime_mismatch": None,
+        "extras": sorted(dest_recs),
+        "moved": moved,
+        "errors": errors,
+        "sample": None,
+        "info": ([f"比對方式：直接比對來源資料夾 {source}"]
+                 + ([f"排除規則：{len(rules.patterns)} 條（來源的 {IGNORE_FILE}）"] if rules else [])
+                 + ([cache_line(cache.summary())] if cache is not None else [])),
+        "cache": cache.summary() if cache is not None else None,
+        "throttle": throttle.summary() if throttle is not None else None,
+        "stats": stats.as_dict(),
+    }
+    result["rollup"] = _rollup(result, directory_totals(result["extras"], dir_totals))
+    _log_summary(result, log)
+    return result
+
+def detect_moves(missing: dict, extra_recs: dict, algorithm: str,
+                 workers: int = HASH_WORKERS, use_processes: bool = HASH_USE_PROCESSES,
+                 device_limits: dict = None, log=_noop_log, cache=None, throttle=None) -> list:
+    """
+    找出搬移／改名的檔案：以遺失項目的 (size, 雜湊) 建立索引，只計算大小與某個遺失項目相同的多出檔案。
+    配對成功者自 missing（rel -> Entry）與 extra_recs（rel -> FileRecord）移除，
+    回傳 [{"from": 舊路徑, "to": 新路徑, "ambiguous": bool}]。
+    內容相同的多個遺失項目依路徑排序一對一配對（此時標記 ambiguous）；
+    配對不到遺失項目的相同內容多出檔案視為複本，仍留在多出檔案中。
+    cache 為 HashCache 時先查快取，新算出的雜湊也會寫回。
+    """
+    sizes = {meta.size for meta in missing.values()}
+    candidates = sorted(rp for rp, rec in extra_recs.items() if rec.size in sizes)
+    if not candidates:
+        return []
+
+    log(f"搬移偵測：計算 {len(candidates)} 筆大小相符的多出檔案")
+    hashed = _hash_cached((extra_recs[rp] for rp in candidates), cache, (algorithm,), workers, use_processes,
+                          device_limits, throttle)
+
+    def found():
+        for rp, (_, digests, err) in zip(candidates, hashed):
+            if err is not None:
+                log(f"ERR {rp}: {err}")
+                continue
+            yield rp, digests[algorithm]
+
+    try:
+        return _pair_moves(missing, extra_recs, found(), algorithm, log)
+    finally:
+        hashed.close()
+
+def _pair_moves(missing: dict, extras: dict, found, algorithm: str, log) -> list:
+    """
+    detect_moves 的配對部分：found 為依路徑排序的 (多出路徑, 雜湊)，extras 的值需有 size。
+    配對成功者自 missing 與 extras 移除，回傳依舊路徑排序的 moved 清單。
+    """
+    index = {}  # (size, 雜湊) -> 依路徑排序的遺失項目
+    for rp in sorted(missing):
+        digest = entry_digests(missing[rp]).get(algorithm)
+        if digest:
+            index.setdefault((missing[rp].size, digest.lower()), []).append(rp)
+
+    group_size = {key: len(paths) for key, paths in index.items()}
+    moved = []
+    for rp, digest in found:
+        key = (extras[rp].size, digest.lower())
+        pool = index.get(key)
+        if not pool:
+            continue
+        ambiguous = group_size[key] > 1
+        src = pool.pop(0)
+        moved.append({"from": src, "to": rp, "ambiguous": ambiguous})
+        log(f"搬移／改名：{src} → {rp}" + ("（內容相同的檔案有多筆）" if ambiguous else ""))
+
+    for m in moved:
+        del missing[m["from"]]
+        del extras[m["to"]]
+    moved.sort(key=lambda m: m["from"])
+    return moved
+
+def _resolve_manifest(path: str) -> str:
+    # 可傳入清單檔或含清單的資料夾
+    if os.path.isdir(path):
+        found = find_manifest(path)
+        if not found:
+            raise FileNotFoundError(f"找不到清單檔：{os.path.join(path, MANIFEST_NAME)}")
+        return found
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"找不到清單檔：{path}")
+    return path
+
+def diff_manifests(old: str, new: str, log=_noop_log, progress=_noop_progress) -> dict:
+    """
+    不讀取任何資料檔，直接比對兩份清單（任一格式，也可傳入含清單的資料夾），例如昨天與今天、A 站與 B 站。
+    old 為基準，回傳與 verify_manifest 相同結構的結果：missing 為 new 已移除、extras 為 new 新增、
+    size_mismatch / hash_mismatch 為內容變動（比對兩邊共有的雜湊）、moved 為內容相同但路徑改變。
+    兩份清單各自以外部排序（見 extsort.sorted_by_path）依路徑排序後合併比對，記憶體只與 DIFF_RUN_SIZE 及差異筆數有關。
+    兩邊都有資料夾摘要（dirs）時先只讀兩份清單的檔頭與結尾資訊，找出摘要不同的資料夾；
+    之後依序讀取項目時，摘要相同的資料夾內的項目讀到即略過（計為一致），排序與合併只處理有變動的資料夾。
+    """
+    old_path = _resolve_manifest(old)
+    new_path = _resolve_manifest(new)
+    log(f"清單比對：{old_path} → {new_path}")
+    stats = RunStats()
+    clock = time.perf_counter
+    dir_totals = {}
+
+    def count_dirs(entries):
+        for e in entries:
+            for d in ancestors(e.path):
+                dir_totals[d] = dir_totals.get(d, 0) + 1
+            yield e
+
+    t = clock()
+    old_header = read_manifest_header(old_path)
+    new_header = read_manifest_header(new_path)
+    changed = None
+    if (old_header.get("dirs") is not None and new_header.get("dirs") is not None
+            and old_header.get("dirs_algorithm") == new_header.get("dirs_algorithm")):
+        changed = set(changed_subtrees(old_header["dirs"], new_header["dirs"]))
+        log(f"資料夾摘要：{len(changed)} 個資料夾有變動")
+    stats.add("manifest_load", clock() - t)
+    skipped = [0]
+
+    def changed_only(entries, count: bool):
+        # 所在資料夾摘要相同：兩邊該資料夾的名稱、大小與雜湊必然一致，不必排序比對
+        for e in entries:
+            if changed is None or parent_dir(e.path) in changed:
+                yield e
+            elif count:
+                skipped[0] += 1
+
+    t = clock()
+    _, old_entries = read_manifest(old_path, stream=True)
+    old_sorted = sorted_by_path(changed_only(count_dirs(old_entries), True))
+    _, new_entries = read_manifest(new_path, stream=True)
+    new_sorted = sorted_by_path(changed_only(new_entries, False))
+    stats.add("sort", clock() - t)
+    total = dir_totals.get("", 0)
+    if changed is not None:
+        log(f"摘要相同的資料夾略過 {skipped[0]} 筆，需比對 {total - skipped[0]} 筆")
+
+    listed_new = manifest_algorithms(new_header)
+    algorithms = [a for a in manifest_algorithms(old_header) if a in listed_new]
+    info = [f"比對方式：清單對清單（不讀取檔案），基準清單 {old_path}"]
+    if (old_header.get("ignore") or []) != (new_header.get("ignore") or []):
+        info.append(f"注意：兩份清單的排除規則（{IGNORE_FILE}）不同，被排除的檔案會顯示為新增或移除")
+        log(info[-1])
+
+    removed = {}   # new 沒有的 old 項目：path -> Entry
+    added = {}     # old 沒有的 new 項目：path -> Entry
+    size_mismatch = []
+    hash_mismatch = []
+    errors = []
+    ok_count = skipped[0]
+    done = skipped[0]
+    progress(done, max(total, 1))
+
+    t = clock()
+    a = next(old_sorted, None)
+    b = next(new_sorted, None)
+    while a is not None or b is not None:
+        if b is None or (a is not None and a.path < b.path):
+            removed[a.path] = a
+            a = next(old_sorted, None)
+            done += 1
+        elif a is None or b.path < a.path:
+            added[b.path] = b
+            b = next(new_sorted, None)
+        else:
+            if a.size != b.size:
+                size_mismatch.append(a.path)
+                log(f"大小不符：{a.path}  基準:{a.size}  比較:{b.size}")
+            else:
+                da, db = entry_digests(a), entry_digests(b)
+                common = [x for x in algorithms if da.get(x) and db.get(x)]
+                bad = [x for x in common if da[x].lower() != db[x].lower()]
+                if not common:
+                    errors.append({"path": a.path, "error": "兩份清單沒有共同的雜湊值"})
+                elif bad:
+                    hash_mismatch.append(a.path)
+                    for x in bad:
+                        log(f"{x.upper()} 不符：{a.path}  基準:{da[x]}  比較:{db[x]}")
+                else:
+                    ok_count += 1
+            a = next(old_sorted, None)
+            b = next(new_sorted, None)
+            done += 1
+        if done % 1000 == 0:
+            progress(done, max(total, 1))
+    stats.add("merge", clock() - t)
+
+    moved = []
+    if removed and added:
+        t = clock()
+        sizes = {e.size for e in removed.values()}
+        found = ((rp, entry_digests(e).get("md5")) for rp, e in sorted(added.items()) if e.size in sizes)
+        moved = _pair_moves(removed, added, ((rp, d) for rp, d in found if d), "md5", log)
+        stats.add("moves", clock() - t)
+    progress(1, 1)
+
+    result = {
+        "folder": os.path.dirname(os.path.abspath(new_path)),
+        "base_manifest": old_path,
+        "manifest_path": new_path,
+        "level": "manifest",
+        "algorithms": algorithms,
+        "total": total,
+        "ok": ok_count,
+        "missing": sorted(removed),
+        "size_mismatch": size_mismatch,
+        "hash_mismatch": hash_mismatch,
+        "mtime_mismatch": None,
+        "extras": sorted(added),
+        "moved": moved,
+        "errors": errors,
+        "sample": None,
+        "info": info,
+        "stats": stats.as_dict(),
+    }
+    result["rollup"] = _rollup(result, directory_totals(result["extras"], dir_totals))
+    _log_summary(result, log)
+    return result
+
+def has_failures(result: dict) -> bool:
+    """比對結果是否有內容異常（多出檔案不算失敗）。"""
+    return bool(result["missing"] or result["size_mismatch"] or result["hash_mismatch"]
+                or result.get("mtime_mismatch") or result.get("errors"))
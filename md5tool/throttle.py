@@ -0,0 +1,249 @@
+"""
+讀檔限速：在營運中的檔案伺服器上比對時，避免本工具吃光磁碟頻寬而拖慢其他服務。
+
+Throttle 以 token bucket 限制總讀取頻寬（MB/s）與每秒讀取次數（IOPS），並可限制同時讀取的檔案數；
+所有上限可在執行中調整（GUI、或 CLI 的控制檔），0 表示不限。
+lower_priority() 另外降低 CPU 與 I/O 優先權（Linux），兩者可搭配使用。
+"""
+import json
+import os
+import platform
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from .constants import LOW_PRIORITY, MAX_CONCURRENCY, MAX_IOPS, MAX_MBPS, THROTTLE_BURST
+from .stats import format_bytes
+
+MB = 1024 * 1024
+_MAX_SLEEP = 0.25  # 等待時最長一次睡多久，上限調整後能很快生效
+_RATE_WINDOW = 5.0  # 顯示實際速度時取最近幾秒的平均
+
+
+class _Bucket:
+    """token bucket：先用後還，額度為負時等待補回；rate 為 0 表示不限。非執行緒安全，由 Throttle 加鎖。"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.level = 0.0
+        self.last = time.monotonic()
+
+    def refill(self, now: float):
+        if self.rate:
+            self.level = min(self.rate * THROTTLE_BURST, self.level + (now - self.last) * self.rate)
+        else:
+            self.level = 0.0
+        self.last = now
+
+    def wait_time(self) -> float:
+        return -self.level / self.rate if self.rate and self.level < 0 else 0.0
+
+
+class Throttle:
+    """
+    多個工作執行緒共用的限速器。hash_file 每次讀取後呼叫 consume(n)，
+    額度用完時該執行緒暫停；hash_records 以 slot() 包住每個檔案，限制同時讀取的檔案數。
+    """
+
+    def __init__(self, mb_per_s: float = MAX_MBPS, iops: int = MAX_IOPS, concurrency: int = MAX_CONCURRENCY):
+        self._lock = threading.Lock()
+        self._slots = threading.Condition(self._lock)
+        self._bytes = _Bucket(0)
+        self._ops = _Bucket(0)
+        self.mb_per_s = 0.0
+        self.iops = 0
+        self.concurrency = 0
+        self._active = 0
+        self.total_bytes = 0
+        self._first = None
+        self._last = None
+        self._marks = deque()  # (時間, 累計位元組)，計算最近的實際速度
+        self._watcher = None
+        self._stop = threading.Event()
+        self.set_limits(mb_per_s, iops, concurrency)
+
+    @property
+    def limited(self) -> bool:
+        return bool(self.mb_per_s or self.iops or self.concurrency)
+
+    def set_limits(self, mb_per_s: float = None, iops: int = None, concurrency: int = None):
+        """調整上限（None 表示不變，0 表示不限）；執行中呼叫會在下一次讀取時生效。"""
+        with self._lock:
+            now = time.monotonic()
+            if mb_per_s is not None:
+                self.mb_per_s = max(0.0, float(mb_per_s))
+                self._bytes.refill(now)
+                self._bytes.rate = self.mb_per_s * MB
+            if iops is not None:
+                self.iops = max(0, int(iops))
+                self._ops.refill(now)
+                self._ops.rate = self.iops
+            if concurrency is not None:
+                self.concurrency = max(0, int(concurrency))
+                self._slots.notify_all()
+
+    def consume(self, nbytes: int):
+        """記錄一次讀取；超出額度時暫停，直到頻寬與 IOPS 額度都補回。"""
+        with self._lock:
+            now = time.monotonic()
+            self.total_bytes += nbytes
+            if self._first is None:
+                self._first = now
+            self._last = now
+            if not self._marks or now - self._marks[-1][0] >= 0.5:
+                self._marks.append((now, self.total_bytes))
+                while len(self._marks) > 2 and now - self._marks[1][0] >= _RATE_WINDOW:
+                    self._marks.popleft()
+            if not (self._bytes.rate or self._ops.rate):
+                return
+            for bucket, amount in ((self._bytes, nbytes), (self._ops, 1)):
+                bucket.refill(now)
+                bucket.level -= amount
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._bytes.refill(now)
+                self._ops.refill(now)
+                wait = max(self._bytes.wait_time(), self._ops.wait_time())
+            if wait <= 0:
+                return
+            time.sleep(min(wait, _MAX_SLEEP))
+
+    @contextmanager
+    def slot(self):
+        """with throttle.slot(): 讀一個檔案；同時讀取的檔案數達上限時等待。"""
+        with self._slots:
+            while self.concurrency and self._active >= self.concurrency:
+                self._slots.wait(_MAX_SLEEP)
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._slots:
+                self._active -= 1
+                self._slots.notify()
+
+    def rate(self) -> float:
+        """最近幾秒的實際讀取速度（bytes/s）。"""
+        with self._lock:
+            if not self._marks:
+                return 0.0
+            now = time.monotonic()
+            t0, b0 = self._marks[0]
+            if now - self._last > _RATE_WINDOW:
+                return 0.0
+            return (self.total_bytes - b0) / max(now - t0, 1e-3)
+
+    def status_text(self) -> str:
+        """進度列用：目前速度與上限，例如「讀取 18.5 MB/s（上限 20 MB/s）」。"""
+        text = f"讀取 {format_bytes(self.rate())}/s"
+        caps = _caps_text(self.mb_per_s, self.iops, self.concurrency)
+        return f"{text}（{caps}）" if caps else text
+
+    def summary(self) -> dict:
+        with self._lock:
+            elapsed = (self._last - self._first) if self._first is not None else 0.0
+        return {
+            "mb_per_s": self.mb_per_s,
+            "iops": self.iops,
+            "concurrency": self.concurrency,
+            "bytes": self.total_bytes,
+            "average_mb_per_s": round(self.total_bytes / MB / elapsed, 2) if elapsed > 0 else None,
+        }
+
+    # ---------- 控制檔 ----------
+    def watch_file(self, path: str, log, interval: float = 1.0):
+        """
+        在背景定期讀取 JSON 控制檔（例如 {"mb_per_s": 50, "iops": 0, "concurrency": 2}），
+        檔案修改後立即套用新上限；檔案不存在時維持目前設定。
+        """
+        def run():
+            seen = None
+            while not self._stop.wait(interval):
+                try:
+                    mtime = os.stat(path).st_mtime_ns
+                except OSError:
+                    continue
+                if mtime == seen:
+                    continue
+                seen = mtime
+                try:
+                    with open(path, "r", encoding="utf-8-sig") as f:
+                        data = json.load(f)
+                    self.set_limits(data.get("mb_per_s"), data.get("iops"), data.get("concurrency"))
+                except (OSError, ValueError, TypeError, AttributeError) as e:
+                    log(f"限速控制檔讀取失敗，維持原設定：{e}")
+                    continue
+                log(f"限速設定已更新：{_caps_text(self.mb_per_s, self.iops, self.concurrency) or '不限'}")
+
+        self._watcher = threading.Thread(target=run, name="md5-throttle", daemon=True)
+        self._watcher.start()
+
+    def close(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+
+def _caps_text(mb_per_s: float, iops: int, concurrency: int) -> str:
+    caps = []
+    if mb_per_s:
+        caps.append(f"上限 {mb_per_s:g} MB/s")
+    if iops:
+        caps.append(f"{iops} IOPS")
+    if concurrency:
+        caps.append(f"同時 {concurrency} 檔")
+    return "、".join(caps)
+
+def throttle_line(summary: dict) -> str:
+    """限速統計的摘要文字（日誌用）。"""
+    avg = summary.get("average_mb_per_s")
+    text = f"讀取限速：共讀取 {format_bytes(summary['bytes'])}"
+    if avg is not None:
+        text += f"，平均 {avg:g} MB/s"
+    caps = _caps_text(summary["mb_per_s"], summary["iops"], summary["concurrency"])
+    return text + (f"（{caps}）" if caps else "（不限）")
+
+# ---------- 優先權 ----------
+_IOPRIO_SYSCALL = {"x86_64": 251, "amd64": 251, "i386": 289, "i686": 289, "aarch64": 30, "arm64": 30,
+                   "armv7l": 314, "ppc64le": 273, "s390x": 283}
+_IOPRIO_CLASS_BE = 2
+_IOPRIO_CLASS_IDLE = 3
+_IOPRIO_WHO_PROCESS = 1
+
+def _set_ioprio(io_class: int, level: int) -> bool:
+    number = _IOPRIO_SYSCALL.get(platform.machine().lower())
+    if number is None:
+        return False
+    import ctypes
+    libc = ctypes.CDLL(None, use_errno=True)
+    # ioprio_set(IOPRIO_WHO_PROCESS, 0, class << 13 | level)：0 為呼叫的執行緒，之後建立的執行緒會繼承
+    return libc.syscall(number, _IOPRIO_WHO_PROCESS, 0, (io_class << 13) | level) == 0
+
+def lower_priority(mode: str = LOW_PRIORITY) -> list:
+    """
+    降低目前執行緒（以及之後由它建立的執行緒）的優先權，回傳已套用的項目說明。
+    mode 為 "be"（I/O 最低的盡力而為等級）或 "idle"（磁碟閒置時才讀）；空字串不做任何事。
+    I/O 優先權只在 Linux 的 BFQ / CFQ 排程器有效；其他平台只調整 nice（若支援）。
+    應在建立工作執行緒之前呼叫（CLI 於啟動時、GUI 於每次執行的背景執行緒開頭）。
+    """
+    mode = (mode or "").strip().lower()
+    if not mode or mode in ("0", "off", "no"):
+        return []
+    applied = []
+    if hasattr(os, "nice"):
+        try:
+            os.nice(19 - os.nice(0))
+            applied.append("nice 19")
+        except OSError:
+            pass
+    if platform.system() == "Linux":
+        idle = mode == "idle"
+        try:
+            if _set_ioprio(_IOPRIO_CLASS_IDLE if idle else _IOPRIO_CLASS_BE, 0 if idle else 7):
+                applied.append("I/O idle" if idle else "I/O best-effort 7")
+        except OSError:
+            pass
+    return applied
@@ -0,0 +1,156 @@
+"""
+監看模式的事件來源：Linux 以 inotify（ctypes，不需額外套件）監看整棵資料夾的變動。
+inotify 無法使用（其他平台、監看數超過 fs.inotify.max_user_watches 等）時，
+由 tasks.watch_folder 改為定期走訪並與清單比對快照。
+"""
+import errno
+import os
+import select
+import struct
+
+from .scan import is_root_ignore_file, should_ignore, win_longpath
+
+# inotify 事件旗標（<sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONTFOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+
+_WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+               | IN_ONLYDIR | IN_DONTFOLLOW)
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len
+
+# 事件種類：(種類, 相對路徑, 是否為資料夾)；overflow 表示核心佇列溢位、有事件遺失，需整棵重新比對
+CREATE, CHANGE, REMOVE, OVERFLOW = "create", "change", "remove", "overflow"
+
+
+def walk_dirs(folder: str, rel: str = "", rules=None):
+    """產生 rel（含）以下所有未被排除的資料夾 (完整路徑, 相對路徑)；不進入指向資料夾的符號連結。"""
+    root = win_longpath(folder)
+    stack = [(os.path.join(root, *rel.split("/")) if rel else root, rel)]
+    while stack:
+        path, r = stack.pop()
+        yield path, r
+        prefix = r + "/" if r else ""
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir() and not entry.is_symlink():
+                            sub = prefix + entry.name
+                            if not (rules and rules.ignored(sub, True)):
+                                stack.append((entry.path, sub))
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+
+def walk_files(folder: str, rel: str = "", rules=None):
+    """產生 rel 以下所有應納入清單的檔案相對路徑（與 scan_tree 相同的排除條件，但不取 stat）。"""
+    for path, r in walk_dirs(folder, rel, rules):
+        prefix = r + "/" if r else ""
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_file() and not should_ignore(entry.name):
+                            name = prefix + entry.name
+                            if not (is_root_ignore_file(name) or (rules and rules.ignored(name))):
+                                yield name
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+
+
+class Inotify:
+    """
+    以 inotify 監看多個資料夾（每個資料夾一個 watch，子資料夾需各自加入）。
+    read(timeout) 回傳 [(種類, 相對路徑, 是否為資料夾)]；非 Linux 或核心不支援時建立即拋出 OSError。
+    """
+
+    def __init__(self, folder: str):
+        if not hasattr(os, "O_NONBLOCK") or not os.path.exists("/proc/sys/fs/inotify"):
+            raise OSError(errno.ENOSYS, "此平台不支援 inotify")
+        import ctypes  # 只有監看模式需要，不拖慢其他指令的啟動
+        self.folder = folder
+        self._libc = ctypes.CDLL(None, use_errno=True)
+        self._get_errno = ctypes.get_errno
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            err = self._get_errno()
+            raise OSError(err, os.strerror(err))
+        self._dirs = {}  # wd -> 資料夾相對路徑
+
+    def add_tree(self, rel: str = "", rules=None) -> int:
+        """監看 rel 以下所有未被排除的資料夾，回傳新加入的數量；監看數達上限時拋出 OSError。"""
+        added = 0
+        for path, r in walk_dirs(self.folder, rel, rules):
+            wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), _WATCH_MASK)
+            if wd < 0:
+                err = self._get_errno()
+                if err == errno.ENOSPC:
+                    raise OSError(err, "inotify 監看數已達上限（可調高 fs.inotify.max_user_watches）")
+                continue  # 資料夾在走訪後又被刪除等
+            if wd not in self._dirs:
+                added += 1
+            self._dirs[wd] = r
+        return added
+
+    def remove_tree(self, rel: str):
+        """資料夾被刪除或移走時，移除它與其下所有的 watch（移走的 watch 仍會以舊路徑回報事件）。"""
+        prefix = rel + "/"
+        for wd, r in list(self._dirs.items()):
+            if r == rel or r.startswith(prefix):
+                self._libc.inotify_rm_watch(self.fd, wd)
+                del self._dirs[wd]
+
+    def read(self, timeout: float) -> list:
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 256 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        off = 0
+        while off + _EVENT.size <= len(data):
+            wd, mask, _, n = _EVENT.unpack_from(data, off)
+            name = os.fsdecode(data[off + _EVENT.size:off + _EVENT.size + n].rstrip(b"\0"))
+            off += _EVENT.size + n
+            if mask & IN_Q_OVERFLOW:
+                events.append((OVERFLOW, "", False))
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            base = self._dirs.get(wd)
+            if base is None or not name:
+                continue  # 資料夾本身的事件（刪除、移動）由上層資料夾的事件處理
+            rel = base + "/" + name if base else name
+            is_dir = bool(mask & IN_ISDIR)
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                events.append((CREATE, rel, is_dir))
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                events.append((REMOVE, rel, is_dir))
+            elif not is_dir:
+                events.append((CHANGE, rel, False))
+        return events
+
+    @property
+    def watches(self) -> int:
+        return len(self._dirs)
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
@@ -0,0 +1,205 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from md5tool import hashing, tasks
+from md5tool.blocks import BlockHasher, block_count, corrupt_ranges, verify_blocks
+from md5tool.manifest import find_manifest, read_manifest
+from md5tool.tasks import make_manifest, verify_manifest
+
+BLOCK = 256 * 1024  # hash_file 只對超過一個讀取區塊（CHUNK_SIZE）的檔案計算分塊
+SIZE = 10 * BLOCK + 123  # 最後一塊不滿 BLOCK
+
+
+def _block_md5s(data: bytes, block_size: int) -> list:
+    return [hashlib.md5(data[i:i + block_size]).hexdigest() for i in range(0, len(data), block_size)]
+
+
+def _flip(path: str, offset: int):
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        b = f.read(1)
+        f.seek(offset)
+        f.write(bytes([b[0] ^ 0xFF]))
+
+
+class BlockHasherAndRanges(unittest.TestCase):
+    def test_hasher_splits_at_block_boundaries(self):
+        data = os.urandom(SIZE)
+        h = BlockHasher(BLOCK)
+        # 餵入的片段大小與區塊邊界無關
+        for i in range(0, len(data), 1000):
+            h.update(data[i:i + 1000])
+        self.assertEqual(h.finish(), _block_md5s(data, BLOCK))
+        self.assertEqual(block_count(SIZE, BLOCK), 11)
+        self.assertEqual(block_count(0, BLOCK), 0)
+
+    def test_corrupt_ranges_merges_adjacent_blocks(self):
+        self.assertEqual(corrupt_ranges([], BLOCK, SIZE), [])
+        self.assertEqual(corrupt_ranges([3], BLOCK, SIZE), [[3 * BLOCK, 4 * BLOCK]])
+        self.assertEqual(corrupt_ranges([5, 1, 2, 10], BLOCK, SIZE),
+                         [[BLOCK, 3 * BLOCK], [5 * BLOCK, 6 * BLOCK], [10 * BLOCK, SIZE]])
+
+
+class VerifyBlocksDirect(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmp, "big.bin")
+        with open(self.path, "wb") as f:
+            f.write(os.urandom(SIZE))
+        with open(self.path, "rb") as f:
+            self.expected = _block_md5s(f.read(), BLOCK)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_reports_every_bad_block_in_order(self):
+        _flip(self.path, 2 * BLOCK + 7)
+        _flip(self.path, 7 * BLOCK)
+        seen = []
+        bad, stopped = verify_blocks(self.path, self.expected, BLOCK, SIZE, workers=3,
+                                     on_block=lambda i, ok, n: seen.append((i, ok, n)))
+        self.assertEqual(bad, [2, 7])
+        self.assertFalse(stopped)
+        self.assertEqual([i for i, _, _ in seen], list(range(11)))
+        self.assertEqual(sum(n for _, _, n in seen), SIZE)
+
+    def test_stop_early_stops_at_first_bad_block(self):
+        _flip(self.path, 2 * BLOCK)
+        _flip(self.path, 7 * BLOCK)
+        seen = []
+        bad, stopped = verify_blocks(self.path, self.expected, BLOCK, SIZE, workers=2, stop_early=True,
+                                     on_block=lambda i, ok, n: seen.append(i))
+        self.assertEqual(bad, [2])
+        self.assertTrue(stopped)
+        self.assertEqual(seen, [0, 1, 2])
+
+    def test_start_skips_earlier_blocks(self):
+        _flip(self.path, 0)  # 第 0 塊損毀，但從第 4 塊開始不會讀到
+        seen = []
+        bad, _ = verify_blocks(self.path, self.expected, BLOCK, SIZE, start=4,
+                               on_block=lambda i, ok, n: seen.append(i))
+        self.assertEqual(bad, [])
+        self.assertEqual(seen, list(range(4, 11)))
+
+    def test_block_count_mismatch_raises(self):
+        with self.assertRaises(ValueError):
+            verify_blocks(self.path, self.expected[:-1], BLOCK, SIZE)
+
+
+class BlockManifestVerify(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.big = os.path.join(self.tmp, "big.bin")
+        with open(self.big, "wb") as f:
+            f.write(os.urandom(SIZE))
+        with open(os.path.join(self.tmp, "small.txt"), "w") as f:
+            f.write("small")
+        # 測試用的小區塊：tasks 與 hashing 各自匯入了這些常數
+        self.patches = [mock.patch.object(tasks, "BLOCK_SIZE", BLOCK),
+                        mock.patch.object(tasks, "BLOCK_MIN_SIZE", 2 * BLOCK),
+                        mock.patch.object(hashing, "BLOCK_MIN_SIZE", 2 * BLOCK)]
+        for p in self.patches:
+            p.start()
+
+    def tearDown(self):
+        for p in self.patches:
+            p.stop()
+        shutil.rmtree(self.tmp)
+
+    def _make(self, fmt: str):
+        make_manifest(self.tmp, fmt=fmt, blocks=True, use_processes=False, use_cache=False)
+
+    def _verify(self, **kwargs):
+        return verify_manifest(self.tmp, use_processes=False, use_cache=False, **kwargs)
+
+    def test_blocks_round_trip_through_every_format(self):
+        with open(self.big, "rb") as f:
+            expected = _block_md5s(f.read(), BLOCK)
+        for fmt in ("json", "jsonl", "jsonl.gz", "bin", "bin.gz"):
+            with self.subTest(fmt=fmt):
+                self._make(fmt)
+                path = find_manifest(self.tmp)
+                header, entries = read_manifest(path)
+                self.assertEqual(header["block_size"], BLOCK)
+                by_path = {e.path: e for e in entries}
+                # bin 格式以路徑長度 _BIN_BLOCKS 的紀錄存放分塊摘要，讀回後與前一筆項目合併
+                self.assertEqual(by_path["big.bin"].blocks, expected)
+                self.assertIsNone(by_path["small.txt"].blocks)
+                self.assertEqual(by_path["small.txt"].md5, hashlib.md5(b"small").hexdigest())
+                os.remove(path)
+
+    def test_corrupt_block_reports_byte_range(self):
+        self._make("bin")
+        _flip(self.big, 5 * BLOCK + 100)
+        result = self._verify()
+        self.assertEqual(result["hash_mismatch"], ["big.bin"])
+        self.assertEqual(result["corrupt_ranges"], {"big.bin": [[5 * BLOCK, 6 * BLOCK]]})
+        self.assertEqual(result["ok"], 1)
+
+    def test_stop_early_reports_only_first_range(self):
+        self._make("jsonl")
+        _flip(self.big, 1 * BLOCK)
+        _flip(self.big, 9 * BLOCK)
+        self.assertEqual(self._verify()["corrupt_ranges"], {"big.bin": [[BLOCK, 2 * BLOCK], [9 * BLOCK, 10 * BLOCK]]})
+        self.assertEqual(self._verify(stop_early=True)["corrupt_ranges"], {"big.bin": [[BLOCK, 2 * BLOCK]]})
+
+    def test_interrupted_verify_resumes_after_last_block(self):
+        self._make("json")
+        _flip(self.big, 2 * BLOCK)
+        real = tasks.verify_blocks
+        starts = []
+
+        def interrupted(path, expected, block_size, size, start=0, on_block=None, **kwargs):
+            starts.append(start)
+
+            def stop_after_four(i, ok, nbytes):
+                on_block(i, ok, nbytes)
+                if i == 3:
+                    raise KeyboardInterrupt
+
+            return real(path, expected, block_size, size, start=start, on_block=stop_after_four, **kwargs)
+
+        with mock.patch.object(tasks, "verify_blocks", interrupted):
+            with self.assertRaises(KeyboardInterrupt):
+                self._verify()
+        self.assertTrue(os.path.exists(os.path.join(self.tmp, tasks.VERIFY_CHECKPOINT_NAME)))
+
+        logs = []
+        with mock.patch.object(tasks, "verify_blocks", lambda *a, **kw: starts.append(kw["start"]) or real(*a, **kw)):
+            result = self._verify(resume=True, log=logs.append)
+        # 第二次從第 4 塊接著讀，第 2 塊的損毀由檢查點帶過來
+        self.assertEqual(starts, [0, 4])
+        self.assertTrue(any("接續分塊比對：big.bin" in line for line in logs))
+        self.assertEqual(result["hash_mismatch"], ["big.bin"])
+        self.assertEqual(result["corrupt_ranges"], {"big.bin": [[2 * BLOCK, 3 * BLOCK]]})
+        self.assertFalse(os.path.exists(os.path.join(self.tmp, tasks.VERIFY_CHECKPOINT_NAME)))
+
+    def test_changed_file_does_not_resume(self):
+        self._make("json")
+        real = tasks.verify_blocks
+        starts = []
+
+        def interrupted(path, expected, block_size, size, start=0, on_block=None, **kwargs):
+            def stop(i, ok, nbytes):
+                on_block(i, ok, nbytes)
+                raise KeyboardInterrupt
+            return real(path, expected, block_size, size, start=start, on_block=stop, **kwargs)
+
+        with mock.patch.object(tasks, "verify_blocks", interrupted):
+            with self.assertRaises(KeyboardInterrupt):
+                self._verify()
+        st = os.stat(self.big)
+        os.utime(self.big, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        with mock.patch.object(tasks, "verify_blocks", lambda *a, **kw: starts.append(kw["start"]) or real(*a, **kw)):
+            result = self._verify(resume=True)
+        # 修改時間已變，檢查點中的部分進度作廢，從頭比對
+        self.assertEqual(starts, [0])
+        self.assertEqual(result["hash_mismatch"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from md5tool import manifest, tasks
+from md5tool.manifest import read_manifest_header
+from md5tool.tasks import diff_manifests, make_manifest
+
+
+def _write(root: str, rel: str, data: str):
+    path = os.path.join(root, *rel.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(data)
+
+
+class DiffSkipsIdenticalSubtrees(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.old = os.path.join(self.tmp, "old")
+        self.new = os.path.join(self.tmp, "new")
+        for rel in ("a/1", "a/2", "b/1", "b/2", "c/d/1", "c/d/2", "top"):
+            _write(self.old, rel, rel)
+        shutil.copytree(self.old, self.new)
+        _write(self.new, "b/2", "changed")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_identical_subtrees_never_sorted_or_compared(self):
+        for fmt in ("json", "jsonl", "jsonl.gz", "bin"):
+            with self.subTest(fmt=fmt):
+                for folder in (self.old, self.new):
+                    make_manifest(folder, fmt=fmt)
+                fed = []
+                real = tasks.sorted_by_path
+
+                def recording(entries, *args, **kwargs):
+                    return real((fed.append(e.path) or e for e in entries), *args, **kwargs)
+
+                with mock.patch.object(tasks, "sorted_by_path", recording):
+                    result = diff_manifests(self.old, self.new)
+                # 只有摘要不同的資料夾（b 與其上層的根目錄）的項目進入排序與合併；a、c/d 的檔案讀到即略過
+                self.assertEqual(sorted(set(fed)), ["b/1", "b/2", "top"])
+                self.assertEqual(result["total"], 7)
+                self.assertEqual(result["ok"], 6)
+                self.assertEqual(result["size_mismatch"], ["b/2"])
+                for folder in (self.old, self.new):
+                    for name in os.listdir(folder):
+                        if name.startswith("_md5_manifest"):
+                            os.remove(os.path.join(folder, name))
+
+    def test_without_dirs_compares_everything(self):
+        make_manifest(self.old)
+        make_manifest(self.new)
+        fed = []
+        real = tasks.sorted_by_path
+        with mock.patch.object(tasks, "read_manifest_header", lambda path: {"algorithms": ["md5"]}), \
+                mock.patch.object(tasks, "sorted_by_path",
+                                  lambda entries: real(fed.append(e.path) or e for e in entries)):
+            result = diff_manifests(self.old, self.new)
+        self.assertEqual(len(fed), 14)
+        self.assertEqual(result["ok"], 6)
+        self.assertEqual(result["size_mismatch"], ["b/2"])
+
+
+class JsonHeaderWithoutEntries(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_legacy_manifest_entries_never_decoded(self):
+        # 舊版 GUI 以 json.dump 寫出、entries 之後沒有結尾資訊
+        path = os.path.join(self.tmp, "_md5_manifest.json")
+        entries = [{"path": f"d{i % 50}/f{i}", "md5": "0" * 32, "size": i, "mtime": 0} for i in range(20000)]
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"tool": "legacy", "algorithm": "md5", "entries": entries}, f, ensure_ascii=False, indent=2)
+        with mock.patch.object(manifest, "entry_from_dict", side_effect=AssertionError("entries decoded")):
+            header = read_manifest_header(path)
+        self.assertEqual(header, {"tool": "legacy", "algorithm": "md5"})
+
+    def test_oversized_trailer_falls_back_to_skipping_entries(self):
+        for rel in ("a/1", "b/2", "top"):
+            _write(self.tmp, rel, rel)
+        path = make_manifest(self.tmp, fmt="json")["manifest_path"]
+        with mock.patch.object(manifest, "_JSON_TAIL_MAX", 64):
+            header = read_manifest_header(path)
+        self.assertEqual(sorted(header["dirs"]), ["", "a", "b"])
+        self.assertIn("run_stats", header)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,148 @@
+import os
+import re
+import shutil
+import tempfile
+import unittest
+
+from md5tool.ignore import IgnoreRules, _translate, load_ignore_rules, parse_patterns
+from md5tool.scan import scan_tree
+
+
+def _write(root: str, rel: str, data: str = ""):
+    path = os.path.join(root, *rel.split("/"))
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(data)
+
+
+# (glob 樣式, 路徑, 是否符合)：_translate 只處理單一樣式本身，不含錨定與 ! / 結尾 / 的處理
+TRANSLATE_CASES = [
+    ("*.log", "a.log", True),
+    ("*.log", "dir/a.log", False),  # * 不跨越 /
+    ("?.txt", "a.txt", True),
+    ("?.txt", "ab.txt", False),
+    ("?.txt", "/.txt", False),
+    ("a/**/b", "a/b", True),
+    ("a/**/b", "a/x/y/b", True),
+    ("a/**/b", "ab", False),
+    ("a/**", "a/x/y", True),
+    ("**/cache", "x/y/cache", True),
+    ("**/cache", "cache", True),
+    ("[abc].txt", "b.txt", True),
+    ("[abc].txt", "d.txt", False),
+    ("[a-c]x", "cx", True),
+    ("[!a]x", "bx", True),
+    ("[!a]x", "ax", False),
+    ("[^a]x", "ax", False),
+    ("[x", "[x", True),  # 沒有 ] 時 [ 為一般字元
+    ("a.b", "aXb", False),  # . 不是萬用字元
+    ("\\*x", "*x", True),
+    ("\\*x", "ax", False),
+]
+
+# (樣式列表, 路徑, 是否為資料夾, 是否排除)
+RULE_CASES = [
+    # 不含 / 的樣式比對任何層級的名稱
+    (["*.tmp"], "a.tmp", False, True),
+    (["*.tmp"], "x/y/a.tmp", False, True),
+    (["*.tmp"], "a.tmp.keep", False, False),
+    # 開頭或中間含 / 的樣式從根目錄比對
+    (["/build"], "build", True, True),
+    (["/build"], "src/build", True, False),
+    (["docs/*.pdf"], "docs/a.pdf", False, True),
+    (["docs/*.pdf"], "x/docs/a.pdf", False, False),
+    (["docs/*.pdf"], "docs/sub/a.pdf", False, False),
+    # 結尾 / 只比對資料夾
+    (["cache/"], "cache", True, True),
+    (["cache/"], "x/cache", True, True),
+    (["cache/"], "cache", False, False),
+    # ** 跨越多層
+    (["**/node_modules"], "node_modules", True, True),
+    (["**/node_modules"], "a/b/node_modules", True, True),
+    (["src/**/*.o"], "src/a.o", False, True),
+    (["src/**/*.o"], "src/x/y/a.o", False, True),
+    (["src/**/*.o"], "lib/a.o", False, False),
+    # 字元集合
+    (["file[0-9].bin"], "file7.bin", False, True),
+    (["file[0-9].bin"], "fileA.bin", False, False),
+    (["file[!0-9].bin"], "fileA.bin", False, True),
+    # ! 重新納入：最後符合的樣式決定結果
+    (["*.log", "!keep.log"], "a.log", False, True),
+    (["*.log", "!keep.log"], "keep.log", False, False),
+    (["*.log", "!keep.log"], "x/keep.log", False, False),
+    (["!keep.log", "*.log"], "keep.log", False, True),
+    (["tmp/", "!tmp/"], "tmp", True, False),
+    (["*", "!*/", "!*.txt"], "a.txt", False, False),
+    (["*", "!*/", "!*.txt"], "a.bin", False, True),
+    (["*", "!*/", "!*.txt"], "dir", True, False),
+    # ! 的結尾 / 同樣只作用在資料夾
+    (["data", "!data/"], "data", False, True),
+    (["data", "!data/"], "data", True, False),
+    # 以 \ 跳脫開頭的 ! 與 #
+    (["\\!important"], "!important", False, True),
+    (["\\#hash"], "#hash", False, True),
+    # 空規則不排除任何路徑
+    ([], "anything", False, False),
+    (["/"], "anything", True, False),
+]
+
+
+class TranslateGlob(unittest.TestCase):
+    def test_translate(self):
+        for pat, path, expected in TRANSLATE_CASES:
+            with self.subTest(pat=pat, path=path):
+                matched = re.compile(_translate(pat) + r"\Z", re.S).match(path) is not None
+                self.assertEqual(matched, expected)
+
+
+class IgnoreRulesMatch(unittest.TestCase):
+    def test_rules(self):
+        for patterns, path, is_dir, expected in RULE_CASES:
+            with self.subTest(patterns=patterns, path=path, is_dir=is_dir):
+                self.assertEqual(IgnoreRules(patterns).ignored(path, is_dir), expected)
+
+    def test_combined_regex_matches_ordered_rules(self):
+        # 沒有 ! 時合併成單一 regex；結果應與逐條比對相同
+        patterns = ["*.tmp", "/build", "cache/", "src/**/*.o", "file[0-9].bin"]
+        combined = IgnoreRules(patterns)
+        ordered = IgnoreRules(patterns + ["!never-matches"])
+        self.assertFalse(combined._negations)
+        self.assertTrue(ordered._negations)
+        for _, path, is_dir, _ in RULE_CASES:
+            with self.subTest(path=path, is_dir=is_dir):
+                self.assertEqual(combined.ignored(path, is_dir), ordered.ignored(path, is_dir))
+
+    def test_parse_patterns(self):
+        text = "# 註解\n\n*.tmp   \n!keep.tmp\nspace\\ \n\\#literal\n"
+        self.assertEqual(parse_patterns(text), ["*.tmp", "!keep.tmp", "space\\ ", "\\#literal"])
+        self.assertTrue(IgnoreRules(parse_patterns(text)).ignored("space "))
+
+
+class IgnoreDuringScan(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        for rel in ("a.txt", "a.tmp", "keep.tmp", "build/out.bin", "src/build/x.c",
+                    "node_modules/m/index.js", "sub/.md5ignore"):
+            _write(self.tmp, rel, rel)
+        _write(self.tmp, ".md5ignore", "*.tmp\n!keep.tmp\n/build/\nnode_modules/\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_scan_applies_rules_and_skips_root_ignore_file(self):
+        rules = load_ignore_rules(self.tmp)
+        for workers in (1, 4):
+            with self.subTest(workers=workers):
+                rels = [r.rel for r in scan_tree(self.tmp, workers, rules=rules)]
+                # 根目錄的 .md5ignore 不列入，子資料夾的同名檔案照常列入
+                self.assertEqual(rels, ["a.txt", "keep.tmp", "src/build/x.c", "sub/.md5ignore"])
+
+    def test_missing_file_gives_empty_rules(self):
+        os.remove(os.path.join(self.tmp, ".md5ignore"))
+        rules = load_ignore_rules(self.tmp)
+        self.assertFalse(rules)
+        self.assertEqual(rules.patterns, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,164 @@
+import importlib.util
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from md5tool import hashing
+from md5tool.constants import MANIFEST_FORMATS
+from md5tool.manifest import (
+    Entry, ManifestWriter, _JsonStream, manifest_format, manifest_path_for, read_manifest, read_manifest_header,
+)
+from md5tool.tasks import make_manifest
+
+HAS_ZSTD = importlib.util.find_spec("zstandard") is not None
+
+HEADER = {"tool": "md5tool", "folder": "/data/來源", "algorithms": ["md5", "sha1"], "ignore": ["*.tmp", "!keep.tmp"],
+          "block_size": 4, "block_min_size": 8}
+TRAILER = {"run_stats": {"files": 4, "bytes": 1234, "seconds": 0.5}}
+
+# 依走訪順序（同一資料夾先檔案、再子資料夾），資料夾摘要才會寫入結尾
+ENTRIES = [
+    Entry("a.txt", "0" * 31 + "1", 10, 1_700_000_000, 1_700_000_000_123_456_789, 42, {"sha1": "ab" * 20}),
+    Entry("z 空白.txt", "0" * 31 + "2", 0, 1_600_000_000, 1_600_000_000_000_000_000, None, None),
+    Entry("sub/big.bin", "0" * 31 + "3", 9, 1_650_000_000, 1_650_000_000_500_000_000, 7, {"sha1": "cd" * 20},
+          ["11" * 16, "22" * 16, "33" * 16]),
+    Entry("sub/深/檔案.dat", "f" * 32, 1215, 1, 1_000_000_001, 2**40, None),
+]
+
+FORMATS = ["json", "jsonl", "jsonl.gz", "jsonl.zst", "bin", "bin.gz", "bin.zst"]
+
+
+class ManifestRoundTrip(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def _write(self, fmt: str, entries=ENTRIES) -> tuple:
+        path = manifest_path_for(self.tmp, fmt)
+        with ManifestWriter(path, HEADER) as w:
+            for e in entries:
+                w.write(e)
+            w.trailer = TRAILER
+        return path, w
+
+    def _formats(self):
+        for fmt in FORMATS:
+            with self.subTest(fmt=fmt):
+                if fmt.endswith(".zst") and not HAS_ZSTD:
+                    self.skipTest("未安裝 zstandard")
+                yield fmt
+
+    def test_entries_and_header_round_trip(self):
+        for fmt in self._formats():
+            path, w = self._write(fmt)
+            self.assertEqual(manifest_format(path), fmt)
+            self.assertEqual(os.path.basename(path), MANIFEST_FORMATS[fmt])
+            self.assertEqual(w.count, len(ENTRIES))
+            self.assertIsNotNone(w.dir_digests)
+            for stream in (False, True):
+                header, entries = read_manifest(path, stream=stream)
+                self.assertEqual(list(entries), ENTRIES)
+                # 結尾資訊在 entries 讀完後併入 header
+                self.assertEqual(header, dict(HEADER, **header_extras(fmt), **TRAILER,
+                                              dirs_algorithm=header["dirs_algorithm"], dirs=w.dir_digests))
+                self.assertEqual(set(header["dirs"]), {"", "sub", "sub/深"})
+                self.assertEqual(read_manifest_header(path), header)
+            os.remove(path)
+
+    def test_empty_manifest(self):
+        for fmt in self._formats():
+            path, _ = self._write(fmt, [])
+            header, entries = read_manifest(path, stream=True)
+            self.assertEqual(list(entries), [])
+            self.assertEqual(header["run_stats"], TRAILER["run_stats"])
+            self.assertEqual(read_manifest_header(path), header)
+            os.remove(path)
+
+    def test_missing_extra_digest_stays_missing(self):
+        # 二進位格式以全 0 表示缺值，讀回時不應出現假的 sha1
+        for fmt in self._formats():
+            path, _ = self._write(fmt)
+            _, entries = read_manifest(path)
+            by_path = {e.path: e for e in entries}
+            self.assertIsNone(by_path["z 空白.txt"].hashes)
+            self.assertEqual(by_path["a.txt"].hashes, {"sha1": "ab" * 20})
+            os.remove(path)
+
+    def test_partially_read_stream_does_not_include_trailer(self):
+        path, _ = self._write("json")
+        header, entries = read_manifest(path, stream=True)
+        self.assertEqual(next(entries), ENTRIES[0])
+        self.assertNotIn("run_stats", header)
+        entries.close()
+
+
+def header_extras(fmt: str) -> dict:
+    # jsonl 的第一行另標記格式與版本
+    return {"format": "md5tool-jsonl", "version": 1} if fmt.startswith("jsonl") else {}
+
+
+class JsonStreamParsing(unittest.TestCase):
+    def _values(self, text: str, bufsize: int) -> list:
+        f = io.StringIO(text)
+        real_read = f.read
+        f.read = lambda n=-1: real_read(bufsize)  # 以很小的讀取量模擬值跨越緩衝區邊界
+        js = _JsonStream(f)
+        js.expect("[")
+        out = []
+        while True:
+            ch = js.peek()
+            if ch == "]":
+                return out
+            if ch == ",":
+                js.pos += 1
+                continue
+            out.append(js.value())
+
+    def test_values_across_buffer_boundaries(self):
+        text = '[ {"a": [1, 2, {"b": "x]y"}]}, "字串\\"", 12.5e3, true, null,\n  {"深": {"層": []}} ]'
+        expected = [{"a": [1, 2, {"b": "x]y"}]}, '字串"', 12.5e3, True, None, {"深": {"層": []}}]
+        for bufsize in (1, 3, 7, 1 << 16):
+            with self.subTest(bufsize=bufsize):
+                self.assertEqual(self._values(text, bufsize), expected)
+
+
+class MakeManifestCounts(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        for name in ("a", "b", "c"):
+            with open(os.path.join(self.tmp, name), "w") as f:
+                f.write(name)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp)
+
+    def test_read_errors_are_not_counted_as_hashed(self):
+        real = hashing._hash_or_error
+
+        def failing(path, *args):
+            if os.path.basename(path) == "b":
+                return None, OSError("讀取失敗"), 0.0
+            return real(path, *args)
+
+        make_manifest(self.tmp, use_processes=False, use_cache=False)
+        with open(os.path.join(self.tmp, "c"), "w") as f:
+            f.write("changed")
+        os.utime(os.path.join(self.tmp, "b"), (1, 1))
+        logs = []
+        with mock.patch.object(hashing, "_hash_or_error", failing):
+            result = make_manifest(self.tmp, incremental=True, use_processes=False, use_cache=False,
+                                   log=logs.append)
+        self.assertEqual(result["hashed"], 1)
+        self.assertEqual(result["reused"], 1)
+        self.assertEqual([e["path"] for e in result["errors"]], ["b"])
+        self.assertEqual(result["total"], 2)
+        self.assertIn("沿用 1 筆、重新計算 1 筆、讀取失敗 1 筆、移除 0 筆已刪除項目", logs)
+
+
+if __name__ == "__main__":
+    unittest.main()